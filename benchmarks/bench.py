@@ -0,0 +1,376 @@
+# benchmarks/bench.py
+#
+# Headless benchmarks of the per-frame hot paths, run against the checked-in
+# fixtures. Results are written as JSON and compared against a stored baseline.
+#
+# Usage:
+#     python -m benchmarks.bench --output results.json
+#     python -m benchmarks.bench --save-baseline          # on the reference machine
+#     python -m benchmarks.bench --baseline benchmarks/baseline.json --tolerance 0.25
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+from itertools import cycle
+
+import cv2
+import numpy as np
+
+from benchmarks.make_fixtures import FRAME_FIXTURE, SESSION_FIXTURE
+from modules.angle_calculator import calculate_angle, calculate_angles
+from modules.exercise_counter import ExerciseCounter
+from modules.exercises import EXERCISE_CLASSES
+from modules.landmark_recorder import LandmarkRecording
+from modules.landmarks import LANDMARK_INDEX, relevant_landmarks_from_array
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+RESOLUTIONS = [(320, 240), (640, 480), (800, 600), (1280, 720)]
+
+# Benchmark name -> setup function
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Register a benchmark. The decorated function takes the Fixtures, prepares
+    its inputs and returns the zero-argument callable to time, optionally as
+    (callable, cleanup) or (callable, cleanup, items) where items is the
+    number of items one call processes; results are then reported per item.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+class Fixtures:
+    def __init__(self):
+        """
+        Lazily loaded inputs shared by the benchmarks.
+        """
+        self._session = None
+        self._frame = None
+        self._pose_estimator = None
+
+    @property
+    def session(self):
+        """
+        (timestamps, landmarks) of the recorded exercise session fixture.
+        """
+        if self._session is None:
+            recording = LandmarkRecording(SESSION_FIXTURE)
+            self._session = (np.array(recording.timestamps, dtype=np.float64),
+                             np.array(recording.landmarks))
+        return self._session
+
+    @property
+    def frame(self):
+        """
+        4:3 BGR image of a person, used as the camera frame.
+        """
+        if self._frame is None:
+            self._frame = cv2.imread(FRAME_FIXTURE)
+            if self._frame is None:
+                raise IOError(f"Cannot read frame fixture: {FRAME_FIXTURE}")
+        return self._frame
+
+    @property
+    def pose_estimator(self):
+        if self._pose_estimator is None:
+            from modules.pose_estimation import PoseEstimator
+            self._pose_estimator = PoseEstimator()
+        return self._pose_estimator
+
+    def close(self):
+        if self._pose_estimator is not None:
+            self._pose_estimator.close()
+
+
+def _register_process_frame(width, height):
+    @benchmark(f"pose.process_frame[{width}x{height}]")
+    def setup(fixtures):
+        frame = cv2.resize(fixtures.frame, (width, height))
+        pose_estimator = fixtures.pose_estimator
+        return lambda: pose_estimator.process_frame(frame)
+
+
+for _width, _height in RESOLUTIONS:
+    _register_process_frame(_width, _height)
+
+
+@benchmark("pose.get_relevant_landmarks")
+def _get_relevant_landmarks(fixtures):
+    pose_estimator = fixtures.pose_estimator
+    _, results = pose_estimator.process_frame(cv2.resize(fixtures.frame, (800, 600)))
+    if not results.pose_landmarks:
+        raise RuntimeError("No pose found in the frame fixture")
+    return lambda: pose_estimator.get_relevant_landmarks(results, "Knee Exercise", 'right')
+
+
+def _knee_triples(fixtures):
+    _, landmarks = fixtures.session
+    points = relevant_landmarks_from_array(landmarks[0], "Knee Exercise", 'right')
+    indices = [LANDMARK_INDEX['RIGHT_HIP'], LANDMARK_INDEX['RIGHT_KNEE'], LANDMARK_INDEX['RIGHT_ANKLE']]
+    return points, landmarks[:, indices, :2]
+
+
+@benchmark("angle.calculate_angle")
+def _calculate_angle(fixtures):
+    points, _ = _knee_triples(fixtures)
+    a, b, c = points['hip'].tolist(), points['knee'].tolist(), points['ankle'].tolist()
+    return lambda: calculate_angle(a, b, c)
+
+
+@benchmark("angle.calculate_angle_numpy_dev")
+def _calculate_angle_numpy_dev(fixtures):
+    # The per-call NumPy variant kept in the development files
+    sys.path.insert(0, os.path.join(REPO_DIR, '1_DEVELOPMENT_FILES_ONLY', 'knee_exercise'))
+    try:
+        import angle_calculator as dev_angle_calculator
+    finally:
+        sys.path.pop(0)
+    points, _ = _knee_triples(fixtures)
+    a, b, c = points['hip'].tolist(), points['knee'].tolist(), points['ankle'].tolist()
+    return lambda: dev_angle_calculator.calculate_angle(a, b, c)
+
+
+@benchmark("angle.calculate_angles[per_frame]")
+def _calculate_angles(fixtures):
+    # The whole session in one call, reported per frame
+    _, triples = _knee_triples(fixtures)
+    triples = np.ascontiguousarray(triples)
+    return lambda: calculate_angles(triples), None, len(triples)
+
+
+@benchmark("exercise_counter.update")
+def _exercise_counter_update(fixtures):
+    timestamps, _ = fixtures.session
+    angles = cycle(calculate_angles(_knee_triples(fixtures)[1]).tolist())
+    times = cycle(timestamps.tolist())
+    counter = ExerciseCounter(160, 0.5)
+    return lambda: counter.update(next(angles), next(times))
+
+
+def _register_exercise(exercise_name):
+    @benchmark(f"exercise.process[{exercise_name}]")
+    def setup(fixtures):
+        timestamps, landmarks = fixtures.session
+        frames = cycle([(relevant_landmarks_from_array(frame, exercise_name, 'right'), timestamp)
+                        for timestamp, frame in zip(timestamps.tolist(), landmarks)])
+        exercise = EXERCISE_CLASSES[exercise_name]()
+
+        def run():
+            points, timestamp = next(frames)
+            return exercise.process(points, timestamp)
+        return run
+
+
+for _exercise_name in EXERCISE_CLASSES:
+    _register_exercise(_exercise_name)
+
+
+@benchmark("gui.convert_cv_qt[800x600]")
+def _convert_cv_qt(fixtures):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from utils.helper_functions import convert_cv_qt
+    app = QApplication.instance() or QApplication([])
+    frame = cv2.resize(fixtures.frame, (800, 600))
+    run = lambda: convert_cv_qt(frame)
+    run.app = app  # Keep the application alive while timing
+    return run
+
+
+def _temporary_tracker(**kwargs):
+    """
+    Open a ProgressTracker on a throwaway database.
+
+    Returns:
+    - (tracker, cleanup): The tracker and a callable that closes and deletes it.
+    """
+    from modules.database import ProgressTracker
+    directory = tempfile.mkdtemp(prefix='bench_db_')
+    tracker = ProgressTracker(os.path.join(directory, 'progress.db'), **kwargs)
+
+    def cleanup():
+        tracker.close()
+        shutil.rmtree(directory, ignore_errors=True)
+    return tracker, cleanup
+
+
+@benchmark("database.record_progress[enqueue]")
+def _record_progress_enqueue(fixtures):
+    # What the video thread pays: the write is only queued for the writer thread
+    tracker, cleanup = _temporary_tracker()
+    return lambda: tracker.record_progress("Knee Exercise", 10, 100), cleanup
+
+
+@benchmark("database.record_progress[committed]")
+def _record_progress_committed(fixtures):
+    # One write until it is committed, without the writer lingering for more
+    tracker, cleanup = _temporary_tracker(linger=0.0)
+    return lambda: tracker.record_progress("Knee Exercise", 10, 100).result(), cleanup
+
+
+@benchmark("database.record_progress[committed, batch]")
+def _record_progress_batch(fixtures):
+    # A full batch queued at once and committed in one transaction, per write
+    tracker, cleanup = _temporary_tracker(linger=0.0)
+
+    def run():
+        for _ in range(tracker.batch_size):
+            tracker.record_progress("Knee Exercise", 10, 100)
+        tracker.flush()
+    return run, cleanup, tracker.batch_size
+
+
+def measure(func, rounds=5, min_time=0.2):
+    """
+    Time a callable.
+
+    Parameters:
+    - func (callable): Zero-argument callable.
+    - rounds (int): Number of timed rounds.
+    - min_time (float): Minimum seconds per round; sets the calls per round.
+
+    Returns:
+    - dict: median_us, min_us, max_us per call, number (calls per round) and rounds.
+    """
+    timer = timeit.Timer(func)
+    func()  # Warm up caches and lazy initialization
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number = max(number + 1, int(number * min(10.0, 1.2 * min_time / max(elapsed, 1e-9))))
+    per_call = np.array(timer.repeat(rounds, number)) / number * 1e6
+    return {'median_us': float(np.median(per_call)), 'min_us': float(per_call.min()),
+            'max_us': float(per_call.max()), 'number': number, 'rounds': rounds}
+
+
+def run_benchmarks(pattern=None, rounds=5, min_time=0.2):
+    """
+    Run the registered benchmarks.
+
+    Parameters:
+    - pattern (str): Only run benchmarks whose name contains this, or None for all.
+    - rounds (int): Timed rounds per benchmark.
+    - min_time (float): Minimum seconds per round.
+
+    Returns:
+    - dict: meta, results ({name: measure() dict}) and skipped ({name: reason}).
+    """
+    fixtures = Fixtures()
+    results, skipped = {}, {}
+    try:
+        for name, setup in BENCHMARKS.items():
+            if pattern and pattern not in name:
+                continue
+            try:
+                prepared = setup(fixtures)
+            except Exception as e:
+                skipped[name] = f"{type(e).__name__}: {e}"
+                print(f"{name:<45} skipped ({skipped[name]})")
+                continue
+
+            if not isinstance(prepared, tuple):
+                prepared = (prepared,)
+            func, cleanup, items = prepared + (None, 1)[len(prepared) - 1:]
+            try:
+                result = measure(func, rounds=rounds, min_time=min_time)
+            finally:
+                if cleanup is not None:
+                    cleanup()
+            if items != 1:
+                for key in ('median_us', 'min_us', 'max_us'):
+                    result[key] /= items
+                result['items'] = items
+            results[name] = result
+            print(f"{name:<45} {result['median_us']:12.2f} us")
+    finally:
+        fixtures.close()
+
+    return {'meta': _meta(), 'results': results, 'skipped': skipped}
+
+
+def _meta():
+    return {
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+    }
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Compare medians against a baseline run.
+
+    Parameters:
+    - results (dict): Output of run_benchmarks().
+    - baseline (dict): Earlier output of run_benchmarks().
+    - tolerance (float): Allowed slowdown as a fraction of the baseline median.
+
+    Returns:
+    - dict: {name: {baseline_us, current_us, ratio, regression}} for benchmarks in both runs.
+    """
+    comparison = {}
+    for name, current in results['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None or previous['median_us'] <= 0:
+            continue
+        ratio = current['median_us'] / previous['median_us']
+        comparison[name] = {'baseline_us': previous['median_us'], 'current_us': current['median_us'],
+                            'ratio': ratio, 'regression': ratio > 1.0 + tolerance}
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-frame hot paths.")
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against.")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown relative to the baseline (0.25 = 25%%).")
+    parser.add_argument('--filter', default=None, help="Only run benchmarks whose name contains this.")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help="Minimum seconds per round.")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.filter, rounds=args.rounds, min_time=args.min_time)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            comparison = compare(results, json.load(f), args.tolerance)
+        results['comparison'] = comparison
+        for name, entry in comparison.items():
+            flag = "REGRESSION" if entry['regression'] else "ok"
+            print(f"{name:<45} {entry['ratio']:6.2f}x baseline  {flag}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if any(entry['regression'] for entry in results.get('comparison', {}).values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/make_fixtures.py
+#
+# Regenerate the checked-in benchmark fixtures. The output is deterministic, so
+# fixtures only change when this script does.
+#
+# Usage:
+#     python -m benchmarks.make_fixtures
+
+import os
+
+import cv2
+import numpy as np
+
+from modules.landmark_recorder import LandmarkRecorder
+from modules.landmarks import LANDMARK_INDEX, NUM_LANDMARKS
+from modules.synthetic_motion import STANDING_ARRAY, rotate_points
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+SESSION_FIXTURE = os.path.join(FIXTURES_DIR, 'exercise_session.lmk')
+FRAME_FIXTURE = os.path.join(FIXTURES_DIR, 'person_frame.jpg')
+FRAME_SOURCE = os.path.join(os.path.dirname(os.path.dirname(FIXTURES_DIR)), 'project_img2.jpg')
+
+
+def exercise_session(frames=300, fps=30.0, period=3.0, seed=0):
+    """
+    Build a landmark stream in which both knees bend and both arms rise once per period.
+
+    Parameters:
+    - frames (int): Number of frames.
+    - fps (float): Frame rate.
+    - period (float): Seconds per repetition.
+    - seed (int): Seed of the landmark jitter.
+
+    Returns:
+    - timestamps (numpy.ndarray): (frames,) seconds.
+    - landmarks (numpy.ndarray): (frames, 33, 4) float32 landmarks.
+    """
+    rng = np.random.default_rng(seed)
+    timestamps = np.arange(frames) / fps
+    phase = 0.5 - 0.5 * np.cos(2 * np.pi * timestamps / period)  # 0 -> 1 -> 0 each rep
+
+    xy = np.repeat(STANDING_ARRAY[None], frames, axis=0)
+
+    for side, sign in (('LEFT', 1.0), ('RIGHT', -1.0)):
+        # Knee bend: the shin swings back by up to 100 degrees around the knee
+        knee = xy[:, LANDMARK_INDEX[f'{side}_KNEE']].copy()
+        for name in (f'{side}_ANKLE', f'{side}_HEEL', f'{side}_FOOT_INDEX'):
+            i = LANDMARK_INDEX[name]
+            xy[:, i] = rotate_points(xy[:, i], knee, sign * np.radians(100) * phase)
+
+        # Arm raise: the whole arm swings out by up to 150 degrees around the shoulder
+        shoulder = xy[:, LANDMARK_INDEX[f'{side}_SHOULDER']].copy()
+        for name in (f'{side}_ELBOW', f'{side}_WRIST', f'{side}_PINKY', f'{side}_INDEX', f'{side}_THUMB'):
+            i = LANDMARK_INDEX[name]
+            xy[:, i] = rotate_points(xy[:, i], shoulder, -sign * np.radians(150) * phase)
+
+    landmarks = np.empty((frames, NUM_LANDMARKS, 4), dtype=np.float32)
+    landmarks[..., :2] = xy + rng.normal(0.0, 0.002, xy.shape)
+    landmarks[..., 2] = rng.normal(0.0, 0.05, (frames, NUM_LANDMARKS))
+    landmarks[..., 3] = 0.99
+    return timestamps, landmarks
+
+
+def person_frame():
+    """
+    Cut the person out of the README screenshot and center it on a 4:3 frame,
+    the aspect of the camera, so MediaPipe finds the pose on the first frame.
+
+    Returns:
+    - numpy.ndarray: BGR image.
+    """
+    image = cv2.imread(FRAME_SOURCE)
+    if image is None:
+        raise IOError(f"Cannot read {FRAME_SOURCE}")
+    person = image[:, :300]
+    height = person.shape[0]
+    width = height * 4 // 3
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    left = (width - person.shape[1]) // 2
+    frame[:, left:left + person.shape[1]] = person
+    return frame
+
+
+def main():
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    cv2.imwrite(FRAME_FIXTURE, person_frame(), [cv2.IMWRITE_JPEG_QUALITY, 90])
+    print(f"Wrote {FRAME_FIXTURE}")
+
+    for path in (SESSION_FIXTURE, SESSION_FIXTURE + '.idx'):
+        if os.path.exists(path):
+            os.remove(path)
+
+    timestamps, landmarks = exercise_session()
+    recorder = LandmarkRecorder(SESSION_FIXTURE, start_time=0.0)
+    for timestamp, frame in zip(timestamps, landmarks):
+        recorder.append(timestamp, frame)
+    recorder.close()
+    print(f"Wrote {len(timestamps)} frames to {SESSION_FIXTURE}")
+
+
+if __name__ == "__main__":
+    main()
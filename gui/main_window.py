@@ -1,24 +1,76 @@
 # gui/main_window.py
 
-from PyQt5.QtWidgets import (QMainWindow, QLabel, QPushButton, QVBoxLayout,
+from PyQt5.QtWidgets import (QMainWindow, QLabel, QPushButton, QVBoxLayout, QCheckBox,
                              QWidget, QComboBox, QSpinBox, QMessageBox, QHBoxLayout, QProgressBar, QTextEdit)
 from PyQt5.QtCore import Qt, QTimer, QSize
 from PyQt5.QtGui import QPixmap, QFont, QMovie, QIcon
 
-import cv2
-import sys
+import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
-from modules.pose_estimation import PoseEstimator
-from modules.exercises.knee_exercise import KneeExercise
-from modules.exercises.shoulder_exercise import ShoulderExercise
-from modules.exercises.back_exercise import BackExercise
-from modules.exercises.squat_exercise import SquatExercise
+from modules.exercises import EXERCISE_CLASSES, create_exercises
 from modules.database import ProgressTracker
+from modules.instrumentation import PerfMonitor
+from modules.landmark_recorder import LandmarkRecorder
 from utils.helper_functions import convert_cv_qt
+from gui.view_model import FEEDBACK_STYLE, FEEDBACK_TONES, ViewModel
+
+logger = logging.getLogger(__name__)
+
+
+def open_camera(index=0, frame_size=(800, 600)):
+    """
+    Open the webcam. Runs on a startup thread.
+
+    Parameters:
+    - index (int): Camera device index.
+    - frame_size (tuple): (width, height) the frames are shown at; MJPEG frames
+      are decoded at the smallest reduction that still covers it.
+
+    Returns:
+    - CameraSource: The opened camera.
+    """
+    # OpenCV and the camera module load here, off the GUI thread, like MediaPipe below
+    from modules.camera import CameraSource
+    cap = CameraSource(index, decode_size=frame_size)
+    if not cap.isOpened():
+        cap.release()
+        raise IOError("Cannot open webcam.")
+    return cap
+
+
+def load_pose_estimator(frame_size=None):
+    """
+    Import MediaPipe, build the pose graph and warm it up. Runs on a startup thread.
+
+    Parameters:
+    - frame_size (tuple): (width, height) of the frames to warm up on, or None
+      for the pipeline's inference size.
+
+    Returns:
+    - PoseEstimator: Ready to process frames of frame_size.
+    """
+    # Imported here: MediaPipe alone takes longer to load than the whole window
+    from modules.pose_estimation import PoseEstimator
+    if frame_size is None:
+        from modules.pipeline import INFERENCE_SIZE
+        frame_size = INFERENCE_SIZE
+    pose_estimator = PoseEstimator()
+    pose_estimator.warm_up(frame_size)
+    return pose_estimator
+
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, ingest_server=None, station=None):
+        """
+        Parameters:
+        - ingest_server (tuple): (host, port) of a clinic ingest server to upload
+          finished sessions to, or None to keep them local.
+        - station (str): Name of this station on the ingest server, or None for the host name.
+        """
         super().__init__()
 
         self.setWindowTitle("Rehabilitation Exercise App")
@@ -27,34 +79,80 @@ class MainWindow(QMainWindow):
         # Apply Style Sheet
         self.apply_stylesheet()
 
-        # Initialize Pose Estimator
-        self.pose_estimator = PoseEstimator()
-
         # Initialize Exercise Modules
-        self.exercises = {
-            "Knee Exercise": KneeExercise(),
-            "Shoulder Exercise": ShoulderExercise(),
-            "Back Exercise": BackExercise(),
-            "Squat Exercise": SquatExercise()
-        }
+        self.exercises = create_exercises()
         self.current_exercise = "Knee Exercise"
 
         # Initialize Progress Tracker
         self.progress_tracker = ProgressTracker()
+        self.session_id = None
+        self.uploader = None
+        if ingest_server is not None:
+            from modules.uploader import SessionUploader
+            self.uploader = SessionUploader(self.progress_tracker.db_path, ingest_server, station)
+            self.uploader.start()
 
         # Setup UI Components
         self.setup_ui()
 
-        # Initialize Video Capture
-        self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-        if not self.cap.isOpened():
-            QMessageBox.critical(self, "Error", "Cannot open webcam.")
-            sys.exit()
-
-        # Setup Timer for Video Capture
+        # Frames are rendered at exactly the size the video label shows them at
+        self.video_label.ensurePolished()
+        display_rect = self.video_label.contentsRect()
+        self.display_size = (display_rect.width(), display_rect.height())
+
+        # The camera and the pose model are opened on startup threads so the window
+        # shows straight away; finish_startup() starts the pipeline once both are ready
+        self.cap = None
+        self.pose_estimator = None
+        self.pipeline = None
+        self.perf_monitor = PerfMonitor()
+        self.start_button.setEnabled(False)
+        self.status_bar.showMessage("Loading pose model...")
+        self.loader = ThreadPoolExecutor(max_workers=2, thread_name_prefix="startup")
+        self.camera_future = self.loader.submit(open_camera, 0, self.display_size)
+        self.pose_future = self.loader.submit(load_pose_estimator)
+        self.startup_timer = QTimer()
+        self.startup_timer.timeout.connect(self.finish_startup)
+        self.startup_timer.start(50)  # 50 ms
+
+        # Stage timings are written to app.log periodically and drawn on request
+        self.perf_lines = []
+        self.perf_lines_time = 0.0
+        self.perf_log_timer = QTimer()
+        self.perf_log_timer.timeout.connect(self.perf_monitor.log_snapshot)
+        self.perf_log_timer.start(30000)  # 30 s
+
+        # Setup Timer to display the newest processed frame; started with the pipeline
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
-        self.timer.start(30)  # 30 ms
+
+    def finish_startup(self):
+        """
+        Start the pipeline once the camera and pose model are loaded.
+        """
+        if not (self.camera_future.done() and self.pose_future.done()):
+            return
+        self.startup_timer.stop()
+        try:
+            self.cap = self.camera_future.result()
+            self.pose_estimator = self.pose_future.result()
+        except Exception as e:
+            logger.exception("Startup failed")
+            QMessageBox.critical(self, "Error", str(e))
+            self.close()
+            return
+
+        # Capture, inference and exercise evaluation run on worker threads; the
+        # module was already loaded by the startup threads
+        from modules.pipeline import ExercisePipeline
+        self.pipeline = ExercisePipeline(self.cap, self.pose_estimator, self.exercises,
+                                         self.current_exercise, frame_size=self.display_size,
+                                         focus_side='right', sparse_inference=self.sparse_checkbox.isChecked(),
+                                         monitor=self.perf_monitor, roi_tracking=self.roi_checkbox.isChecked())
+        self.pipeline.start()
+        self.timer.start(15)  # 15 ms
+        self.start_button.setEnabled(True)
+        self.status_bar.showMessage("Ready")
 
     def apply_stylesheet(self):
         """
@@ -100,9 +198,33 @@ class MainWindow(QMainWindow):
         """)
         self.tutorial_button.clicked.connect(self.view_tutorial)
 
-        # Add video and tutorial button to left layout
+        # Landmark Recording Option
+        self.record_checkbox = QCheckBox("Record Landmarks")
+        self.record_checkbox.setToolTip("Save every frame's pose landmarks to the recordings folder.")
+
+        # Sparse Inference Option
+        self.sparse_checkbox = QCheckBox("Sparse Inference")
+        self.sparse_checkbox.setToolTip("Run pose detection on fewer frames and follow the pose "
+                                        "with optical flow in between. Lowers CPU use.")
+        self.sparse_checkbox.toggled.connect(self.toggle_sparse_inference)
+
+        # ROI Tracking Option
+        self.roi_checkbox = QCheckBox("ROI Tracking")
+        self.roi_checkbox.setToolTip("Run pose detection on a crop around the person instead of the "
+                                     "whole frame. Sharper landmarks when the person is far away.")
+        self.roi_checkbox.toggled.connect(self.toggle_roi_tracking)
+
+        # Performance Overlay Option
+        self.perf_checkbox = QCheckBox("Show Performance")
+        self.perf_checkbox.setToolTip("Overlay frame rate and per-stage timings (p50/p95/p99) on the video.")
+
+        # Add video, tutorial button and options to left layout
         left_layout.addWidget(self.video_label, alignment=Qt.AlignCenter)
         left_layout.addWidget(self.tutorial_button, alignment=Qt.AlignCenter)
+        left_layout.addWidget(self.record_checkbox, alignment=Qt.AlignCenter)
+        left_layout.addWidget(self.sparse_checkbox, alignment=Qt.AlignCenter)
+        left_layout.addWidget(self.roi_checkbox, alignment=Qt.AlignCenter)
+        left_layout.addWidget(self.perf_checkbox, alignment=Qt.AlignCenter)
         left_layout.addStretch()
 
         # Right Column Layout for Controls and Instructions
@@ -155,7 +277,9 @@ class MainWindow(QMainWindow):
         self.feedback_label = QLabel("Feedback: Ready")
         self.feedback_label.setAlignment(Qt.AlignCenter)
         self.feedback_label.setFont(QFont("Arial", 18, QFont.Bold))
-        self.feedback_label.setStyleSheet("color: blue;")
+        # Colors are chosen by the 'tone' property so switching them does not re-parse a stylesheet
+        self.feedback_label.setProperty('tone', 'info')
+        self.feedback_label.setStyleSheet(FEEDBACK_STYLE)
 
         # Real-time Angle Display
         angles_layout = QHBoxLayout()
@@ -251,6 +375,22 @@ class MainWindow(QMainWindow):
         self.status_bar = self.statusBar()
         self.status_bar.showMessage("Ready")
 
+        # Metric labels are refreshed at most 10 times per second, and only when their text changes
+        self.view_model = ViewModel(rate=10.0)
+        self.view_model.bind('feedback', self.feedback_label.setText, lambda v: f"Feedback: {v}")
+        self.view_model.bind_property('tone', self.feedback_label, 'tone',
+                                      lambda v: FEEDBACK_TONES.get(v, 'info'))
+        self.view_model.bind('reps', self.reps_label.setText, lambda v: f"Repetitions: {v}")
+        self.view_model.bind('points', self.points_label.setText, lambda v: f"Points: {v}")
+        self.view_model.bind('progress', self.progress_bar.setValue)
+        self.view_model.bind('achievements', self.achievement_label.setText,
+                             lambda v: f"Achievements: {', '.join(v) if v else 'None'}")
+        for name, label in (('knee_angle', self.knee_angle_label), ('back_angle', self.back_angle_label),
+                            ('shoulder_angle', self.shoulder_angle_label)):
+            title = name.replace('_', ' ').title()
+            self.view_model.bind(name, label.setText,
+                                 lambda v, title=title: f"{title}: {'--' if v is None else int(v)}°")
+
     def set_instructions(self, exercise, instructions):
         """
         Set instructions based on the selected exercise.
@@ -266,6 +406,8 @@ class MainWindow(QMainWindow):
         Change the current exercise based on user selection.
         """
         self.current_exercise = exercise_name
+        if self.pipeline is not None:
+            self.pipeline.set_exercise(exercise_name)
         self.reset_metrics()
         # Update instructions based on exercise
         instructions = self.get_instructions(exercise_name)
@@ -335,14 +477,89 @@ class MainWindow(QMainWindow):
             self.current_goal = self.goal_spinbox.value()
             self.reset_metrics()
             self.progress_bar.setMaximum(self.current_goal)
-            self.progress_bar.setValue(0)
+            # Start every session from a fresh counter
+            self.exercises[self.current_exercise] = EXERCISE_CLASSES[self.current_exercise]()
+            if self.record_checkbox.isChecked():
+                self.start_recording()
+            self.start_session()
+            self.pipeline.set_running(True)
             self.status_bar.showMessage(f"Exercise '{self.current_exercise}' started. Aim for {self.current_goal} reps.")
         else:
+            self.pipeline.set_running(False)
+            self.stop_recording()
+            self.end_session()
             self.start_button.setText("Start Exercise")
             self.start_button.setIcon(QIcon(os.path.join('assets', 'icons', 'start.png')))
             self.reset_metrics()
             self.status_bar.showMessage("Exercise stopped.")
 
+    def start_recording(self):
+        """
+        Start recording landmarks of the current session to the recordings folder.
+        """
+        os.makedirs('recordings', exist_ok=True)
+        name = self.current_exercise.lower().replace(' ', '_')
+        path = os.path.join('recordings', f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.lmk")
+        try:
+            self.stop_recording()
+            self.pipeline.set_recorder(LandmarkRecorder(path))
+        except OSError as e:
+            print(f"Error starting landmark recording: {e}")
+
+    def stop_recording(self):
+        """
+        Stop recording landmarks and close the recording file.
+        """
+        if self.pipeline is None:
+            return
+        recorder = self.pipeline.set_recorder(None)
+        if recorder is not None:
+            recorder.close()
+
+    def start_session(self):
+        """
+        Start a session in the progress database and send its reps there as they complete.
+        """
+        self.end_session()
+        exercise = self.current_exercise
+        self.session_id = self.progress_tracker.start_session(exercise, goal=self.current_goal)
+        if self.session_id is None:
+            return
+        session_id = self.session_id
+
+        def record_reps(exercise_name, events):
+            if exercise_name == exercise:
+                self.progress_tracker.record_rep_events(session_id, events)
+        self.pipeline.set_rep_sink(record_reps)
+
+    def end_session(self):
+        """
+        Stop sending reps to the progress database and store the session summary.
+        """
+        if self.pipeline is not None:
+            self.pipeline.set_rep_sink(None)
+        if self.session_id is not None:
+            ended = self.progress_tracker.end_session(self.session_id, self.reps, self.points)
+            if self.uploader is not None:
+                ended.add_done_callback(lambda _: self.uploader.notify())
+            self.session_id = None
+
+    def toggle_sparse_inference(self, enabled):
+        """
+        Enable or disable sparse pose inference in the pipeline.
+        """
+        if self.pipeline is not None:
+            self.pipeline.set_sparse_inference(enabled)
+        self.status_bar.showMessage("Sparse inference " + ("enabled." if enabled else "disabled."))
+
+    def toggle_roi_tracking(self, enabled):
+        """
+        Enable or disable ROI tracking in the pipeline.
+        """
+        if self.pipeline is not None:
+            self.pipeline.set_roi_tracking(enabled)
+        self.status_bar.showMessage("ROI tracking " + ("enabled." if enabled else "disabled."))
+
     def reset_metrics(self):
         """
         Reset the repetitions, points, and feedback.
@@ -350,14 +567,10 @@ class MainWindow(QMainWindow):
         self.reps = 0
         self.points = 0
         self.feedback = "Ready"
-        self.feedback_label.setText(f"Feedback: {self.feedback}")
-        self.reps_label.setText(f"Repetitions: {self.reps}")
-        self.points_label.setText(f"Points: {self.points}")
-        self.achievement_label.setText("Achievements: None")
-        self.knee_angle_label.setText("Knee Angle: --°")
-        self.back_angle_label.setText("Back Angle: --°")
-        self.shoulder_angle_label.setText("Shoulder Angle: --°")
-        self.progress_bar.setValue(0)
+        self.view_model.set(feedback=self.feedback, tone=self.feedback, reps=self.reps,
+                            points=self.points, progress=self.reps, achievements=None,
+                            knee_angle=None, back_angle=None, shoulder_angle=None)
+        self.view_model.flush(force=True)
         self.status_bar.showMessage("Metrics reset.")
 
     def view_tutorial(self):
@@ -410,108 +623,110 @@ class MainWindow(QMainWindow):
 
     def update_frame(self):
         """
-        Capture video frame, process it, and update the GUI.
+        Display the newest frame finished by the pipeline and update the GUI.
         """
-        ret, frame = self.cap.read()
-        if not ret:
-            print("Failed to grab frame")
+        packet = self.pipeline.latest()
+        if packet is None:
             return
 
-        frame = cv2.flip(frame, 1)  # Mirror the image
-        frame = cv2.resize(frame, (800, 600))  # Adjusted size to match video_label
-        image, results = self.pose_estimator.process_frame(frame)
-        image = self.pose_estimator.draw_landmarks(image, results, exercise=self.current_exercise, focus_side='right')
-
-        if self.start_button.text() == "Stop Exercise":
-            relevant_landmarks = self.pose_estimator.get_relevant_landmarks(results, exercise=self.current_exercise, focus_side='right')
-            if relevant_landmarks:
-                exercise_module = self.exercises[self.current_exercise]
-                try:
-                    if self.current_exercise == "Squat Exercise":
-                        reps, feedback, points, achievements, knee_angle, back_angle = exercise_module.process(relevant_landmarks)
-                        shoulder_angle = None
-                    elif self.current_exercise == "Back Exercise":
-                        reps, feedback, points, achievements, back_angle = exercise_module.process(relevant_landmarks)
-                        knee_angle = None
-                        shoulder_angle = None
-                    elif self.current_exercise == "Shoulder Exercise":
-                        reps, feedback, points, achievements, shoulder_angle = exercise_module.process(relevant_landmarks)
-                        knee_angle = None
-                        back_angle = None
-                    else:  # Knee Exercise
-                        reps, feedback, points, achievements, knee_angle = exercise_module.process(relevant_landmarks)
-                        back_angle = None
-                        shoulder_angle = None
-                except KeyError as e:
-                    print(f"Error processing exercise: {e}")
-                    reps, feedback, points, achievements = self.reps, "Error", self.points, []
-                    knee_angle, back_angle, shoulder_angle = None, None, None
-
-                # Update metrics
-                self.reps = reps
-                self.feedback = feedback
-                self.reps_label.setText(f"Repetitions: {self.reps}")
-                self.points_label.setText(f"Points: {self.points}")
-                self.feedback_label.setText(f"Feedback: {self.feedback}")
-
-                # Update angles display
-                if knee_angle is not None:
-                    self.knee_angle_label.setText(f"Knee Angle: {int(knee_angle)}°")
-                else:
-                    self.knee_angle_label.setText("Knee Angle: --°")
-
-                if back_angle is not None:
-                    self.back_angle_label.setText(f"Back Angle: {int(back_angle)}°")
-                else:
-                    self.back_angle_label.setText("Back Angle: --°")
-
-                if self.current_exercise == "Shoulder Exercise" and shoulder_angle is not None:
-                    self.shoulder_angle_label.setText(f"Shoulder Angle: {int(shoulder_angle)}°")
-                else:
-                    self.shoulder_angle_label.setText("Shoulder Angle: --°")
-
-                # Update Progress Bar
-                self.progress_bar.setValue(self.reps)
-
-                # Change feedback label color based on feedback
-                if feedback == "Good Rep":
-                    self.feedback_label.setStyleSheet("color: green;")
-                elif feedback == "Keep Your Back Straight":
-                    self.feedback_label.setStyleSheet("color: red;")
-                elif feedback == "Go Up":
-                    self.feedback_label.setStyleSheet("color: orange;")
-                else:
-                    self.feedback_label.setStyleSheet("color: blue;")
-
-                # Handle Achievements (No Pop-ups)
-                if feedback == "Good Rep":
-                    if achievements:
-                        achievement_text = ", ".join(achievements)
-                        self.achievement_label.setText(f"Achievements: {achievement_text}")
-                        self.status_bar.showMessage(f"Achievement Unlocked: {achievements[-1]}")
-
-                # Check if goal is reached
-                if self.reps >= self.current_goal:
-                    QMessageBox.information(self, "Goal Reached", f"Congratulations! You reached your goal of {self.current_goal} reps.")
-                    self.start_button.setText("Start Exercise")
-                    self.start_button.setIcon(QIcon(os.path.join('assets', 'icons', 'start.png')))
-                    self.status_bar.showMessage(f"Goal reached: {self.current_goal} reps.")
-                    # Record progress
-                    self.progress_tracker.record_progress(self.current_exercise, self.reps, self.points)
-                    self.reset_metrics()
+        metrics = packet.metrics
+        if (self.start_button.text() == "Stop Exercise" and metrics is not None
+                and packet.exercise == self.current_exercise):
+            reps = metrics['reps'] if metrics['reps'] is not None else self.reps
+            feedback = metrics['feedback']
+            achievements = metrics['achievements']
+            knee_angle = metrics['knee_angle']
+            back_angle = metrics['back_angle']
+            shoulder_angle = metrics['shoulder_angle']
+
+            # Update metrics; the view model applies them at its own rate
+            self.reps = reps
+            self.points = metrics['points']
+            self.feedback = feedback
+            if self.current_exercise != "Shoulder Exercise":
+                shoulder_angle = None
+            self.view_model.set(feedback=feedback, tone=feedback, reps=self.reps, points=self.points,
+                                progress=self.reps, knee_angle=knee_angle, back_angle=back_angle,
+                                shoulder_angle=shoulder_angle)
+
+            # Handle Achievements (No Pop-ups)
+            if feedback == "Good Rep":
+                if achievements:
+                    self.view_model.set(achievements=tuple(achievements))
+                    self.status_bar.showMessage(f"Achievement Unlocked: {achievements[-1]}")
+
+            # Check if goal is reached
+            if self.reps >= self.current_goal:
+                self.view_model.flush(force=True)
+                # Stop evaluation before the modal dialog spins its own event loop
+                self.pipeline.set_running(False)
+                self.stop_recording()
+                self.end_session()
+                self.start_button.setText("Start Exercise")
+                self.start_button.setIcon(QIcon(os.path.join('assets', 'icons', 'start.png')))
+                # Record progress
+                self.progress_tracker.record_progress(self.current_exercise, self.reps, self.points)
+                QMessageBox.information(self, "Goal Reached", f"Congratulations! You reached your goal of {self.current_goal} reps.")
+                self.reset_metrics()
+                self.status_bar.showMessage(f"Goal reached: {self.current_goal} reps.")
+
+        monitor = self.perf_monitor
+        with monitor.time('ui'):
+            self.view_model.flush()
+        monitor.record('latency', time.time() - packet.timestamp)
+        monitor.set_dropped(self.pipeline.dropped_frames)
+        if self.perf_checkbox.isChecked():
+            self.draw_perf_overlay(packet.image)
 
         # Convert the image to Qt format
         try:
-            qt_image = convert_cv_qt(image)
-            self.video_label.setPixmap(qt_image)
-        except Exception as e:
-            print(f"Error converting image: {e}")
+            with monitor.time('convert'):
+                qt_image = convert_cv_qt(packet.image, is_rgb=True)
+            with monitor.time('setPixmap'):
+                self.video_label.setPixmap(qt_image)
+            monitor.tick()
+        except Exception:
+            logger.exception("Error converting image")
+        finally:
+            packet.release()
+
+    def draw_perf_overlay(self, image):
+        """
+        Draw the frame rate and stage timings in the top-left corner of the image.
+        """
+        import cv2  # Loaded by the pipeline long before the overlay is first drawn
+
+        # Percentiles only need refreshing a couple of times per second
+        now = time.perf_counter()
+        if now - self.perf_lines_time > 0.5:
+            self.perf_lines = self.perf_monitor.overlay_lines()
+            self.perf_lines_time = now
+
+        height = 18 * len(self.perf_lines) + 8
+        cv2.rectangle(image, (0, 0), (360, height), (0, 0, 0), cv2.FILLED)
+        for i, line in enumerate(self.perf_lines):
+            cv2.putText(image, line, (6, 18 * (i + 1)), cv2.FONT_HERSHEY_PLAIN, 1.0,
+                        (255, 255, 255), 1, cv2.LINE_AA)
 
     def closeEvent(self, event):
         """
         Handle the window close event to release resources.
         """
-        self.cap.release()
-        self.pose_estimator.close()
+        self.startup_timer.stop()
+        self.timer.stop()
+        self.perf_log_timer.stop()
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.perf_monitor.log_snapshot()
+        self.stop_recording()
+        self.end_session()
+        # Startup may still be running or may have failed half way; whatever it opened is released
+        self.loader.shutdown(wait=True)
+        if self.camera_future.exception() is None:
+            self.camera_future.result().release()
+        if self.pose_future.exception() is None:
+            self.pose_future.result().close()
         self.progress_tracker.close()
+        if self.uploader is not None:
+            self.uploader.stop()
         event.accept()
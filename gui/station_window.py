@@ -0,0 +1,207 @@
+# gui/station_window.py
+
+from PyQt5.QtWidgets import (QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QComboBox,
+                             QGridLayout, QHBoxLayout, QLineEdit)
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QFont
+
+import math
+import os
+
+from modules.database import ProgressTracker
+from modules.exercises import EXERCISE_CLASSES
+from modules.station import CameraWorker, split_cores
+from utils.helper_functions import convert_cv_qt
+from gui.view_model import FEEDBACK_STYLE, FEEDBACK_TONES, ViewModel
+
+
+class CameraTile(QWidget):
+    def __init__(self, worker, title, progress_tracker, patient):
+        """
+        Video, controls and metrics of one camera in the station grid.
+
+        Parameters:
+        - worker (CameraWorker): Worker process of the camera.
+        - title (str): Caption of the tile.
+        - progress_tracker (ProgressTracker): Where sessions and reps are recorded.
+        - patient (str): Initial patient name of the tile.
+        """
+        super().__init__()
+        self.worker = worker
+        self.progress_tracker = progress_tracker
+        self.running = False
+        self.session_id = None
+        self.reps = 0
+        self.points = 0
+
+        self.title_label = QLabel(title)
+        self.title_label.setFont(QFont("Arial", 14, QFont.Bold))
+
+        width, height = worker.frame_size
+        self.video_label = QLabel()
+        self.video_label.setFixedSize(width, height)
+        self.video_label.setStyleSheet("border: 2px solid #555;")
+        self.video_label.setAlignment(Qt.AlignCenter)
+
+        self.patient_edit = QLineEdit(patient)
+        self.patient_edit.setPlaceholderText("Patient")
+        self.patient_edit.setFixedWidth(140)
+        self.exercise_combo = QComboBox()
+        self.exercise_combo.addItems(EXERCISE_CLASSES.keys())
+        self.exercise_combo.currentTextChanged.connect(self.change_exercise)
+        self.start_button = QPushButton("Start")
+        self.start_button.setFixedWidth(100)
+        self.start_button.clicked.connect(self.toggle_exercise)
+
+        self.reps_label = QLabel("Repetitions: 0")
+        self.reps_label.setFont(QFont("Arial", 14))
+        self.feedback_label = QLabel("Feedback: Ready")
+        self.feedback_label.setFont(QFont("Arial", 14, QFont.Bold))
+        self.feedback_label.setProperty('tone', 'info')
+        self.feedback_label.setStyleSheet(FEEDBACK_STYLE)
+
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(self.patient_edit)
+        controls_layout.addWidget(self.exercise_combo)
+        controls_layout.addWidget(self.start_button)
+        controls_layout.addStretch()
+
+        metrics_layout = QHBoxLayout()
+        metrics_layout.addWidget(self.reps_label)
+        metrics_layout.addWidget(self.feedback_label)
+        metrics_layout.addStretch()
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.title_label)
+        layout.addWidget(self.video_label)
+        layout.addLayout(controls_layout)
+        layout.addLayout(metrics_layout)
+        self.setLayout(layout)
+
+        self.view_model = ViewModel(rate=10.0)
+        self.view_model.bind('reps', self.reps_label.setText, lambda v: f"Repetitions: {v}")
+        self.view_model.bind('feedback', self.feedback_label.setText, lambda v: f"Feedback: {v}")
+        self.view_model.bind_property('tone', self.feedback_label, 'tone',
+                                      lambda v: FEEDBACK_TONES.get(v, 'info'))
+
+    @property
+    def exercise(self):
+        return self.exercise_combo.currentText()
+
+    def change_exercise(self, exercise_name):
+        """
+        Switch the tile's exercise; a running session is ended first.
+        """
+        if self.running:
+            self.toggle_exercise()
+        self.worker.set_exercise(exercise_name)
+
+    def toggle_exercise(self):
+        """
+        Start or stop the exercise session of this camera.
+        """
+        self.running = not self.running
+        if self.running:
+            self.reps = 0
+            self.points = 0
+            patient = self.patient_edit.text().strip() or self.progress_tracker.patient
+            self.session_id = self.progress_tracker.start_session(self.exercise, patient=patient)
+            self.start_button.setText("Stop")
+        else:
+            if self.session_id is not None:
+                self.progress_tracker.end_session(self.session_id, self.reps, self.points)
+                self.session_id = None
+            self.start_button.setText("Start")
+        self.patient_edit.setEnabled(not self.running)
+        self.worker.set_running(self.running)
+        self.view_model.set(reps=self.reps, feedback="Ready", tone="Ready")
+        self.view_model.flush(force=True)
+
+    def refresh(self):
+        """
+        Apply the worker's messages and show its newest frame.
+        """
+        for kind, exercise, payload in self.worker.poll():
+            if kind == 'metrics' and self.running and exercise == self.exercise:
+                if payload['reps'] is not None:
+                    self.reps = payload['reps']
+                self.points = payload['points']
+                self.view_model.set(reps=self.reps, feedback=payload['feedback'], tone=payload['feedback'])
+            elif kind == 'reps' and self.session_id is not None and exercise == self.exercise:
+                self.progress_tracker.record_rep_events(self.session_id, payload)
+            elif kind == 'error':
+                self.title_label.setText(f"{self.title_label.text()} - {payload}")
+        self.view_model.flush()
+        self.worker.show_frame(lambda frame: self.video_label.setPixmap(convert_cv_qt(frame, is_rgb=True)))
+
+    def close_session(self):
+        if self.running:
+            self.toggle_exercise()
+
+
+class StationWindow(QMainWindow):
+    def __init__(self, sources, focus_side='right', max_width=1600):
+        """
+        Supervise several patients at once: one tile per camera, each backed by
+        its own worker process on its own share of the CPU cores.
+
+        Parameters:
+        - sources (list): Camera indices and/or video file paths.
+        - focus_side (str): 'left' or 'right'.
+        - max_width (int): Width the grid of video frames may take, in pixels.
+        """
+        super().__init__()
+        self.setWindowTitle("Rehabilitation Exercise Station")
+        self.apply_stylesheet()
+
+        # Frames are rendered by the workers at tile size, 4:3
+        columns = math.ceil(math.sqrt(len(sources)))
+        width = min(640, max_width // columns) // 4 * 4
+        frame_size = (width, width * 3 // 4)
+
+        self.progress_tracker = ProgressTracker()
+        self.workers = []
+        self.tiles = []
+        grid = QGridLayout()
+        for i, (source, cores) in enumerate(zip(sources, split_cores(len(sources)))):
+            worker = CameraWorker(source, frame_size=frame_size, focus_side=focus_side, cores=cores)
+            worker.start()
+            tile = CameraTile(worker, f"Camera {source}", self.progress_tracker, f"patient-{i + 1}")
+            self.workers.append(worker)
+            self.tiles.append(tile)
+            grid.addWidget(tile, i // columns, i % columns)
+
+        central_widget = QWidget()
+        central_widget.setLayout(grid)
+        self.setCentralWidget(central_widget)
+
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.update_tiles)
+        self.timer.start(15)  # 15 ms
+
+    def apply_stylesheet(self):
+        """
+        Apply the QSS stylesheet to the application.
+        """
+        style_path = os.path.join('assets', 'styles', 'style.qss')
+        if os.path.exists(style_path):
+            with open(style_path, 'r') as f:
+                self.setStyleSheet(f.read())
+        else:
+            print("Style sheet not found. Proceeding without it.")
+
+    def update_tiles(self):
+        for tile in self.tiles:
+            tile.refresh()
+
+    def closeEvent(self, event):
+        """
+        End running sessions, stop the camera workers and close the database.
+        """
+        self.timer.stop()
+        for tile in self.tiles:
+            tile.close_session()
+        for worker in self.workers:
+            worker.stop()
+        self.progress_tracker.close()
+        event.accept()
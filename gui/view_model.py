@@ -0,0 +1,104 @@
+# gui/view_model.py
+
+import time
+
+# Feedback message -> value of the feedback label's 'tone' property; anything else is 'info'
+FEEDBACK_TONES = {
+    "Good Rep": 'good',
+    "Go Up": 'warning',
+    "Keep Your Back Straight": 'alert',
+}
+
+# Stylesheet of a feedback label, coloring it by its 'tone' property
+FEEDBACK_STYLE = """
+    QLabel[tone="info"] { color: blue; }
+    QLabel[tone="good"] { color: green; }
+    QLabel[tone="warning"] { color: orange; }
+    QLabel[tone="alert"] { color: red; }
+"""
+
+
+class ViewModel:
+    def __init__(self, rate=10.0, clock=time.perf_counter):
+        """
+        Push values to widgets only when they change, at a limited rate.
+
+        Values can be set as often as frames arrive; flush() applies the latest
+        ones at most `rate` times per second and skips every widget whose
+        displayed value would stay the same.
+
+        Parameters:
+        - rate (float): Maximum flushes per second, or None for no limit.
+        - clock (callable): Returns the current time in seconds.
+        """
+        self.interval = 1.0 / rate if rate else 0.0
+        self.clock = clock
+        self._bindings = {}
+        self._shown = {}
+        self._pending = {}
+        self._last_flush = None
+
+    def bind(self, name, setter, formatter=None):
+        """
+        Bind a value to a widget setter.
+
+        Parameters:
+        - name (str): Value name.
+        - setter (callable): Called with the formatted value, e.g. label.setText.
+        - formatter (callable): Turns the value into what the setter takes.
+        """
+        self._bindings[name] = (setter, formatter)
+
+    def bind_property(self, name, widget, prop, mapping):
+        """
+        Bind a value to a dynamic property that the widget's stylesheet selects on.
+
+        Switching a property only re-polishes the widget; its stylesheet is
+        parsed once, when it is set up.
+
+        Parameters:
+        - name (str): Value name.
+        - widget (QWidget): Widget to update.
+        - prop (str): Dynamic property name.
+        - mapping (callable): Turns the value into the property value.
+        """
+        def setter(value):
+            widget.setProperty(prop, value)
+            style = widget.style()
+            style.unpolish(widget)
+            style.polish(widget)
+        self.bind(name, setter, mapping)
+
+    def set(self, **values):
+        """
+        Record new values; they are applied by the next flush().
+        """
+        self._pending.update(values)
+
+    def flush(self, force=False):
+        """
+        Apply pending values whose displayed form changed.
+
+        Parameters:
+        - force (bool): Apply now even if the last flush was too recent.
+
+        Returns:
+        - int: Number of widgets updated.
+        """
+        now = self.clock()
+        if not self._pending or (not force and self._last_flush is not None
+                                 and now - self._last_flush < self.interval):
+            return 0
+        self._last_flush = now
+
+        updated = 0
+        pending, self._pending = self._pending, {}
+        for name, value in pending.items():
+            setter, formatter = self._bindings[name]
+            shown = formatter(value) if formatter is not None else value
+            if name in self._shown and self._shown[name] == shown:
+                continue
+            setter(shown)
+            self._shown[name] = shown
+            updated += 1
+        return updated
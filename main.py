@@ -1,12 +1,55 @@
 # main.py
 
+import argparse
+import logging
 import sys
 from PyQt5.QtWidgets import QApplication
 from gui.main_window import MainWindow
 
+def setup_logging(log_path='app.log'):
+    """
+    Send log records to app.log and the console.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        handlers=[logging.FileHandler(log_path), logging.StreamHandler()],
+    )
+
+def parse_args(argv):
+    """
+    Parse the app's own options; anything else is left for Qt.
+    """
+    parser = argparse.ArgumentParser(description="Rehabilitation Exercise App")
+    parser.add_argument('--ingest-server', default=None,
+                        help="host[:port] of a clinic ingest server to upload finished sessions to.")
+    parser.add_argument('--station', default=None, help="Station name on the ingest server.")
+    parser.add_argument('--cameras', nargs='+', metavar='SOURCE',
+                        help="Supervise several cameras (device indices or video files) at once, "
+                             "each with its own inference process.")
+    args, qt_args = parser.parse_known_args(argv)
+    # The station and uploader modules pull in OpenCV, multiprocessing and asyncio,
+    # so they are only imported when their options are given
+    if args.cameras:
+        from modules.station import parse_source
+        args.cameras = [parse_source(source) for source in args.cameras]
+    if args.ingest_server:
+        from modules.uploader import parse_address
+        try:
+            args.ingest_server = parse_address(args.ingest_server)
+        except ValueError:
+            parser.error(f"invalid --ingest-server address: {args.ingest_server}")
+    return args, qt_args
+
 def main():
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    setup_logging()
+    args, qt_args = parse_args(sys.argv[1:])
+    app = QApplication(sys.argv[:1] + qt_args)
+    if args.cameras:
+        from gui.station_window import StationWindow
+        window = StationWindow(args.cameras)
+    else:
+        window = MainWindow(ingest_server=args.ingest_server, station=args.station)
     window.show()
     sys.exit(app.exec_())
 
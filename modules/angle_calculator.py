@@ -2,6 +2,8 @@
 
 import math
 
+import numpy as np
+
 def calculate_angle(a, b, c):
     """
     Calculate the angle between three points.
@@ -30,11 +32,44 @@ def calculate_angle(a, b, c):
         if magnitude_ba == 0 or magnitude_bc == 0:
             return 0
 
-        # Calculate the angle in radians and then convert to degrees
-        angle_rad = math.acos(dot_product / (magnitude_ba * magnitude_bc))
+        # Calculate the angle in radians and then convert to degrees; rounding
+        # can push the cosine just outside [-1, 1] for (anti)parallel vectors
+        cosine = max(-1.0, min(1.0, dot_product / (magnitude_ba * magnitude_bc)))
+        angle_rad = math.acos(cosine)
         angle_deg = math.degrees(angle_rad)
 
         return angle_deg
     except Exception as e:
         print(f"Error calculating angle: {e}")
         return 0
+
+
+def calculate_angles(triples):
+    """
+    Calculate the angle at the middle point for many point triples at once.
+
+    Parameters:
+    - triples (numpy.ndarray): (N, 3, 2) or (N, 3, 3) array of [a, b, c] points,
+      with b as the vertex.
+
+    Returns:
+    - angles (numpy.ndarray): (N,) angles in degrees. Degenerate triples
+      (a or c coinciding with b) give 0, matching calculate_angle; triples
+      with NaN coordinates give NaN.
+    """
+    triples = np.asarray(triples, dtype=np.float64)
+    if triples.ndim != 3 or triples.shape[1] != 3 or triples.shape[2] not in (2, 3):
+        raise ValueError(f"Expected an (N, 3, 2) or (N, 3, 3) array, got {triples.shape}")
+
+    ba = triples[:, 0] - triples[:, 1]
+    bc = triples[:, 2] - triples[:, 1]
+
+    dot_product = np.einsum('ij,ij->i', ba, bc)
+    magnitudes = np.sqrt(np.einsum('ij,ij->i', ba, ba) * np.einsum('ij,ij->i', bc, bc))
+
+    # Missing points (NaN) propagate to NaN angles
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosine = dot_product / magnitudes
+    angles = np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+    angles[magnitudes == 0] = 0.0
+    return angles
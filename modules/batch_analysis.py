@@ -0,0 +1,224 @@
+# modules/batch_analysis.py
+#
+# Headless analysis of recorded exercise videos.
+#
+# Usage:
+#     python -m modules.batch_analysis videos/ extra.mp4 --exercise "Knee Exercise" --workers 4
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+
+from modules.database import ProgressTracker
+from modules.exercises import EXERCISE_CLASSES
+from modules.job_queue import JobQueue
+from modules.joint_angles import JointAngleEngine
+from modules.landmarks import mirror_landmarks
+from modules.pipeline import evaluate_exercise_angles
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v', '.webm')
+
+# One PoseEstimator per worker process, created by _init_worker
+_pose_estimator = None
+
+
+def find_videos(paths, extensions=VIDEO_EXTENSIONS):
+    """
+    Expand files and directories into a sorted list of video files.
+
+    Parameters:
+    - paths (list of str): Video files and/or directories to search recursively.
+    - extensions (tuple): Accepted file extensions (lowercase).
+
+    Returns:
+    - list of str: Absolute paths of the video files found.
+    """
+    videos = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in files:
+                    if name.lower().endswith(extensions):
+                        videos.add(os.path.abspath(os.path.join(root, name)))
+        elif os.path.isfile(path):
+            videos.add(os.path.abspath(path))
+        else:
+            print(f"Skipping missing path: {path}")
+    return sorted(videos)
+
+
+def _init_worker(min_detection_confidence, min_tracking_confidence):
+    """
+    Build the PoseEstimator for this worker process.
+    """
+    global _pose_estimator
+    # Imported here so the parent process never loads the MediaPipe graph
+    from modules.pose_estimation import PoseEstimator
+    _pose_estimator = PoseEstimator(min_detection_confidence=min_detection_confidence,
+                                    min_tracking_confidence=min_tracking_confidence)
+
+
+def analyze_video(path, exercise_name, focus_side='right'):
+    """
+    Run pose estimation and the exercise counter over every frame of a video.
+
+    Landmarks are mirrored as in the live app, where the patient sees the
+    camera image as a mirror, so focus_side means the same side in both.
+
+    Parameters:
+    - path (str): Path of the video file.
+    - exercise_name (str): Name of the exercise performed in the video.
+    - focus_side (str): 'left' or 'right'.
+
+    Returns:
+    - dict: repetitions, points, frames, duration and processing_time for the video.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    exercise = EXERCISE_CLASSES[exercise_name]()
+    joint_engine = JointAngleEngine()
+    frames = []
+    reps, points = 0, 0
+    frame_index = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            timestamp = frame_index / fps
+            inference_start = time.perf_counter()
+            _, results = _pose_estimator.process_frame(frame)
+            inference_time = time.perf_counter() - inference_start
+
+            landmarks = _pose_estimator.get_landmark_array(results)
+            if landmarks is not None:
+                # Mirrored like the live pipeline's, so focus_side picks the same side of the body
+                landmarks = mirror_landmarks(landmarks)
+                angles = joint_engine.compute(landmarks)
+                metrics = evaluate_exercise_angles(exercise_name, exercise, angles, focus_side, timestamp)
+                reps, points = metrics['reps'], metrics['points']
+                frames.append((frame_index, timestamp, metrics['knee_angle'], metrics['back_angle'],
+                               metrics['shoulder_angle'], inference_time))
+            frame_index += 1
+    finally:
+        cap.release()
+
+    return {
+        'repetitions': reps,
+        'points': points,
+        'frames': frames,
+        'duration': frame_index / fps,
+        'processing_time': time.perf_counter() - start,
+    }
+
+
+def run_batch(paths, exercise, db_path='progress.db', workers=None, focus_side='right',
+              retry_failed=False, max_attempts=3, min_detection_confidence=0.5,
+              min_tracking_confidence=0.5):
+    """
+    Queue the given videos and analyze every pending job on a process pool.
+
+    Jobs that were running when a previous run crashed are picked up again;
+    finished jobs are never reprocessed. A video that crashes its worker
+    process is retried until it has been tried max_attempts times.
+
+    Parameters:
+    - paths (list of str): Video files and/or directories.
+    - exercise (str): Name of the exercise performed in the videos.
+    - db_path (str): Path to the SQLite database holding jobs and results.
+    - workers (int): Number of worker processes, or None for one per CPU.
+    - focus_side (str): 'left' or 'right'.
+    - retry_failed (bool): Also retry jobs that failed in an earlier run.
+    - max_attempts (int): Tries before a job that keeps crashing its worker or the run is marked failed.
+    - min_detection_confidence (float): MediaPipe detection confidence.
+    - min_tracking_confidence (float): MediaPipe tracking confidence.
+
+    Returns:
+    - dict: Job counts by status after the run.
+    """
+    job_queue = JobQueue(db_path, max_attempts=max_attempts)
+    progress_tracker = ProgressTracker(db_path)
+    try:
+        job_queue.recover(retry_failed=retry_failed)
+        added = job_queue.add_jobs(find_videos(paths), exercise)
+        jobs = job_queue.claim_pending(exercise)
+        print(f"Queued {added} new video(s); processing {len(jobs)} pending job(s).")
+        # After a worker crash the unfinished jobs run on one worker, in order,
+        # until the job that crashed it is told apart from the ones it took
+        # down; then the pool is back to full size
+        serial = False
+        while jobs:
+            unfinished, crash = [], None
+            with ProcessPoolExecutor(max_workers=1 if serial else workers, initializer=_init_worker,
+                                     initargs=(min_detection_confidence, min_tracking_confidence)) as pool:
+                futures = {pool.submit(analyze_video, path, job_exercise, focus_side): (path, job_exercise)
+                           for path, job_exercise in jobs}
+                for future in as_completed(futures):
+                    path, job_exercise = futures[future]
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as e:
+                        unfinished.append((path, job_exercise))
+                        crash = e
+                        continue
+                    except Exception as e:
+                        print(f"Error analyzing {path}: {e}")
+                        job_queue.mark_failed(path, job_exercise, e)
+                        continue
+
+                    progress_tracker.record_video_analysis(path, job_exercise, result['repetitions'],
+                                                           result['points'], result['frames'],
+                                                           result['duration'], result['processing_time'])
+                    job_queue.mark_done(path, job_exercise)
+                    print(f"{path}: {result['repetitions']} reps in {result['processing_time']:.1f}s")
+            if not unfinished:
+                break
+
+            print(f"Worker pool crashed with {len(unfinished)} job(s) unfinished: {crash}")
+            unfinished.sort(key=jobs.index)
+            if serial:
+                # One worker ran the jobs in order, so the first unfinished one crashed it
+                path, job_exercise = unfinished.pop(0)
+                if job_queue.mark_crashed(path, job_exercise, crash):
+                    print(f"Giving up on {path} after {max_attempts} attempt(s)")
+                serial = False
+            else:
+                serial = True
+            job_queue.release(unfinished)
+            jobs = job_queue.claim_pending(exercise)
+        return job_queue.counts()
+    finally:
+        progress_tracker.close()
+        job_queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze recorded exercise videos without the GUI.")
+    parser.add_argument('paths', nargs='+', help="Video files or directories to analyze.")
+    parser.add_argument('--exercise', default="Knee Exercise", choices=list(EXERCISE_CLASSES),
+                        help="Exercise performed in the videos.")
+    parser.add_argument('--db', default='progress.db', help="SQLite database for jobs and results.")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes.")
+    parser.add_argument('--focus-side', default='right', choices=['left', 'right'])
+    parser.add_argument('--retry-failed', action='store_true', help="Retry jobs that failed before.")
+    parser.add_argument('--max-attempts', type=int, default=3,
+                        help="Tries before a video that crashes its worker or the run is marked failed.")
+    args = parser.parse_args()
+
+    counts = run_batch(args.paths, args.exercise, db_path=args.db, workers=args.workers,
+                       focus_side=args.focus_side, retry_failed=args.retry_failed,
+                       max_attempts=args.max_attempts)
+    print("Jobs: " + ", ".join(f"{status}={n}" for status, n in sorted(counts.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# modules/camera.py
+#
+# Live camera input. CameraSource opens a device with the platform's native
+# backend, negotiates a pixel format, resolution and frame rate, and runs a
+# grabber thread that keeps only the newest frame, so readers never get a
+# frame that sat in the driver's queue. MJPEG frames can be decoded straight
+# to 1/2, 1/4 or 1/8 size, which skips most of the full-resolution decode.
+
+import logging
+import sys
+import threading
+import time
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Tried in order; MJPG gives the full frame rate at high resolutions over USB 2
+DEFAULT_FOURCCS = ('MJPG', 'YUYV')
+
+# imdecode flags that scale a JPEG down while decoding its DCT blocks
+REDUCED_DECODE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def default_backend():
+    """
+    Return the OpenCV capture backend native to this platform.
+    """
+    if sys.platform.startswith('linux'):
+        return cv2.CAP_V4L2
+    if sys.platform == 'win32':
+        return cv2.CAP_DSHOW
+    if sys.platform == 'darwin':
+        return cv2.CAP_AVFOUNDATION
+    return cv2.CAP_ANY
+
+
+def fourcc_code(fourcc):
+    """
+    Turn a four-character code such as 'MJPG' into OpenCV's integer form.
+    """
+    return cv2.VideoWriter_fourcc(*fourcc)
+
+
+def fourcc_name(code):
+    """
+    Turn OpenCV's integer FOURCC property back into its four characters.
+    """
+    code = int(code)
+    return ''.join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+
+
+def reduced_scale(resolution, size):
+    """
+    Pick the largest JPEG decode reduction whose longer side still covers the
+    longer side of a target size. Frames are stretched to the display and
+    inference sizes anyway, so a 16:9 camera is not held to a 4:3 height.
+
+    Parameters:
+    - resolution (tuple): (width, height) of the camera frames.
+    - size (tuple): Smallest (width, height) the frames are used at.
+
+    Returns:
+    - int: 1, 2, 4 or 8.
+
+    >>> reduced_scale((1920, 1080), (796, 596))
+    2
+    >>> reduced_scale((1280, 720), (796, 596))
+    1
+    >>> reduced_scale((1920, 1080), (256, 192))
+    4
+    """
+    longest = max(resolution)
+    needed = max(size)
+    for scale in sorted(REDUCED_DECODE_FLAGS, reverse=True):
+        if longest // scale >= needed:
+            return scale
+    return 1
+
+
+class CameraSource:
+    def __init__(self, index=0, resolution=(1280, 720), fps=30, fourccs=DEFAULT_FOURCCS, backend=None,
+                 decode_size=None):
+        """
+        Open a camera and start grabbing frames in the background.
+
+        Parameters:
+        - index (int): Camera device index.
+        - resolution (tuple): Requested (width, height).
+        - fps (int): Requested frame rate.
+        - fourccs (tuple of str): Pixel formats to try, in order of preference.
+        - backend (int): OpenCV backend, or None for the platform's native one.
+        - decode_size (tuple): Smallest (width, height) the frames are used at, or
+          None for full-size frames. With MJPEG, frames are then decoded at the
+          largest 1/2, 1/4 or 1/8 reduction whose longer side still covers it.
+        """
+        self.index = index
+        self.backend = default_backend() if backend is None else backend
+        self.capture = cv2.VideoCapture(index, self.backend)
+        self.fourcc = None
+        self.resolution = None
+        self.fps = None
+        self.decode_scale = 1
+        self._decode_flag = None
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._encoded = False
+        self._timestamp = None
+        self._seq = 0
+        self._read_seq = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        if not self.capture.isOpened():
+            return
+        self._negotiate(resolution, fps, fourccs)
+        if decode_size is not None and self.fourcc == 'MJPG':
+            self._enable_reduced_decode(reduced_scale(self.resolution, decode_size))
+        self._thread = threading.Thread(target=self._grab_loop, name=f"camera-{index}", daemon=True)
+        self._thread.start()
+
+    def _negotiate(self, resolution, fps, fourccs):
+        """
+        Ask the driver for each pixel format in turn at the requested size and
+        rate, keeping the first one it accepts.
+        """
+        width, height = resolution
+        capture = self.capture
+        for fourcc in fourccs:
+            # V4L2 applies the format first; size and rate are then chosen within it
+            capture.set(cv2.CAP_PROP_FOURCC, fourcc_code(fourcc))
+            capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            capture.set(cv2.CAP_PROP_FPS, fps)
+            if fourcc_name(capture.get(cv2.CAP_PROP_FOURCC)) == fourcc:
+                break
+        # One driver buffer: a frame is never older than the one being captured
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self.fourcc = fourcc_name(capture.get(cv2.CAP_PROP_FOURCC))
+        self.resolution = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                           int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.fps = capture.get(cv2.CAP_PROP_FPS)
+        logger.info("Camera %s: %s %dx%d at %.0f fps", self.index, self.fourcc.strip() or '?',
+                    self.resolution[0], self.resolution[1], self.fps or 0)
+
+    def _enable_reduced_decode(self, scale):
+        """
+        Switch the capture to raw MJPEG buffers, decoded by read_latest() at 1/scale size.
+        """
+        if scale == 1:
+            return
+        if not self.capture.set(cv2.CAP_PROP_CONVERT_RGB, 0):
+            logger.info("Camera %s cannot deliver raw MJPEG; decoding at full size", self.index)
+            return
+        self.decode_scale = scale
+        self._decode_flag = REDUCED_DECODE_FLAGS[scale]
+        logger.info("Camera %s: decoding MJPEG at 1/%d size", self.index, scale)
+
+    def _disable_reduced_decode(self):
+        self.capture.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        self.decode_scale = 1
+        self._decode_flag = None
+
+    def _grab_loop(self):
+        failures = 0
+        while not self._stop_event.is_set():
+            ret, frame = self.capture.read()
+            if not ret:
+                failures += 1
+                if failures == 1:
+                    logger.warning("Camera %s returned no frame", self.index)
+                time.sleep(0.01)
+                continue
+            failures = 0
+            # Some backends accept CONVERT_RGB=0 but keep decoding; use their frames as they are
+            encoded = self._decode_flag is not None and frame.ndim < 3
+            if self._decode_flag is not None and not encoded:
+                logger.info("Camera %s still delivers decoded frames; decoding at full size", self.index)
+                self._disable_reduced_decode()
+            with self._cond:
+                self._frame = frame
+                self._encoded = encoded
+                self._timestamp = time.time()
+                self._seq += 1
+                self._cond.notify_all()
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read_latest(self, timeout=1.0):
+        """
+        Wait for a frame newer than the last one returned, then return the newest.
+        Raw MJPEG frames are decoded here, so frames nobody reads are never decoded.
+
+        Parameters:
+        - timeout (float): Seconds to wait.
+
+        Returns:
+        - (frame, timestamp): The BGR frame and its capture time from time.time(),
+          or (None, None) if no new frame arrived in time.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq != self._read_seq, timeout):
+                return None, None
+            self._read_seq = self._seq
+            frame, encoded, timestamp = self._frame, self._encoded, self._timestamp
+        if encoded:
+            frame = cv2.imdecode(frame.reshape(-1), self._decode_flag or cv2.IMREAD_COLOR)
+            if frame is None:
+                logger.warning("Camera %s delivered a corrupt MJPEG frame", self.index)
+                return None, None
+        return frame, timestamp
+
+    def read(self):
+        """
+        cv2.VideoCapture-compatible read() returning the newest frame.
+        """
+        frame, _ = self.read_latest()
+        return frame is not None, frame
+
+    def release(self):
+        """
+        Stop the grabber thread and close the device.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.capture.release()
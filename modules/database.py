@@ -2,20 +2,77 @@
 
 import sqlite3
 import os
+import pathlib
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from datetime import datetime
 
+_STOP = object()
+
+
+# Local-time day and week (starting Monday) of a "%Y-%m-%d %H:%M:%S" date, as epoch milliseconds
+DAY_SQL = "CAST(strftime('%s', {date}, 'start of day', 'utc') AS INTEGER) * 1000"
+WEEK_SQL = "CAST(strftime('%s', {date}, 'weekday 0', '-6 days', 'start of day', 'utc') AS INTEGER) * 1000"
+ROLLUP_TABLES = {'day': 'progress_daily', 'week': 'progress_weekly'}
+
+
+def epoch_ms(seconds):
+    """
+    Convert epoch seconds to the integer milliseconds stored in the database.
+    """
+    return int(round(seconds * 1000.0))
+
+
+def connect_readonly(db_path, timeout=5.0, check_same_thread=True):
+    """
+    Open a read-only connection to a progress database.
+
+    Readers never take the write lock, so in WAL mode they neither block nor wait
+    for the ProgressTracker writer.
+
+    Parameters:
+    - db_path (str): Path to the SQLite database file.
+    - timeout (float): Seconds to wait for a lock before failing.
+    - check_same_thread (bool): False to allow using the connection from other threads.
+
+    Returns:
+    - sqlite3.Connection: Read-only connection.
+    """
+    uri = pathlib.Path(os.path.abspath(db_path)).as_uri() + '?mode=ro'
+    return sqlite3.connect(uri, uri=True, timeout=timeout, check_same_thread=check_same_thread)
+
+
 class ProgressTracker:
-    def __init__(self, db_path='progress.db'):
+    def __init__(self, db_path='progress.db', batch_size=64, linger=0.05, patient='default'):
         """
         Initialize the ProgressTracker with a SQLite database.
 
+        Writes are queued and committed by a background thread, which groups
+        whatever is queued into one transaction, so callers never wait on disk.
+        The database is switched to WAL mode, letting readers on other
+        connections (see connect_readonly) run alongside the writer.
+
         Parameters:
         - db_path (str): Path to the SQLite database file.
+        - batch_size (int): Maximum writes committed in one transaction.
+        - linger (float): Seconds the writer waits for more writes before committing.
+        - patient (str): Patient that new sessions are recorded for.
         """
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
+        self.patient = patient
+        self.batch_size = batch_size
+        self.linger = linger
+        self.conn = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
         self.create_table()
 
+        self._writes = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="progress-writer", daemon=True)
+        self._writer.start()
+
     def create_table(self):
         """
         Create the progress table if it doesn't exist.
@@ -31,46 +88,469 @@ class ProgressTracker:
                     date TEXT NOT NULL
                 )
             ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_progress_exercise_date ON progress (exercise, date)')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_analysis (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT NOT NULL,
+                    exercise TEXT NOT NULL,
+                    repetitions INTEGER NOT NULL,
+                    points INTEGER NOT NULL,
+                    frames INTEGER NOT NULL,
+                    duration REAL NOT NULL,
+                    processing_time REAL NOT NULL,
+                    date TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS frame_angles (
+                    analysis_id INTEGER NOT NULL REFERENCES video_analysis(id),
+                    frame_index INTEGER NOT NULL,
+                    timestamp REAL NOT NULL,
+                    knee_angle REAL,
+                    back_angle REAL,
+                    shoulder_angle REAL,
+                    inference_time REAL NOT NULL,
+                    PRIMARY KEY (analysis_id, frame_index)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_analysis_path ON video_analysis (path, exercise)')
+            # Sessions, their reps and summaries; times are integer epoch milliseconds
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY,
+                    patient TEXT NOT NULL,
+                    exercise TEXT NOT NULL,
+                    goal INTEGER,
+                    started_at INTEGER NOT NULL,
+                    ended_at INTEGER
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_sessions_patient_exercise_time
+                ON sessions (patient, exercise, started_at)
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS rep_events (
+                    session_id INTEGER NOT NULL REFERENCES sessions(id),
+                    rep INTEGER NOT NULL,
+                    started_at INTEGER NOT NULL,
+                    ended_at INTEGER NOT NULL,
+                    min_angle REAL,
+                    max_angle REAL,
+                    hold_ms INTEGER,
+                    feedback TEXT,
+                    PRIMARY KEY (session_id, rep)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS session_summaries (
+                    session_id INTEGER PRIMARY KEY REFERENCES sessions(id),
+                    repetitions INTEGER NOT NULL,
+                    points INTEGER NOT NULL,
+                    duration_ms INTEGER NOT NULL,
+                    reps_recorded INTEGER NOT NULL,
+                    mean_rep_ms REAL,
+                    mean_hold_ms REAL,
+                    min_angle REAL,
+                    max_angle REAL
+                )
+            ''')
+            # Per-exercise totals by day and week, kept up to date by record_progress
+            for period, table in ROLLUP_TABLES.items():
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        exercise TEXT NOT NULL,
+                        {period} INTEGER NOT NULL,
+                        sessions INTEGER NOT NULL,
+                        repetitions INTEGER NOT NULL,
+                        points INTEGER NOT NULL,
+                        best_repetitions INTEGER NOT NULL,
+                        PRIMARY KEY (exercise, {period})
+                    ) WITHOUT ROWID
+                ''')
+            self._backfill_rollups(cursor)
             self.conn.commit()
         except sqlite3.Error as e:
             print(f"Error creating table: {e}")
 
+    def _backfill_rollups(self, cursor):
+        """
+        Build the rollups from the progress table if they are empty, e.g. for a
+        database written before the rollups existed.
+        """
+        for period, table in ROLLUP_TABLES.items():
+            if cursor.execute(f'SELECT 1 FROM {table} LIMIT 1').fetchone() is not None:
+                continue
+            start = (DAY_SQL if period == 'day' else WEEK_SQL).format(date='date')
+            cursor.execute(f'''
+                INSERT INTO {table} (exercise, {period}, sessions, repetitions, points, best_repetitions)
+                SELECT exercise, {start}, COUNT(*), SUM(repetitions), SUM(points), MAX(repetitions)
+                FROM progress
+                GROUP BY 1, 2
+            ''')
+
+    def _submit(self, write):
+        """
+        Queue a write for the writer thread.
+
+        Parameters:
+        - write (callable): Takes a cursor and performs the write; runs inside a transaction.
+
+        Returns:
+        - concurrent.futures.Future: Resolves to the write's return value once committed.
+        """
+        future = Future()
+        self._writes.put((write, future))
+        return future
+
+    def _write_loop(self):
+        """
+        Commit queued writes in batches until close() is called.
+        """
+        stopping = False
+        while not stopping:
+            batch = [self._writes.get()]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._writes.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            if _STOP in batch:
+                stopping = True
+                batch = [item for item in batch if item is not _STOP]
+            self._commit(batch)
+            for _ in range(len(batch) + stopping):
+                self._writes.task_done()
+
+    def _commit(self, batch):
+        """
+        Run a batch of writes in one transaction. If the transaction fails, each
+        write is retried in its own so one bad write does not lose the others.
+        """
+        if not batch:
+            return
+        try:
+            with self.conn:
+                cursor = self.conn.cursor()
+                results = [write(cursor) for write, _ in batch]
+        except Exception:
+            if len(batch) > 1:
+                for item in batch:
+                    self._commit([item])
+                return
+            write, future = batch[0]
+            try:
+                with self.conn:
+                    result = write(self.conn.cursor())
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
     def record_progress(self, exercise, repetitions, points):
         """
-        Record the progress of an exercise.
+        Record the progress of an exercise. Returns immediately; the row is
+        committed by the writer thread, together with the day and week rollups.
 
         Parameters:
         - exercise (str): Name of the exercise.
         - repetitions (int): Number of repetitions completed.
         - points (int): Points earned.
+
+        Returns:
+        - concurrent.futures.Future: Resolves once the row is committed.
         """
-        try:
-            cursor = self.conn.cursor()
+        date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        row = {'exercise': exercise, 'repetitions': repetitions, 'points': points, 'date': date}
+
+        def write(cursor):
             cursor.execute('''
                 INSERT INTO progress (exercise, repetitions, points, date)
+                VALUES (:exercise, :repetitions, :points, :date)
+            ''', row)
+            for period, table in ROLLUP_TABLES.items():
+                start = (DAY_SQL if period == 'day' else WEEK_SQL).format(date=':date')
+                cursor.execute(f'''
+                    INSERT INTO {table} (exercise, {period}, sessions, repetitions, points, best_repetitions)
+                    VALUES (:exercise, {start}, 1, :repetitions, :points, :repetitions)
+                    ON CONFLICT (exercise, {period}) DO UPDATE SET
+                        sessions = sessions + 1,
+                        repetitions = repetitions + excluded.repetitions,
+                        points = points + excluded.points,
+                        best_repetitions = MAX(best_repetitions, excluded.best_repetitions)
+                ''', row)
+
+        future = self._submit(write)
+        future.add_done_callback(_report_error("Error recording progress"))
+        return future
+
+    def record_video_analysis(self, path, exercise, repetitions, points, frames,
+                              duration, processing_time):
+        """
+        Record the result of analyzing a recorded exercise video, replacing any
+        earlier result for the same video and exercise.
+
+        Parameters:
+        - path (str): Path of the analyzed video.
+        - exercise (str): Name of the exercise.
+        - repetitions (int): Number of repetitions counted.
+        - points (int): Points earned.
+        - frames (list of tuples): (frame_index, timestamp, knee_angle, back_angle,
+          shoulder_angle, inference_time) for every analyzed frame.
+        - duration (float): Video duration in seconds.
+        - processing_time (float): Wall-clock seconds spent analyzing the video.
+
+        Returns:
+        - int: The id of the new video_analysis row, or None on error.
+        """
+        date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [tuple(frame) for frame in frames]
+
+        def write(cursor):
+            # A video analyzed again, e.g. after a run was killed before its job
+            # was marked done, replaces its earlier result instead of adding one
+            cursor.execute('''
+                DELETE FROM frame_angles WHERE analysis_id IN
+                    (SELECT id FROM video_analysis WHERE path = ? AND exercise = ?)
+            ''', (path, exercise))
+            cursor.execute('DELETE FROM video_analysis WHERE path = ? AND exercise = ?', (path, exercise))
+            cursor.execute('''
+                INSERT INTO video_analysis (path, exercise, repetitions, points, frames,
+                                            duration, processing_time, date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (path, exercise, repetitions, points, len(rows), duration, processing_time, date))
+            analysis_id = cursor.lastrowid
+            cursor.executemany('''
+                INSERT INTO frame_angles (analysis_id, frame_index, timestamp, knee_angle,
+                                          back_angle, shoulder_angle, inference_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(analysis_id,) + row for row in rows])
+            return analysis_id
+
+        try:
+            return self._submit(write).result()
+        except sqlite3.Error as e:
+            print(f"Error recording video analysis: {e}")
+            return None
+
+    def start_session(self, exercise, goal=None, started_at=None, patient=None):
+        """
+        Create a session that rep events and a summary are recorded against.
+        Waits for the row to be committed, since its id is needed.
+
+        Parameters:
+        - exercise (str): Name of the exercise.
+        - goal (int): Target repetitions, if any.
+        - started_at (float): Start time in epoch seconds, or None for now.
+        - patient (str): Patient, or None for the tracker's patient.
+
+        Returns:
+        - int: The session id, or None on error.
+        """
+        started_at = epoch_ms(time.time() if started_at is None else started_at)
+        patient = self.patient if patient is None else patient
+
+        def write(cursor):
+            cursor.execute('''
+                INSERT INTO sessions (patient, exercise, goal, started_at)
                 VALUES (?, ?, ?, ?)
-            ''', (exercise, repetitions, points, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-            self.conn.commit()
+            ''', (patient, exercise, goal, started_at))
+            return cursor.lastrowid
+
+        try:
+            return self._submit(write).result()
+        except sqlite3.Error as e:
+            print(f"Error starting session: {e}")
+            return None
+
+    def record_rep_events(self, session_id, events, time_offset=0.0):
+        """
+        Queue the reps of a session for a bulk insert. Returns immediately.
+
+        Parameters:
+        - session_id (int): Session from start_session().
+        - events (list of dict): Events from ExerciseCounter.pop_events().
+        - time_offset (float): Seconds added to the event times to make them
+          epoch seconds, e.g. the start time of a recorded video.
+
+        Returns:
+        - concurrent.futures.Future: Resolves once the events are committed.
+        """
+        rows = [(session_id, event['rep'], epoch_ms(event['start'] + time_offset),
+                 epoch_ms(event['end'] + time_offset), event['min_angle'], event['max_angle'],
+                 epoch_ms(event['hold']), event['feedback'])
+                for event in events]
+
+        def write(cursor):
+            cursor.executemany('''
+                INSERT OR REPLACE INTO rep_events (session_id, rep, started_at, ended_at,
+                                                   min_angle, max_angle, hold_ms, feedback)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+        future = self._submit(write)
+        future.add_done_callback(_report_error("Error recording rep events"))
+        return future
+
+    def end_session(self, session_id, repetitions, points, ended_at=None):
+        """
+        Close a session and store its summary, aggregated from its rep events.
+        Returns immediately; rep events queued before this call are included.
+
+        Parameters:
+        - session_id (int): Session from start_session().
+        - repetitions (int): Repetitions completed.
+        - points (int): Points earned.
+        - ended_at (float): End time in epoch seconds, or None for now.
+
+        Returns:
+        - concurrent.futures.Future: Resolves once the summary is committed.
+        """
+        ended_at = epoch_ms(time.time() if ended_at is None else ended_at)
+
+        def write(cursor):
+            cursor.execute('UPDATE sessions SET ended_at = ? WHERE id = ?', (ended_at, session_id))
+            cursor.execute('''
+                INSERT OR REPLACE INTO session_summaries (session_id, repetitions, points, duration_ms,
+                                                          reps_recorded, mean_rep_ms, mean_hold_ms,
+                                                          min_angle, max_angle)
+                SELECT s.id, ?, ?, s.ended_at - s.started_at, COUNT(r.rep),
+                       AVG(r.ended_at - r.started_at), AVG(r.hold_ms), MIN(r.min_angle), MAX(r.max_angle)
+                FROM sessions s LEFT JOIN rep_events r ON r.session_id = s.id
+                WHERE s.id = ?
+                GROUP BY s.id
+            ''', (repetitions, points, session_id))
+
+        future = self._submit(write)
+        future.add_done_callback(_report_error("Error ending session"))
+        return future
+
+    def get_sessions(self, exercise=None, since=None, until=None, patient=None):
+        """
+        Retrieve finished sessions with their summaries, oldest first.
+
+        Parameters:
+        - exercise (str): Only this exercise, or None for all.
+        - since (float): Only sessions started at or after this epoch second.
+        - until (float): Only sessions started before this epoch second.
+        - patient (str): Patient, or None for the tracker's patient.
+
+        Returns:
+        - list of tuples: (session_id, exercise, started_at, ended_at, repetitions,
+          points, duration_ms, reps_recorded, mean_rep_ms, mean_hold_ms, min_angle,
+          max_angle), with times in epoch milliseconds.
+        """
+        conditions = ['s.patient = ?']
+        params = [self.patient if patient is None else patient]
+        if exercise is not None:
+            conditions.append('s.exercise = ?')
+            params.append(exercise)
+        if since is not None:
+            conditions.append('s.started_at >= ?')
+            params.append(epoch_ms(since))
+        if until is not None:
+            conditions.append('s.started_at < ?')
+            params.append(epoch_ms(until))
+
+        self.flush()
+        try:
+            conn = connect_readonly(self.db_path)
+            try:
+                return conn.execute(f'''
+                    SELECT s.id, s.exercise, s.started_at, s.ended_at, m.repetitions, m.points,
+                           m.duration_ms, m.reps_recorded, m.mean_rep_ms, m.mean_hold_ms,
+                           m.min_angle, m.max_angle
+                    FROM sessions s JOIN session_summaries m ON m.session_id = s.id
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY s.started_at
+                ''', params).fetchall()
+            finally:
+                conn.close()
         except sqlite3.Error as e:
-            print(f"Error recording progress: {e}")
+            print(f"Error fetching sessions: {e}")
+            return []
+
+    def get_rollups(self, exercise, period='day', since=None, until=None):
+        """
+        Retrieve the pre-aggregated progress of an exercise, oldest first.
+
+        Parameters:
+        - exercise (str): Name of the exercise.
+        - period (str): 'day' or 'week'.
+        - since (float): Only periods starting at or after this epoch second.
+        - until (float): Only periods starting before this epoch second.
+
+        Returns:
+        - list of tuples: (start, sessions, repetitions, points, best_repetitions),
+          with start in epoch milliseconds.
+        """
+        table = ROLLUP_TABLES[period]
+        since = epoch_ms(since) if since is not None else -2 ** 63
+        until = epoch_ms(until) if until is not None else 2 ** 63 - 1
+
+        self.flush()
+        try:
+            conn = connect_readonly(self.db_path)
+            try:
+                return conn.execute(f'''
+                    SELECT {period}, sessions, repetitions, points, best_repetitions
+                    FROM {table}
+                    WHERE exercise = ? AND {period} >= ? AND {period} < ?
+                    ORDER BY {period}
+                ''', (exercise, since, until)).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Error fetching rollups: {e}")
+            return []
 
     def get_all_progress(self):
         """
-        Retrieve all progress records.
+        Retrieve all progress records, including writes still queued.
 
         Returns:
         - list of tuples: Each tuple represents a progress record.
         """
+        self.flush()
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('SELECT * FROM progress')
-            return cursor.fetchall()
+            conn = connect_readonly(self.db_path)
+            try:
+                return conn.execute('SELECT * FROM progress').fetchall()
+            finally:
+                conn.close()
         except sqlite3.Error as e:
             print(f"Error fetching progress: {e}")
             return []
 
+    def flush(self):
+        """
+        Block until every queued write is committed.
+        """
+        self._writes.join()
+
     def close(self):
         """
-        Close the database connection.
+        Commit the queued writes, stop the writer thread and close the database connection.
         """
+        if self._writer.is_alive():
+            self._writes.put(_STOP)
+            self._writer.join()
         self.conn.close()
+
+
+def _report_error(message):
+    """
+    Return a Future callback that prints the error of a failed write.
+    """
+    def report(future):
+        error = future.exception()
+        if error is not None:
+            print(f"{message}: {error}")
+    return report
@@ -3,7 +3,8 @@
 import time
 
 class ExerciseCounter:
-    def __init__(self, angle_threshold, min_hold_time=0.5, reverse=False):
+    def __init__(self, angle_threshold, min_hold_time=0.5, reverse=False, clock=time.time,
+                 record_events=True):
         """
         Initialize the ExerciseCounter.
 
@@ -11,28 +12,54 @@ class ExerciseCounter:
         - angle_threshold (float): The angle threshold to consider a rep complete.
         - min_hold_time (float): Minimum time in seconds to hold a position before counting.
         - reverse (bool): If True, counts reps when angle drops below the threshold first.
+        - clock (callable): Returns the current time in seconds when update() gets no timestamp.
+        - record_events (bool): Keep an event per completed rep for pop_events(). Turn
+          off for counters whose events are never collected, so they do not pile up.
         """
         self.angle_threshold = angle_threshold
         self.min_hold_time = min_hold_time
         self.reverse = reverse
-        self.state = not reverse  # Initialize based on direction
+        self.clock = clock
+        self.record_events = record_events
+        self.state = None  # Set by the first update()
         self.last_time = 0
         self.count = 0
+        self.events = []  # Completed reps not yet collected with pop_events()
+        self._rep_start = None
+        self._rep_min = None
+        self._rep_max = None
+        self._rep_feedback = "Good Rep"
 
-    def update(self, angle):
+    def update(self, angle, timestamp=None):
         """
         Update the counter based on the current angle.
 
         Parameters:
         - angle (float): The current angle.
+        - timestamp (float): Time of the frame in seconds, or None to read the clock.
 
         Returns:
         - reps (int): Total repetitions.
         - feedback (str): Feedback message.
         """
-        current_time = time.time()
+        current_time = timestamp if timestamp is not None else self.clock()
         feedback = "Good Rep"
 
+        if self.state is None:
+            # The first frame decides whether the position is already held, and the
+            # hold is timed from it, so starting short of the threshold is no rep
+            self.state = angle < self.angle_threshold if self.reverse else angle > self.angle_threshold
+            self.last_time = current_time
+
+        # Track the angle range of the rep in progress
+        if self._rep_start is None:
+            self._rep_start = current_time
+            self._rep_min = self._rep_max = angle
+        elif angle < self._rep_min:
+            self._rep_min = angle
+        elif angle > self._rep_max:
+            self._rep_max = angle
+
         if not self.reverse:
             # Original Logic: Detect crossing above
             if not self.state and angle > self.angle_threshold:
@@ -42,8 +69,10 @@ class ExerciseCounter:
                 if current_time - self.last_time >= self.min_hold_time:
                     self.count += 1
                     self.state = False
+                    self._complete_rep(current_time)
                 else:
                     feedback = "Hold position longer"
+                    self._rep_feedback = feedback
         else:
             # Reverse Logic: Detect crossing below
             if not self.state and angle < self.angle_threshold:
@@ -53,7 +82,39 @@ class ExerciseCounter:
                 if current_time - self.last_time >= self.min_hold_time:
                     self.count += 1
                     self.state = False
+                    self._complete_rep(current_time)
                 else:
                     feedback = "Hold position longer"
+                    self._rep_feedback = feedback
 
         return self.count, feedback
+
+    def _complete_rep(self, end_time):
+        """
+        Store the rep that just completed as an event and start tracking the next.
+        """
+        if self.record_events:
+            self.events.append({
+                'rep': self.count,
+                'start': self._rep_start,
+                'end': end_time,
+                'min_angle': self._rep_min,
+                'max_angle': self._rep_max,
+                'hold': end_time - max(self.last_time, self._rep_start),
+                'feedback': self._rep_feedback,
+            })
+        self._rep_start = None
+        self._rep_feedback = "Good Rep"
+
+    def pop_events(self):
+        """
+        Return the reps completed since the last call and forget them.
+
+        Returns:
+        - list of dict: One dict per rep with rep (its number), start and end
+          (seconds), min_angle and max_angle (degrees), hold (seconds held
+          before the rep counted) and feedback ("Good Rep", or the last
+          correction given during the rep).
+        """
+        events, self.events = self.events, []
+        return events
@@ -0,0 +1,23 @@
+# modules/exercises/__init__.py
+
+from modules.exercises.knee_exercise import KneeExercise
+from modules.exercises.shoulder_exercise import ShoulderExercise
+from modules.exercises.back_exercise import BackExercise
+from modules.exercises.squat_exercise import SquatExercise
+
+EXERCISE_CLASSES = {
+    "Knee Exercise": KneeExercise,
+    "Shoulder Exercise": ShoulderExercise,
+    "Back Exercise": BackExercise,
+    "Squat Exercise": SquatExercise,
+}
+
+
+def create_exercises():
+    """
+    Create one instance of every supported exercise.
+
+    Returns:
+    - dict: Exercise name -> exercise module.
+    """
+    return {name: cls() for name, cls in EXERCISE_CLASSES.items()}
@@ -1,29 +1,36 @@
 # modules/exercises/back_exercise.py
 
+import time
+
 from modules.exercise_counter import ExerciseCounter
 from modules.gamification import Gamification
 from modules.angle_calculator import calculate_angle
 
 class BackExercise:
+    JOINT = 'back'
+
     def __init__(self,
                  back_angle_threshold=160,
-                 min_hold_time=0.5):
+                 min_hold_time=0.5,
+                 clock=time.time):
         """
         Initialize the BackExercise with specific parameters.
 
         Parameters:
         - back_angle_threshold (float): Angle above which the back is considered straight.
         - min_hold_time (float): Minimum time in seconds to hold a position before counting.
+        - clock (callable): Time source used when process() gets no timestamp.
         """
-        self.counter = ExerciseCounter(back_angle_threshold, min_hold_time)
+        self.counter = ExerciseCounter(back_angle_threshold, min_hold_time, clock=clock)
         self.gamification = Gamification()
 
-    def process(self, landmarks):
+    def process(self, landmarks, timestamp=None):
         """
         Process the landmarks to update the back exercise counter and gamification.
 
         Parameters:
         - landmarks (dict): Contains the x and y coordinates of left_shoulder, right_shoulder, left_hip, right_hip.
+        - timestamp (float): Time of the frame in seconds, or None to use the clock.
 
         Returns:
         - reps (int): Total repetitions.
@@ -43,17 +50,63 @@ class BackExercise:
             shoulder = [(left_shoulder[0] + right_shoulder[0]) / 2, (left_shoulder[1] + right_shoulder[1]) / 2]
             back_angle = calculate_angle(left_shoulder, hip, shoulder)
 
-            reps, feedback = self.counter.update(back_angle)
-
-            if feedback == "Good Rep":
-                self.gamification.add_points(1)
-                points = self.gamification.get_points()
-                achievements = self.gamification.get_achievements().copy()
-            else:
-                points = self.gamification.get_points()
-                achievements = self.gamification.get_achievements().copy()
-
-            return reps, feedback, points, achievements, back_angle
+            return self.update(back_angle, timestamp)
         except KeyError as e:
             print(f"Error processing exercise: {e}")
             return self.counter.count, "Error", self.gamification.get_points(), [], None
+
+    def process_angles(self, angles, focus_side='right', timestamp=None):
+        """
+        Update the exercise from precomputed joint angles.
+
+        Parameters:
+        - angles (JointAngles): Joint angles of the current frame.
+        - focus_side (str): 'left' or 'right'.
+        - timestamp (float): Time of the frame in seconds, or None to use the clock.
+
+        Returns:
+        - Same as process().
+        """
+        back_angle = angles.get(self.joint_name(focus_side))
+        if back_angle is None:
+            return self.counter.count, "Error", self.gamification.get_points(), [], None
+        return self.update(back_angle, timestamp)
+
+    def pop_rep_events(self):
+        """
+        Return the reps completed since the last call, see ExerciseCounter.pop_events().
+        """
+        return self.counter.pop_events()
+
+    def joint_name(self, focus_side='right'):
+        """
+        Name of the joint angle this exercise counts reps on.
+        """
+        return self.JOINT.format(side=focus_side.lower())
+
+    def update(self, back_angle, timestamp=None):
+        """
+        Update the counter and gamification from the current angle.
+
+        Parameters:
+        - back_angle (float): Current angle in degrees.
+        - timestamp (float): Time of the frame in seconds, or None to use the clock.
+
+        Returns:
+        - reps (int): Total repetitions.
+        - feedback (str): Feedback message.
+        - points (int): Total points.
+        - achievements (list): List of unlocked achievements.
+        - back_angle (float): Current back angle.
+        """
+        reps, feedback = self.counter.update(back_angle, timestamp)
+
+        if feedback == "Good Rep":
+            self.gamification.add_points(1)
+            points = self.gamification.get_points()
+            achievements = self.gamification.get_achievements().copy()
+        else:
+            points = self.gamification.get_points()
+            achievements = self.gamification.get_achievements().copy()
+
+        return reps, feedback, points, achievements, back_angle
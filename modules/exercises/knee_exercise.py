@@ -1,29 +1,36 @@
 # modules/exercises/knee_exercise.py
 
+import time
+
 from modules.exercise_counter import ExerciseCounter
 from modules.gamification import Gamification
 from modules.angle_calculator import calculate_angle
 
 class KneeExercise:
+    JOINT = '{side}_knee'
+
     def __init__(self,
                  angle_threshold_down=160,
-                 min_hold_time=0.5):
+                 min_hold_time=0.5,
+                 clock=time.time):
         """
         Initialize the KneeExercise with specific parameters.
 
         Parameters:
         - angle_threshold_down (float): Angle below which the squat is considered down.
         - min_hold_time (float): Minimum time in seconds to hold a position before counting.
+        - clock (callable): Time source used when process() gets no timestamp.
         """
-        self.counter = ExerciseCounter(angle_threshold_down, min_hold_time)
+        self.counter = ExerciseCounter(angle_threshold_down, min_hold_time, clock=clock)
         self.gamification = Gamification()
 
-    def process(self, landmarks):
+    def process(self, landmarks, timestamp=None):
         """
         Process the landmarks to update the knee exercise counter and gamification.
 
         Parameters:
         - landmarks (dict): Contains the x and y coordinates of hip, knee, ankle.
+        - timestamp (float): Time of the frame in seconds, or None to use the clock.
 
         Returns:
         - reps (int): Total repetitions.
@@ -39,17 +46,63 @@ class KneeExercise:
 
             knee_angle = calculate_angle(hip, knee, ankle)
 
-            reps, feedback = self.counter.update(knee_angle)
-
-            if feedback == "Good Rep":
-                self.gamification.add_points(1)
-                points = self.gamification.get_points()
-                achievements = self.gamification.get_achievements().copy()
-            else:
-                points = self.gamification.get_points()
-                achievements = self.gamification.get_achievements().copy()
-
-            return reps, feedback, points, achievements, knee_angle
+            return self.update(knee_angle, timestamp)
         except KeyError as e:
             print(f"Error processing exercise: {e}")
             return self.counter.count, "Error", self.gamification.get_points(), [], None
+
+    def process_angles(self, angles, focus_side='right', timestamp=None):
+        """
+        Update the exercise from precomputed joint angles.
+
+        Parameters:
+        - angles (JointAngles): Joint angles of the current frame.
+        - focus_side (str): 'left' or 'right'.
+        - timestamp (float): Time of the frame in seconds, or None to use the clock.
+
+        Returns:
+        - Same as process().
+        """
+        knee_angle = angles.get(self.joint_name(focus_side))
+        if knee_angle is None:
+            return self.counter.count, "Error", self.gamification.get_points(), [], None
+        return self.update(knee_angle, timestamp)
+
+    def pop_rep_events(self):
+        """
+        Return the reps completed since the last call, see ExerciseCounter.pop_events().
+        """
+        return self.counter.pop_events()
+
+    def joint_name(self, focus_side='right'):
+        """
+        Name of the joint angle this exercise counts reps on.
+        """
+        return self.JOINT.format(side=focus_side.lower())
+
+    def update(self, knee_angle, timestamp=None):
+        """
+        Update the counter and gamification from the current angle.
+
+        Parameters:
+        - knee_angle (float): Current angle in degrees.
+        - timestamp (float): Time of the frame in seconds, or None to use the clock.
+
+        Returns:
+        - reps (int): Total repetitions.
+        - feedback (str): Feedback message.
+        - points (int): Total points.
+        - achievements (list): List of unlocked achievements.
+        - knee_angle (float): Current knee angle.
+        """
+        reps, feedback = self.counter.update(knee_angle, timestamp)
+
+        if feedback == "Good Rep":
+            self.gamification.add_points(1)
+            points = self.gamification.get_points()
+            achievements = self.gamification.get_achievements().copy()
+        else:
+            points = self.gamification.get_points()
+            achievements = self.gamification.get_achievements().copy()
+
+        return reps, feedback, points, achievements, knee_angle
@@ -1,14 +1,19 @@
 # modules/exercises/shoulder_exercise.py
 
+import time
+
 from modules.exercise_counter import ExerciseCounter
 from modules.gamification import Gamification
 from modules.angle_calculator import calculate_angle
 
 class ShoulderExercise:
+    JOINT = '{side}_elbow'
+
     def __init__(self,
                  angle_threshold_up=160,
                  angle_threshold_down=100,
-                 min_hold_time=0.5):
+                 min_hold_time=0.5,
+                 clock=time.time):
         """
         Initialize the ShoulderExercise with specific parameters.
 
@@ -16,17 +21,21 @@ class ShoulderExercise:
         - angle_threshold_up (float): Angle above which the arm is considered raised.
         - angle_threshold_down (float): Angle below which the arm is considered lowered.
         - min_hold_time (float): Minimum time in seconds to hold a position before counting.
+        - clock (callable): Time source used when process() gets no timestamp.
         """
-        self.counter_up = ExerciseCounter(angle_threshold_up, min_hold_time)
-        self.counter_down = ExerciseCounter(angle_threshold_down, min_hold_time)
+        self.counter_up = ExerciseCounter(angle_threshold_up, min_hold_time, clock=clock)
+        # Reps are reported from counter_up; counter_down keeps no events of its own
+        self.counter_down = ExerciseCounter(angle_threshold_down, min_hold_time, clock=clock,
+                                            record_events=False)
         self.gamification = Gamification()
 
-    def process(self, landmarks):
+    def process(self, landmarks, timestamp=None):
         """
         Process the landmarks to update the shoulder exercise counters and gamification.
 
         Parameters:
         - landmarks (dict): Contains the x and y coordinates of shoulder, elbow, wrist.
+        - timestamp (float): Time of the frame in seconds, or None to use the clock.
 
         Returns:
         - reps (int): Total repetitions.
@@ -42,22 +51,68 @@ class ShoulderExercise:
 
             shoulder_angle = calculate_angle(shoulder, elbow, wrist)
 
-            reps_up, feedback_up = self.counter_up.update(shoulder_angle)
-            reps_down, feedback_down = self.counter_down.update(shoulder_angle)
+            return self.update(shoulder_angle, timestamp)
+        except KeyError as e:
+            print(f"Error processing exercise: {e}")
+            return self.counter_up.count, "Error", self.gamification.get_points(), [], None
 
-            if reps_up > self.counter_up.count:
-                self.gamification.add_points(1)
-                points = self.gamification.get_points()
-                achievements = self.gamification.get_achievements().copy()
-                feedback = "Good Rep"
-            else:
-                points = self.gamification.get_points()
-                achievements = self.gamification.get_achievements().copy()
-                feedback = "Form Correction Needed"
+    def process_angles(self, angles, focus_side='right', timestamp=None):
+        """
+        Update the exercise from precomputed joint angles.
 
-            reps = reps_up
+        Parameters:
+        - angles (JointAngles): Joint angles of the current frame.
+        - focus_side (str): 'left' or 'right'.
+        - timestamp (float): Time of the frame in seconds, or None to use the clock.
 
-            return reps, feedback, points, achievements, shoulder_angle
-        except KeyError as e:
-            print(f"Error processing exercise: {e}")
+        Returns:
+        - Same as process().
+        """
+        shoulder_angle = angles.get(self.joint_name(focus_side))
+        if shoulder_angle is None:
             return self.counter_up.count, "Error", self.gamification.get_points(), [], None
+        return self.update(shoulder_angle, timestamp)
+
+    def pop_rep_events(self):
+        """
+        Return the reps completed since the last call, see ExerciseCounter.pop_events().
+        """
+        return self.counter_up.pop_events()
+
+    def joint_name(self, focus_side='right'):
+        """
+        Name of the joint angle this exercise counts reps on.
+        """
+        return self.JOINT.format(side=focus_side.lower())
+
+    def update(self, shoulder_angle, timestamp=None):
+        """
+        Update the counter and gamification from the current angle.
+
+        Parameters:
+        - shoulder_angle (float): Current angle in degrees.
+        - timestamp (float): Time of the frame in seconds, or None to use the clock.
+
+        Returns:
+        - reps (int): Total repetitions.
+        - feedback (str): Feedback message.
+        - points (int): Total points.
+        - achievements (list): List of unlocked achievements.
+        - shoulder_angle (float): Current shoulder angle.
+        """
+        reps_up, feedback_up = self.counter_up.update(shoulder_angle, timestamp)
+        reps_down, feedback_down = self.counter_down.update(shoulder_angle, timestamp)
+
+        if reps_up > self.counter_up.count:
+            self.gamification.add_points(1)
+            points = self.gamification.get_points()
+            achievements = self.gamification.get_achievements().copy()
+            feedback = "Good Rep"
+        else:
+            points = self.gamification.get_points()
+            achievements = self.gamification.get_achievements().copy()
+            feedback = "Form Correction Needed"
+
+        reps = reps_up
+
+        return reps, feedback, points, achievements, shoulder_angle
@@ -0,0 +1,363 @@
+# modules/ingest_server.py
+#
+# Central store for the sessions of several stations. Stations push finished
+# sessions with modules/uploader.py; the server also answers per-patient
+# aggregate queries.
+#
+# The protocol is newline-delimited JSON over TCP, one request and one response
+# per line:
+#     {"type": "upload", "station": "kiosk-1", "sessions": [...]}
+#     {"type": "query", "patient": "default", "exercise": null, "since": null, "until": null}
+#
+# Usage:
+#     python -m modules.ingest_server --db clinic.db --host 0.0.0.0 --port 8765
+
+import argparse
+import asyncio
+import json
+import logging
+import queue
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from modules.database import connect_readonly
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+# Session fields sent by the uploader, in column order
+SESSION_FIELDS = ('id', 'patient', 'exercise', 'goal', 'started_at', 'ended_at', 'repetitions', 'points',
+                  'duration_ms', 'reps_recorded', 'mean_rep_ms', 'mean_hold_ms', 'min_angle', 'max_angle')
+# Fields of each row in a session's 'reps' list
+REP_FIELDS = ('rep', 'started_at', 'ended_at', 'min_angle', 'max_angle', 'hold_ms', 'feedback')
+
+
+class ConnectionPool:
+    def __init__(self, db_path, size=4):
+        """
+        A fixed set of read-only connections shared by query threads.
+
+        Parameters:
+        - db_path (str): Path to the SQLite database file.
+        - size (int): Number of connections.
+        """
+        self._connections = queue.Queue()
+        for _ in range(size):
+            self._connections.put(connect_readonly(db_path, check_same_thread=False))
+        self.size = size
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the body of a with block.
+        """
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self):
+        for _ in range(self.size):
+            self._connections.get().close()
+
+
+class CentralStore:
+    def __init__(self, db_path='clinic.db', readers=4):
+        """
+        SQLite store of the sessions and reps of every station.
+
+        All writes go through one connection; queries use a pool of read-only
+        connections, which WAL mode lets run alongside the writer.
+
+        Parameters:
+        - db_path (str): Path to the SQLite database file.
+        - readers (int): Number of read-only connections.
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30.0, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.create_table()
+        self.pool = ConnectionPool(db_path, readers)
+
+    def create_table(self):
+        """
+        Create the sessions and rep_events tables if they don't exist.
+        """
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY,
+                    station TEXT NOT NULL,
+                    local_id INTEGER NOT NULL,
+                    patient TEXT NOT NULL,
+                    exercise TEXT NOT NULL,
+                    goal INTEGER,
+                    started_at INTEGER NOT NULL,
+                    ended_at INTEGER,
+                    repetitions INTEGER NOT NULL,
+                    points INTEGER NOT NULL,
+                    duration_ms INTEGER,
+                    reps_recorded INTEGER,
+                    mean_rep_ms REAL,
+                    mean_hold_ms REAL,
+                    min_angle REAL,
+                    max_angle REAL,
+                    UNIQUE (station, local_id)
+                )
+            ''')
+            self.conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_sessions_patient_exercise_time
+                ON sessions (patient, exercise, started_at)
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS rep_events (
+                    session_id INTEGER NOT NULL REFERENCES sessions(id),
+                    rep INTEGER NOT NULL,
+                    started_at INTEGER NOT NULL,
+                    ended_at INTEGER NOT NULL,
+                    min_angle REAL,
+                    max_angle REAL,
+                    hold_ms INTEGER,
+                    feedback TEXT,
+                    PRIMARY KEY (session_id, rep)
+                ) WITHOUT ROWID
+            ''')
+
+    def ingest(self, uploads):
+        """
+        Store several uploads in one transaction. Sessions are keyed by
+        (station, local id), so uploading a session again replaces it.
+
+        Parameters:
+        - uploads (list of tuples): (station, sessions), with sessions as sent by
+          SessionUploader: dicts with SESSION_FIELDS and a 'reps' list of REP_FIELDS rows.
+
+        Returns:
+        - list of tuples: (sessions, reps) stored per upload.
+        """
+        counts = []
+        with self.conn:
+            cursor = self.conn.cursor()
+            for station, sessions in uploads:
+                cursor.executemany(f'''
+                    INSERT INTO sessions (station, local_id, {', '.join(SESSION_FIELDS[1:])})
+                    VALUES (?, {', '.join('?' * len(SESSION_FIELDS))})
+                    ON CONFLICT (station, local_id) DO UPDATE SET
+                        {', '.join(f'{field} = excluded.{field}' for field in SESSION_FIELDS[1:])}
+                ''', [(station,) + tuple(session[field] for field in SESSION_FIELDS) for session in sessions])
+
+                # Map the stations' session ids to ours for the rep rows
+                ids = {}
+                local_ids = [session['id'] for session in sessions]
+                for start in range(0, len(local_ids), 500):
+                    chunk = local_ids[start:start + 500]
+                    cursor.execute(f'''
+                        SELECT local_id, id FROM sessions
+                        WHERE station = ? AND local_id IN ({', '.join('?' * len(chunk))})
+                    ''', [station] + chunk)
+                    ids.update(cursor.fetchall())
+
+                # A re-uploaded session replaces its reps, including any no longer sent
+                cursor.executemany('DELETE FROM rep_events WHERE session_id = ?',
+                                   [(ids[session['id']],) for session in sessions])
+                rows = [(ids[session['id']],) + tuple(rep) for session in sessions for rep in session['reps']]
+                cursor.executemany(f'''
+                    INSERT OR REPLACE INTO rep_events (session_id, {', '.join(REP_FIELDS)})
+                    VALUES (?, {', '.join('?' * len(REP_FIELDS))})
+                ''', rows)
+                counts.append((len(sessions), len(rows)))
+        return counts
+
+    def patient_summary(self, patient, exercise=None, since=None, until=None):
+        """
+        Aggregate a patient's sessions per exercise.
+
+        Parameters:
+        - patient (str): Patient.
+        - exercise (str): Only this exercise, or None for all.
+        - since (int): Only sessions started at or after this epoch millisecond.
+        - until (int): Only sessions started before this epoch millisecond.
+
+        Returns:
+        - list of dict: One per exercise with sessions, stations, repetitions, points,
+          best_repetitions, mean_hold_ms, first_session and last_session (epoch ms).
+        """
+        conditions = ['patient = ?']
+        params = [patient]
+        for condition, value in (('exercise = ?', exercise), ('started_at >= ?', since),
+                                 ('started_at < ?', until)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+
+        with self.pool.connection() as conn:
+            cursor = conn.execute(f'''
+                SELECT exercise, COUNT(*) AS sessions, COUNT(DISTINCT station) AS stations,
+                       SUM(repetitions) AS repetitions, SUM(points) AS points,
+                       MAX(repetitions) AS best_repetitions, AVG(mean_hold_ms) AS mean_hold_ms,
+                       MIN(started_at) AS first_session, MAX(started_at) AS last_session
+                FROM sessions
+                WHERE {' AND '.join(conditions)}
+                GROUP BY exercise
+                ORDER BY exercise
+            ''', params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def close(self):
+        self.pool.close()
+        self.conn.close()
+
+
+class IngestServer:
+    def __init__(self, store, host='127.0.0.1', port=DEFAULT_PORT, max_batch=32):
+        """
+        asyncio front end of a CentralStore.
+
+        Uploads from all connections are queued and written by one task, which
+        commits whatever has queued up in a single transaction. The database
+        calls run on worker threads so the event loop keeps serving connections.
+
+        Parameters:
+        - store (CentralStore): Store to write to and query.
+        - host (str): Address to listen on.
+        - port (int): Port to listen on, or 0 for any free port.
+        - max_batch (int): Maximum uploads committed in one transaction.
+        """
+        self.store = store
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-writer")
+        self._read_executor = ThreadPoolExecutor(max_workers=store.pool.size, thread_name_prefix="ingest-reader")
+        self._uploads = None
+        self._server = None
+        self._writer_task = None
+
+    async def start(self):
+        """
+        Start listening. self.port holds the bound port afterwards.
+        """
+        self._uploads = asyncio.Queue()
+        self._writer_task = asyncio.ensure_future(self._write_loop())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                  limit=MAX_REQUEST_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Ingest server listening on %s:%d", self.host, self.port)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            self._writer_task = None
+        self._write_executor.shutdown()
+        self._read_executor.shutdown()
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than MAX_REQUEST_BYTES; the stream cannot be resynchronized
+                    await self._respond(writer, {'ok': False, 'error': "Request too large"})
+                    break
+                if not line:
+                    break
+                await self._respond(writer, await self._dispatch(line))
+        except ConnectionError:
+            pass
+        except Exception:
+            logger.exception("Error serving %s", peer)
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, response):
+        writer.write(json.dumps(response).encode('utf-8') + b'\n')
+        await writer.drain()
+
+    async def _dispatch(self, line):
+        """
+        Run one request and return its response.
+        """
+        try:
+            request = json.loads(line)
+            kind = request['type']
+            if kind == 'upload':
+                future = asyncio.get_running_loop().create_future()
+                await self._uploads.put((str(request['station']), request['sessions'], future))
+                sessions, reps = await future
+                return {'ok': True, 'sessions': sessions, 'reps': reps}
+            if kind == 'query':
+                summary = await asyncio.get_running_loop().run_in_executor(
+                    self._read_executor, self.store.patient_summary, request['patient'],
+                    request.get('exercise'), request.get('since'), request.get('until'))
+                return {'ok': True, 'exercises': summary}
+            return {'ok': False, 'error': f"Unknown request type: {kind}"}
+        except (ValueError, KeyError, TypeError, IndexError, AttributeError, sqlite3.Error) as e:
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+    async def _write_loop(self):
+        """
+        Commit queued uploads in batches.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._uploads.get()]
+            while len(batch) < self.max_batch and not self._uploads.empty():
+                batch.append(self._uploads.get_nowait())
+
+            try:
+                counts = await loop.run_in_executor(self._write_executor, self.store.ingest,
+                                                    [(station, sessions) for station, sessions, _ in batch])
+            except Exception:
+                # Commit the uploads one by one so a bad one does not fail the others
+                for station, sessions, future in batch:
+                    try:
+                        count, = await loop.run_in_executor(self._write_executor, self.store.ingest,
+                                                            [(station, sessions)])
+                    except Exception as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(count)
+                continue
+            for (_, _, future), count in zip(batch, counts):
+                future.set_result(count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect sessions from several stations in one database.")
+    parser.add_argument('--db', default='clinic.db', help="Central SQLite database.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--readers', type=int, default=4, help="Read-only connections for queries.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    store = CentralStore(args.db, readers=args.readers)
+    try:
+        asyncio.run(IngestServer(store, args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
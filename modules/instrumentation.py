@@ -0,0 +1,150 @@
+# modules/instrumentation.py
+#
+# Per-stage timing in fixed memory, for the on-screen overlay and app.log.
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class RollingHistogram:
+    def __init__(self, size=512):
+        """
+        Keep the most recent samples of a measurement in a fixed-size ring buffer.
+
+        Parameters:
+        - size (int): Number of samples kept; older ones are overwritten.
+        """
+        self._samples = np.zeros(size, dtype=np.float64)
+        self._next = 0
+        self.count = 0
+
+    def add(self, value):
+        """
+        Add one sample.
+        """
+        self._samples[self._next] = value
+        self._next = (self._next + 1) % len(self._samples)
+        self.count += 1
+
+    def percentiles(self, percents=(50, 95, 99)):
+        """
+        Return the given percentiles of the samples in the window.
+
+        Returns:
+        - numpy.ndarray: One value per percentile, or NaNs if there are no samples.
+        """
+        filled = min(self.count, len(self._samples))
+        if filled == 0:
+            return np.full(len(percents), np.nan)
+        return np.percentile(self._samples[:filled], percents)
+
+
+class PerfMonitor:
+    def __init__(self, window=512, fps_window=120):
+        """
+        Collect stage timings, frame rate and drop counts from several threads.
+
+        Parameters:
+        - window (int): Samples kept per stage.
+        - fps_window (int): Frames the frame rate is averaged over.
+        """
+        self.window = window
+        self._stages = {}
+        self._frame_times = np.zeros(fps_window, dtype=np.float64)
+        self._frames = 0
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        """
+        Record one duration of a stage.
+
+        Parameters:
+        - stage (str): Stage name.
+        - seconds (float): Duration in seconds.
+        """
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = RollingHistogram(self.window)
+            histogram.add(seconds * 1000.0)
+
+    @contextmanager
+    def time(self, stage):
+        """
+        Time the body of a with block as one sample of a stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def tick(self, timestamp=None):
+        """
+        Count one displayed frame for the frame rate.
+        """
+        with self._lock:
+            self._frame_times[self._frames % len(self._frame_times)] = (
+                time.perf_counter() if timestamp is None else timestamp)
+            self._frames += 1
+
+    def set_dropped(self, dropped):
+        """
+        Set the total number of frames dropped so far.
+        """
+        self._dropped = dropped
+
+    def fps(self):
+        """
+        Return the frame rate over the last fps_window frames, or 0.0.
+        """
+        with self._lock:
+            filled = min(self._frames, len(self._frame_times))
+            if filled < 2:
+                return 0.0
+            times = self._frame_times[:filled]
+            span = times.max() - times.min()
+        return (filled - 1) / span if span > 0 else 0.0
+
+    def snapshot(self):
+        """
+        Return the current statistics.
+
+        Returns:
+        - dict: fps, frames, dropped and stages ({stage: {p50, p95, p99, count}},
+          in milliseconds).
+        """
+        with self._lock:
+            stages = {}
+            for name, histogram in self._stages.items():
+                p50, p95, p99 = histogram.percentiles()
+                stages[name] = {'p50': round(float(p50), 3), 'p95': round(float(p95), 3),
+                                'p99': round(float(p99), 3), 'count': histogram.count}
+            frames = self._frames
+        return {'fps': round(self.fps(), 2), 'frames': frames, 'dropped': self._dropped,
+                'stages': stages}
+
+    def overlay_lines(self):
+        """
+        Return the statistics as short text lines for an on-screen overlay.
+        """
+        snapshot = self.snapshot()
+        lines = [f"FPS {snapshot['fps']:.1f}  dropped {snapshot['dropped']}",
+                 f"{'stage':<10} {'p50':>6} {'p95':>6} {'p99':>6}"]
+        for name, stats in snapshot['stages'].items():
+            lines.append(f"{name:<10} {stats['p50']:6.1f} {stats['p95']:6.1f} {stats['p99']:6.1f} ms")
+        return lines
+
+    def log_snapshot(self, log=logger):
+        """
+        Write the statistics to the log as one JSON line.
+        """
+        log.info("perf %s", json.dumps(self.snapshot(), sort_keys=True))
@@ -0,0 +1,198 @@
+# modules/job_queue.py
+
+import sqlite3
+from datetime import datetime
+
+
+class JobQueue:
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, db_path='progress.db', max_attempts=3):
+        """
+        Initialize a resumable, SQLite-backed queue of batch analysis jobs.
+
+        Jobs are keyed by (path, exercise), so queueing the same archive again
+        only adds files that have not been seen before.
+
+        Parameters:
+        - db_path (str): Path to the SQLite database file.
+        - max_attempts (int): Times a job may crash its worker, or be cut off
+          by a killed run, before it is marked failed instead of queued again.
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(self.db_path)
+        self.create_table()
+
+    def create_table(self):
+        """
+        Create the batch_jobs table if it doesn't exist.
+        """
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS batch_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT NOT NULL,
+                    exercise TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated TEXT NOT NULL,
+                    UNIQUE (path, exercise)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_batch_jobs_status ON batch_jobs (status)')
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error creating table: {e}")
+
+    def _now(self):
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def add_jobs(self, paths, exercise):
+        """
+        Queue videos for analysis, skipping ones that are already queued.
+
+        Parameters:
+        - paths (list of str): Video file paths.
+        - exercise (str): Name of the exercise performed in the videos.
+
+        Returns:
+        - int: Number of newly queued jobs.
+        """
+        now = self._now()
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany('''
+                INSERT OR IGNORE INTO batch_jobs (path, exercise, status, updated)
+                VALUES (?, ?, ?, ?)
+            ''', [(path, exercise, self.PENDING, now) for path in paths])
+            return self.conn.total_changes - before
+
+    def recover(self, retry_failed=False):
+        """
+        Return jobs left running by a crashed run (and optionally failed jobs) to pending.
+
+        The interrupted claim counts as an attempt, so a video that takes the
+        whole run down is marked failed after max_attempts restarts instead of
+        being retried forever. Failed jobs that are retried start counting
+        attempts again.
+
+        Parameters:
+        - retry_failed (bool): Also retry jobs that previously failed.
+        """
+        now = self._now()
+        with self.conn:
+            self.conn.execute('''
+                UPDATE batch_jobs SET status = ?, error = ?, updated = ?
+                WHERE status = ? AND attempts >= ?
+            ''', (self.FAILED, f"Gave up after {self.max_attempts} attempt(s): run interrupted",
+                  now, self.RUNNING, self.max_attempts))
+            self.conn.execute('''
+                UPDATE batch_jobs SET status = ?, updated = ?
+                WHERE status = ?
+            ''', (self.PENDING, now, self.RUNNING))
+            if retry_failed:
+                self.conn.execute('''
+                    UPDATE batch_jobs SET status = ?, attempts = 0, updated = ?
+                    WHERE status = ?
+                ''', (self.PENDING, now, self.FAILED))
+
+    def release(self, jobs):
+        """
+        Return claimed jobs that were stopped through no fault of their own, e.g.
+        by another job crashing the worker pool, to pending. The claim does not
+        count as an attempt.
+
+        Parameters:
+        - jobs (list of tuples): (path, exercise) of the jobs.
+        """
+        with self.conn:
+            self.conn.executemany('''
+                UPDATE batch_jobs SET status = ?, attempts = MAX(attempts - 1, 0), updated = ?
+                WHERE path = ? AND exercise = ?
+            ''', [(self.PENDING, self._now(), path, exercise) for path, exercise in jobs])
+
+    def mark_crashed(self, path, exercise, error):
+        """
+        Return a job that crashed its worker to pending, or mark it failed once
+        it has been claimed max_attempts times.
+
+        Returns:
+        - bool: True if the job was marked failed.
+        """
+        with self.conn:
+            attempts, = self.conn.execute('''
+                SELECT attempts FROM batch_jobs WHERE path = ? AND exercise = ?
+            ''', (path, exercise)).fetchone()
+            if attempts < self.max_attempts:
+                self.conn.execute('''
+                    UPDATE batch_jobs SET status = ?, error = ?, updated = ?
+                    WHERE path = ? AND exercise = ?
+                ''', (self.PENDING, str(error), self._now(), path, exercise))
+                return False
+        self.mark_failed(path, exercise, f"Gave up after {attempts} attempt(s): {error}")
+        return True
+
+    def claim_pending(self, exercise=None):
+        """
+        Mark all pending jobs as running and return them.
+
+        Parameters:
+        - exercise (str): Only claim jobs for this exercise, or None for all.
+
+        Returns:
+        - list of tuples: (path, exercise) for every claimed job.
+        """
+        query = 'SELECT path, exercise FROM batch_jobs WHERE status = ?'
+        params = [self.PENDING]
+        if exercise is not None:
+            query += ' AND exercise = ?'
+            params.append(exercise)
+        with self.conn:
+            jobs = self.conn.execute(query + ' ORDER BY id', params).fetchall()
+            self.conn.executemany('''
+                UPDATE batch_jobs SET status = ?, attempts = attempts + 1, updated = ?
+                WHERE path = ? AND exercise = ?
+            ''', [(self.RUNNING, self._now(), path, job_exercise) for path, job_exercise in jobs])
+        return jobs
+
+    def mark_done(self, path, exercise):
+        """
+        Mark a job as successfully finished.
+        """
+        with self.conn:
+            self.conn.execute('''
+                UPDATE batch_jobs SET status = ?, error = NULL, updated = ?
+                WHERE path = ? AND exercise = ?
+            ''', (self.DONE, self._now(), path, exercise))
+
+    def mark_failed(self, path, exercise, error):
+        """
+        Mark a job as failed and keep the error message.
+        """
+        with self.conn:
+            self.conn.execute('''
+                UPDATE batch_jobs SET status = ?, error = ?, updated = ?
+                WHERE path = ? AND exercise = ?
+            ''', (self.FAILED, str(error), self._now(), path, exercise))
+
+    def counts(self):
+        """
+        Count jobs by status.
+
+        Returns:
+        - dict: status -> number of jobs.
+        """
+        rows = self.conn.execute('SELECT status, COUNT(*) FROM batch_jobs GROUP BY status').fetchall()
+        return dict(rows)
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.conn.close()
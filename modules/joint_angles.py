@@ -0,0 +1,133 @@
+# modules/joint_angles.py
+#
+# Full-skeleton joint angles computed in one vectorized pass per frame.
+
+import numpy as np
+
+from modules.angle_calculator import calculate_angles
+from modules.landmarks import LANDMARK_INDEX, NUM_LANDMARKS
+
+# Points derived from the MediaPipe landmarks, appended after the 33 real ones
+VIRTUAL_POINTS = [
+    ('MID_SHOULDER', ('LEFT_SHOULDER', 'RIGHT_SHOULDER')),
+    ('MID_HIP', ('LEFT_HIP', 'RIGHT_HIP')),
+    ('MID_KNEE', ('LEFT_KNEE', 'RIGHT_KNEE')),
+]
+
+# (joint name, point a, vertex b, point c)
+JOINTS = [
+    ('left_knee', 'LEFT_HIP', 'LEFT_KNEE', 'LEFT_ANKLE'),
+    ('right_knee', 'RIGHT_HIP', 'RIGHT_KNEE', 'RIGHT_ANKLE'),
+    ('left_hip', 'LEFT_SHOULDER', 'LEFT_HIP', 'LEFT_KNEE'),
+    ('right_hip', 'RIGHT_SHOULDER', 'RIGHT_HIP', 'RIGHT_KNEE'),
+    ('left_ankle', 'LEFT_KNEE', 'LEFT_ANKLE', 'LEFT_FOOT_INDEX'),
+    ('right_ankle', 'RIGHT_KNEE', 'RIGHT_ANKLE', 'RIGHT_FOOT_INDEX'),
+    ('left_elbow', 'LEFT_SHOULDER', 'LEFT_ELBOW', 'LEFT_WRIST'),
+    ('right_elbow', 'RIGHT_SHOULDER', 'RIGHT_ELBOW', 'RIGHT_WRIST'),
+    ('left_shoulder', 'LEFT_ELBOW', 'LEFT_SHOULDER', 'LEFT_HIP'),
+    ('right_shoulder', 'RIGHT_ELBOW', 'RIGHT_SHOULDER', 'RIGHT_HIP'),
+    ('trunk', 'MID_SHOULDER', 'MID_HIP', 'MID_KNEE'),
+    # Back alignment as measured by BackExercise
+    ('back', 'LEFT_SHOULDER', 'MID_HIP', 'MID_SHOULDER'),
+]
+
+
+class JointAngles:
+    def __init__(self, names, values, index):
+        """
+        Joint angles of one frame (or a stream of frames), addressable by name.
+
+        Parameters:
+        - names (list of str): Joint names.
+        - values (numpy.ndarray): (..., J) angles in degrees, NaN where unavailable.
+        - index (dict): Joint name -> column in values.
+        """
+        self.names = names
+        self.values = values
+        self._index = index
+
+    def __getitem__(self, name):
+        return self.values[..., self._index[name]]
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def get(self, name, default=None):
+        """
+        Return the angle of a joint, or default if it is unknown or unavailable.
+        """
+        if name not in self._index:
+            return default
+        value = self.values[..., self._index[name]]
+        if np.ndim(value) == 0:
+            return default if np.isnan(value) else float(value)
+        return value
+
+    def frame(self, i):
+        """
+        Return the angles of frame i of a stream.
+        """
+        return JointAngles(self.names, self.values[i], self._index)
+
+    def as_dict(self):
+        """
+        Return a single frame's angles as a {name: float or None} dict.
+        """
+        return {name: self.get(name) for name in self.names}
+
+
+class JointAngleEngine:
+    def __init__(self, joints=JOINTS, virtual_points=VIRTUAL_POINTS):
+        """
+        Compile a joint table into index arrays for vectorized evaluation.
+
+        Parameters:
+        - joints (list of tuples): (name, a, b, c) landmark or virtual point names.
+        - virtual_points (list of tuples): (name, (landmark, landmark)) midpoints.
+        """
+        point_index = dict(LANDMARK_INDEX)
+        for i, (name, _) in enumerate(virtual_points):
+            point_index[name] = NUM_LANDMARKS + i
+
+        self.names = [joint[0] for joint in joints]
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self._virtual = np.array([[LANDMARK_INDEX[a], LANDMARK_INDEX[b]]
+                                  for _, (a, b) in virtual_points], dtype=np.intp).reshape(-1, 2)
+        self._triples = np.array([[point_index[a], point_index[b], point_index[c]]
+                                  for _, a, b, c in joints], dtype=np.intp)
+
+    def compute(self, landmarks):
+        """
+        Compute every joint angle of one frame or a stream of frames.
+
+        Parameters:
+        - landmarks (numpy.ndarray): (33, 4) or (N, 33, 4) landmark array. Only
+          x and y are used, matching the per-exercise 2D angles.
+
+        Returns:
+        - JointAngles: Angles with shape (J,) or (N, J).
+        """
+        points = np.asarray(landmarks)[..., :2]
+        virtual = points[..., self._virtual, :].mean(axis=-2)
+        points = np.concatenate([points, virtual], axis=-2)
+
+        triples = points[..., self._triples, :]  # (..., J, 3, 2)
+        leading = triples.shape[:-2]
+        angles = calculate_angles(triples.reshape(-1, 3, 2)).reshape(leading)
+        return JointAngles(self.names, angles, self._index)
+
+    def vertex(self, name, landmarks):
+        """
+        Return the normalized [x, y] position of a joint's vertex in one frame.
+
+        Parameters:
+        - name (str): Joint name.
+        - landmarks (numpy.ndarray): (33, 4) landmark array.
+
+        Returns:
+        - numpy.ndarray: [x, y] of the vertex point.
+        """
+        vertex = self._triples[self._index[name], 1]
+        if vertex < NUM_LANDMARKS:
+            return landmarks[vertex, :2]
+        return landmarks[self._virtual[vertex - NUM_LANDMARKS], :2].mean(axis=0)
@@ -0,0 +1,212 @@
+# modules/landmark_propagation.py
+#
+# Sparse pose inference: MediaPipe runs on keyframes only and the landmarks are
+# carried to the frames in between with pyramidal Lucas-Kanade optical flow.
+
+import math
+import time
+
+import cv2
+import numpy as np
+
+_LK_PARAMS = dict(winSize=(21, 21), maxLevel=3,
+                  criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+
+class PropagatedResults:
+    def __init__(self, pose_landmarks):
+        """
+        Stand-in for MediaPipe's results on frames whose landmarks were propagated.
+
+        Parameters:
+        - pose_landmarks (NormalizedLandmarkList): Propagated landmarks.
+        """
+        self.pose_landmarks = pose_landmarks
+        self.pose_world_landmarks = None
+
+
+class SparsePoseTracker:
+    def __init__(self, pose_estimator, max_interval=6, fast_motion=0.4, min_visibility=0.5,
+                 max_lost_fraction=0.3):
+        """
+        Run pose inference every k-th frame and propagate landmarks in between.
+
+        k adapts every frame. Motion sets how many frames may be skipped: at
+        fast_motion or above every frame is a keyframe, and a still pose allows
+        up to max_interval. Measured inference latency sets a floor: if one
+        inference takes longer than a frame, k never drops below the number of
+        frames it spans, since those frames could not be inferred anyway.
+
+        Parameters:
+        - pose_estimator (PoseEstimator): Estimator used on keyframes.
+        - max_interval (int): Largest number of frames between keyframes.
+        - fast_motion (float): Landmark speed, in frame heights per second, at
+          which every frame is inferred.
+        - min_visibility (float): Landmarks below this visibility are not tracked.
+        - max_lost_fraction (float): Fraction of tracked points optical flow may
+          lose before a keyframe is forced.
+        """
+        self.pose_estimator = pose_estimator
+        self.max_interval = max_interval
+        self.fast_motion = fast_motion
+        self.min_visibility = min_visibility
+        self.max_lost_fraction = max_lost_fraction
+
+        self.interval = 1
+        self.keyframes = 0
+        self.propagated = 0
+
+        self._motion = 0.0
+        self._latency = None
+        self._frame_period = None
+        self._last_timestamp = None
+        self._since_keyframe = 0
+
+        # Two grayscale buffers used alternately as previous and current frame
+        self._gray = [None, None]
+        self._current = 0
+
+        self._pose_landmarks = None  # NormalizedLandmarkList of the last keyframe
+        self._landmarks = None       # (33, 4) landmarks of the last frame
+        self._tracked = None         # Indices of the landmarks followed by optical flow
+        self._points = None          # (K, 1, 2) float32 pixel positions of those landmarks
+
+    def reset(self):
+        """
+        Drop the tracked pose so the next frame is a keyframe.
+        """
+        self._landmarks = None
+        self._pose_landmarks = None
+        self._since_keyframe = 0
+
+    def process(self, image, timestamp=None, is_rgb=True):
+        """
+        Estimate the pose of a frame, by inference or by propagation.
+
+        Parameters:
+        - image (numpy.ndarray): The frame.
+        - timestamp (float): Capture time in seconds, or None for the current time.
+        - is_rgb (bool): True if the frame is RGB rather than BGR.
+
+        Returns:
+        - results: MediaPipe results, or PropagatedResults on propagated frames.
+        - landmarks (numpy.ndarray): A new (33, 4) float32 landmark array, or None.
+        - keyframe (bool): True if pose inference ran on this frame.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        elapsed = 0.0
+        if self._last_timestamp is not None and timestamp > self._last_timestamp:
+            elapsed = timestamp - self._last_timestamp
+            self._frame_period = self._smooth(self._frame_period, elapsed, 0.1)
+        self._last_timestamp = timestamp
+
+        gray = self._to_gray(image, is_rgb)
+
+        if self._landmarks is not None and self._since_keyframe + 1 < self.interval:
+            propagated = self._propagate(gray, elapsed)
+            if propagated is not None:
+                return propagated
+        return self._keyframe(image, gray, elapsed, is_rgb)
+
+    def _to_gray(self, image, is_rgb):
+        self._current ^= 1
+        gray = self._gray[self._current]
+        if gray is None or gray.shape != image.shape[:2]:
+            gray = self._gray[self._current] = np.empty(image.shape[:2], dtype=np.uint8)
+        cv2.cvtColor(image, cv2.COLOR_RGB2GRAY if is_rgb else cv2.COLOR_BGR2GRAY, dst=gray)
+        return gray
+
+    def _keyframe(self, image, gray, elapsed, is_rgb):
+        start = time.perf_counter()
+        _, results = self.pose_estimator.process_frame(image, is_rgb=is_rgb)
+        self._latency = self._smooth(self._latency, time.perf_counter() - start, 0.2)
+        self.keyframes += 1
+        self._since_keyframe = 0
+
+        landmarks = self.pose_estimator.get_landmark_array(results)
+        if landmarks is None:
+            self.reset()
+            self._update_interval()
+            return results, None, True
+
+        h, w = gray.shape
+        scale = np.array([w, h], dtype=np.float32)
+        if self._landmarks is not None:
+            # Speed of the shared visible landmarks since the previous frame; after
+            # propagated frames this includes their drift, which also calls for keyframes
+            common = ((landmarks[:, 3] >= self.min_visibility) &
+                      (self._landmarks[:, 3] >= self.min_visibility))
+            if common.any():
+                moved = np.linalg.norm((landmarks[common, :2] - self._landmarks[common, :2]) * scale, axis=1)
+                self._add_motion(float(np.median(moved)) / h, elapsed)
+
+        visible = landmarks[:, 3] >= self.min_visibility
+        inside = ((landmarks[:, :2] >= 0.0) & (landmarks[:, :2] <= 1.0)).all(axis=1)
+        self._tracked = np.flatnonzero(visible & inside)
+        self._points = (landmarks[self._tracked, :2] * scale).reshape(-1, 1, 2)
+        self._pose_landmarks = results.pose_landmarks
+        self._landmarks = landmarks.copy()
+        self._update_interval()
+        return results, landmarks, True
+
+    def _propagate(self, gray, elapsed):
+        """
+        Carry the tracked landmarks to the current frame, or return None to
+        request a keyframe.
+        """
+        if len(self._tracked) == 0:
+            return None
+        previous = self._gray[self._current ^ 1]
+        points, status, _ = cv2.calcOpticalFlowPyrLK(previous, gray, self._points, None, **_LK_PARAMS)
+        if points is None:
+            return None
+        ok = status.ravel() == 1
+        if ok.mean() < 1.0 - self.max_lost_fraction:
+            return None
+
+        h, w = gray.shape
+        moved = np.linalg.norm((points - self._points).reshape(-1, 2)[ok], axis=1)
+        self._add_motion(float(np.median(moved)) / h, elapsed)
+        self._points[ok] = points[ok]
+
+        landmarks = self._landmarks.copy()
+        indices = self._tracked[ok]
+        landmarks[indices, :2] = self._points[ok].reshape(-1, 2) / np.array([w, h], dtype=np.float32)
+        self._landmarks = landmarks
+
+        # Each frame gets its own message; later stages read it on other threads
+        pose_landmarks = type(self._pose_landmarks)()
+        pose_landmarks.CopyFrom(self._pose_landmarks)
+        for i in indices:
+            landmark = pose_landmarks.landmark[i]
+            landmark.x = float(landmarks[i, 0])
+            landmark.y = float(landmarks[i, 1])
+
+        self.propagated += 1
+        self._since_keyframe += 1
+        self._update_interval()
+        return PropagatedResults(pose_landmarks), landmarks.copy(), False
+
+    def _add_motion(self, distance, elapsed):
+        if elapsed <= 0:
+            return
+        speed = distance / elapsed
+        # Rise at once so a rep starting after a hold gets full inference right away
+        if speed > self._motion:
+            self._motion = speed
+        else:
+            self._motion += 0.2 * (speed - self._motion)
+
+    def _update_interval(self):
+        stillness = max(0.0, 1.0 - self._motion / self.fast_motion)
+        interval = 1 + int(round((self.max_interval - 1) * stillness))
+        if self._latency is not None and self._frame_period:
+            interval = max(interval, math.ceil(self._latency / self._frame_period))
+        self.interval = max(1, min(self.max_interval, interval))
+
+    @staticmethod
+    def _smooth(average, sample, alpha):
+        if average is None:
+            return sample
+        return average + alpha * (sample - average)
@@ -0,0 +1,260 @@
+# modules/landmark_recorder.py
+#
+# Compact on-disk format for pose landmark streams.
+#
+# <name>.lmk      32-byte header followed by fixed-size float32 records. Each
+#                 record is [t, x0, y0, z0, v0, ..., x32, y32, z32, v32], where t
+#                 is seconds relative to the start time stored in the header.
+#                 Frames without a detected pose are stored as NaN landmarks.
+# <name>.lmk.idx  One float64 row per chunk: [first_t, last_t, first_frame, frames].
+#
+# Records are written a chunk at a time and never rewritten, so the data file
+# can be memory-mapped while the session is still being recorded.
+
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'RLMK'
+VERSION = 1
+NUM_LANDMARKS = 33
+NUM_FIELDS = 4  # x, y, z, visibility
+RECORD_FLOATS = 1 + NUM_LANDMARKS * NUM_FIELDS
+RECORD_SIZE = RECORD_FLOATS * 4
+HEADER_FORMAT = '<4sIIId4x4x'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+INDEX_COLUMNS = 4
+
+
+def index_path_for(path):
+    """
+    Return the path of the chunk index belonging to a recording.
+    """
+    return path + '.idx'
+
+
+def read_header(path):
+    """
+    Read and validate the header of a recording.
+
+    Parameters:
+    - path (str): Path of the .lmk file.
+
+    Returns:
+    - start_time (float): Absolute time of the recording's zero point.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        raise ValueError(f"Truncated landmark recording header: {path}")
+    magic, version, num_landmarks, num_fields, start_time = struct.unpack(HEADER_FORMAT, header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a landmark recording: {path}")
+    if (num_landmarks, num_fields) != (NUM_LANDMARKS, NUM_FIELDS):
+        raise ValueError(f"Unsupported landmark layout {num_landmarks}x{num_fields}: {path}")
+    return start_time
+
+
+class LandmarkRecorder:
+    def __init__(self, path, chunk_frames=256, start_time=None):
+        """
+        Open a landmark recording for appending, creating it if necessary.
+
+        Parameters:
+        - path (str): Path of the .lmk file.
+        - chunk_frames (int): Frames buffered in memory before a chunk is written.
+        - start_time (float): Zero point for timestamps of a new recording;
+          defaults to the first appended timestamp.
+        """
+        self.path = path
+        self.chunk_frames = chunk_frames
+        self._buffer = np.empty((chunk_frames, RECORD_FLOATS), dtype=np.float32)
+        self._buffered = 0
+
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            self.start_time = read_header(path)
+            self._file = open(path, 'r+b')
+            self.frames = self._truncate_partial_record()
+            self._index = open(index_path_for(path), 'ab')
+            self._reindex_tail()
+        else:
+            self.start_time = start_time
+            self._file = open(path, 'w+b')
+            self.frames = 0
+            self._index = open(index_path_for(path), 'wb')
+            if start_time is not None:
+                self._write_header()
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, NUM_LANDMARKS, NUM_FIELDS,
+                                     self.start_time))
+        self._file.flush()
+
+    def _truncate_partial_record(self):
+        # A crash can leave half a record at the end of the file
+        size = os.path.getsize(self.path)
+        frames = (size - HEADER_SIZE) // RECORD_SIZE
+        self._file.truncate(HEADER_SIZE + frames * RECORD_SIZE)
+        self._file.seek(0, os.SEEK_END)
+        return frames
+
+    def _reindex_tail(self):
+        # Index any frames written after the last complete index entry
+        index = load_index(self.path)
+        indexed = int(index[-1, 2] + index[-1, 3]) if len(index) else 0
+        if indexed < self.frames:
+            data = np.memmap(self.path, dtype=np.float32, mode='r', offset=HEADER_SIZE,
+                             shape=(self.frames, RECORD_FLOATS))
+            timestamps = data[indexed:, 0]
+            self._write_index_entry(timestamps[0], timestamps[-1], indexed, self.frames - indexed)
+            del data
+
+    def _write_index_entry(self, first_t, last_t, first_frame, frames):
+        entry = np.array([first_t, last_t, first_frame, frames], dtype=np.float64)
+        self._index.write(entry.tobytes())
+        self._index.flush()
+
+    def append(self, timestamp, landmarks):
+        """
+        Append one frame.
+
+        Parameters:
+        - timestamp (float): Absolute capture time in seconds.
+        - landmarks (numpy.ndarray or None): (33, 4) array of x, y, z, visibility,
+          or None if no pose was detected.
+        """
+        if self.start_time is None:
+            self.start_time = timestamp
+            self._write_header()
+
+        record = self._buffer[self._buffered]
+        record[0] = timestamp - self.start_time
+        if landmarks is None:
+            record[1:] = np.nan
+        else:
+            record[1:] = np.asarray(landmarks, dtype=np.float32).reshape(-1)
+        self._buffered += 1
+
+        if self._buffered == self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        """
+        Write buffered frames to disk as one chunk.
+        """
+        if not self._buffered:
+            return
+        chunk = self._buffer[:self._buffered]
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(chunk.tobytes())
+        self._file.flush()
+        self._write_index_entry(chunk[0, 0], chunk[-1, 0], self.frames, self._buffered)
+        self.frames += self._buffered
+        self._buffered = 0
+
+    def close(self):
+        """
+        Flush remaining frames and close the files.
+        """
+        self.flush()
+        self._file.close()
+        self._index.close()
+
+
+def load_index(path):
+    """
+    Load the chunk index of a recording.
+
+    Parameters:
+    - path (str): Path of the .lmk file.
+
+    Returns:
+    - numpy.ndarray: (chunks, 4) array of first_t, last_t, first_frame, frames.
+    """
+    index_path = index_path_for(path)
+    if not os.path.exists(index_path):
+        return np.empty((0, INDEX_COLUMNS), dtype=np.float64)
+    index = np.fromfile(index_path, dtype=np.float64)
+    return index[:len(index) - len(index) % INDEX_COLUMNS].reshape(-1, INDEX_COLUMNS)
+
+
+class LandmarkRecording:
+    def __init__(self, path):
+        """
+        Memory-map a landmark recording for reading.
+
+        Parameters:
+        - path (str): Path of the .lmk file.
+        """
+        self.path = path
+        self.start_time = read_header(path)
+        frames = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+        if frames:
+            self._data = np.memmap(path, dtype=np.float32, mode='r', offset=HEADER_SIZE,
+                                   shape=(frames, RECORD_FLOATS))
+        else:
+            self._data = np.empty((0, RECORD_FLOATS), dtype=np.float32)
+        self.index = load_index(path)
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def timestamps(self):
+        """
+        (N,) float32 array of timestamps relative to start_time.
+        """
+        return self._data[:, 0]
+
+    @property
+    def landmarks(self):
+        """
+        (N, 33, 4) float32 view of all landmarks.
+        """
+        return self._data[:, 1:].reshape(-1, NUM_LANDMARKS, NUM_FIELDS)
+
+    def frame_range(self, start, end):
+        """
+        Find the frames whose relative timestamps fall in [start, end).
+
+        Only the chunks overlapping the range are searched.
+
+        Parameters:
+        - start (float): Start time in seconds relative to start_time.
+        - end (float): End time in seconds relative to start_time.
+
+        Returns:
+        - tuple: (first, stop) frame indices suitable for slicing.
+        """
+        if len(self.index) == 0:
+            timestamps = self.timestamps
+            return (int(np.searchsorted(timestamps, start, side='left')),
+                    int(np.searchsorted(timestamps, end, side='left')))
+
+        first_chunk = int(np.searchsorted(self.index[:, 1], start, side='left'))
+        last_chunk = int(np.searchsorted(self.index[:, 0], end, side='left'))
+        if first_chunk >= last_chunk:
+            return 0, 0
+
+        lo = int(self.index[first_chunk, 2])
+        hi = min(int(self.index[last_chunk - 1, 2] + self.index[last_chunk - 1, 3]), len(self))
+        timestamps = self.timestamps[lo:hi]
+        return (lo + int(np.searchsorted(timestamps, start, side='left')),
+                lo + int(np.searchsorted(timestamps, end, side='left')))
+
+    def read_range(self, start, end):
+        """
+        Read the frames whose relative timestamps fall in [start, end).
+
+        Parameters:
+        - start (float): Start time in seconds relative to start_time.
+        - end (float): End time in seconds relative to start_time.
+
+        Returns:
+        - timestamps (numpy.ndarray): (M,) relative timestamps.
+        - landmarks (numpy.ndarray): (M, 33, 4) landmarks.
+        """
+        first, stop = self.frame_range(start, end)
+        return self.timestamps[first:stop], self.landmarks[first:stop]
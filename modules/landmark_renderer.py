@@ -0,0 +1,95 @@
+# modules/landmark_renderer.py
+#
+# Exercise overlay drawn straight from the landmark array with OpenCV. Only the
+# segments and joints of the current exercise are drawn: all segments in one
+# cv2.polylines call, then one cv2.circle per joint.
+
+import cv2
+import numpy as np
+
+from modules.landmarks import LANDMARK_INDEX
+
+# Segments drawn for each exercise. "{side}" is replaced by the focus side.
+EXERCISE_CONNECTIONS = {
+    "Knee Exercise": [('{side}_HIP', '{side}_KNEE'), ('{side}_KNEE', '{side}_ANKLE')],
+    "Squat Exercise": [('{side}_HIP', '{side}_KNEE'), ('{side}_KNEE', '{side}_ANKLE')],
+    "Shoulder Exercise": [('{side}_SHOULDER', '{side}_ELBOW'), ('{side}_ELBOW', '{side}_WRIST')],
+    "Back Exercise": [('LEFT_SHOULDER', 'RIGHT_SHOULDER'), ('LEFT_HIP', 'RIGHT_HIP')],
+}
+
+
+def compile_connections(connections, focus_side):
+    """
+    Resolve an exercise's segments to index arrays.
+
+    Parameters:
+    - connections (list of tuple): (landmark name, landmark name) segments.
+    - focus_side (str): 'left' or 'right'.
+
+    Returns:
+    - joints (numpy.ndarray): Landmark indices of every joint used, once each.
+    - segments (numpy.ndarray): (S, 2) positions of each segment's ends in joints.
+    """
+    side = focus_side.upper()
+    pairs = [[LANDMARK_INDEX[name.format(side=side)] for name in pair] for pair in connections]
+    joints, segments = np.unique(np.array(pairs, dtype=np.intp), return_inverse=True)
+    return joints, segments.reshape(-1, 2)
+
+
+class LandmarkRenderer:
+    def __init__(self, landmark_color=(245, 117, 66), connection_color=(245, 66, 230), thickness=2,
+                 circle_radius=2, min_visibility=0.5):
+        """
+        Draw the joints of the current exercise from a landmark array.
+
+        Parameters:
+        - landmark_color (tuple): BGR color of the joints.
+        - connection_color (tuple): BGR color of the segments.
+        - thickness (int): Line thickness in pixels.
+        - circle_radius (int): Joint radius in pixels.
+        - min_visibility (float): Joints less visible than this, and their segments, are not drawn.
+        """
+        self.thickness = thickness
+        self.circle_radius = circle_radius
+        self.min_visibility = min_visibility
+        # (joint color, segment color) per is_rgb, so no color is built per frame
+        self._colors = {
+            False: (tuple(landmark_color), tuple(connection_color)),
+            True: (tuple(landmark_color[::-1]), tuple(connection_color[::-1])),
+        }
+        self._plans = {}
+        for exercise, connections in EXERCISE_CONNECTIONS.items():
+            for side in ('left', 'right'):
+                self._plans[(exercise, side)] = compile_connections(connections, side)
+
+    def draw(self, image, landmarks, exercise, focus_side, is_rgb=True):
+        """
+        Draw the exercise's segments and joints on the image.
+
+        Parameters:
+        - image (numpy.ndarray): Image to draw on, in place.
+        - landmarks (numpy.ndarray): (33, 4) array of normalized x, y, z, visibility, or None.
+        - exercise (str): Current exercise name.
+        - focus_side (str): 'left' or 'right'.
+        - is_rgb (bool): True if the image is RGB rather than BGR.
+
+        Returns:
+        - image (numpy.ndarray): The same image.
+        """
+        plan = self._plans.get((exercise, focus_side.lower()))
+        if plan is None or landmarks is None:
+            return image
+        joints, segments = plan
+
+        h, w = image.shape[:2]
+        points = landmarks[joints]
+        pixels = np.rint(points[:, :2] * (w, h)).astype(np.int32)
+        visible = points[:, 3] >= self.min_visibility
+        landmark_color, connection_color = self._colors[is_rgb]
+
+        shown = segments[visible[segments].all(axis=1)]
+        if len(shown):
+            cv2.polylines(image, pixels[shown], False, connection_color, self.thickness, cv2.LINE_AA)
+        for x, y in pixels[visible].tolist():
+            cv2.circle(image, (x, y), self.circle_radius, landmark_color, self.thickness, cv2.LINE_AA)
+        return image
@@ -0,0 +1,85 @@
+# modules/landmarks.py
+#
+# MediaPipe Pose landmark layout, usable without importing MediaPipe.
+
+# Same order as mediapipe.solutions.pose.PoseLandmark
+LANDMARK_NAMES = [
+    'NOSE', 'LEFT_EYE_INNER', 'LEFT_EYE', 'LEFT_EYE_OUTER', 'RIGHT_EYE_INNER', 'RIGHT_EYE',
+    'RIGHT_EYE_OUTER', 'LEFT_EAR', 'RIGHT_EAR', 'MOUTH_LEFT', 'MOUTH_RIGHT',
+    'LEFT_SHOULDER', 'RIGHT_SHOULDER', 'LEFT_ELBOW', 'RIGHT_ELBOW', 'LEFT_WRIST', 'RIGHT_WRIST',
+    'LEFT_PINKY', 'RIGHT_PINKY', 'LEFT_INDEX', 'RIGHT_INDEX', 'LEFT_THUMB', 'RIGHT_THUMB',
+    'LEFT_HIP', 'RIGHT_HIP', 'LEFT_KNEE', 'RIGHT_KNEE', 'LEFT_ANKLE', 'RIGHT_ANKLE',
+    'LEFT_HEEL', 'RIGHT_HEEL', 'LEFT_FOOT_INDEX', 'RIGHT_FOOT_INDEX',
+]
+LANDMARK_INDEX = {name: i for i, name in enumerate(LANDMARK_NAMES)}
+NUM_LANDMARKS = len(LANDMARK_NAMES)
+
+# Index of each landmark's counterpart on the other side of the body
+MIRROR_INDEX = [LANDMARK_INDEX[name.replace('LEFT', '#').replace('RIGHT', 'LEFT').replace('#', 'RIGHT')]
+                for name in LANDMARK_NAMES]
+
+# Keys each exercise module expects, mapped to landmark names. "{side}" is
+# replaced by the focus side.
+EXERCISE_LANDMARKS = {
+    "Knee Exercise": {'hip': '{side}_HIP', 'knee': '{side}_KNEE', 'ankle': '{side}_ANKLE'},
+    "Squat Exercise": {'hip': '{side}_HIP', 'knee': '{side}_KNEE', 'ankle': '{side}_ANKLE'},
+    "Shoulder Exercise": {'shoulder': '{side}_SHOULDER', 'elbow': '{side}_ELBOW', 'wrist': '{side}_WRIST'},
+    "Back Exercise": {'left_shoulder': 'LEFT_SHOULDER', 'right_shoulder': 'RIGHT_SHOULDER',
+                      'left_hip': 'LEFT_HIP', 'right_hip': 'RIGHT_HIP'},
+}
+
+
+def exercise_landmark_indices(exercise, focus_side):
+    """
+    Resolve the landmark indices an exercise needs.
+
+    Parameters:
+    - exercise (str): Exercise name.
+    - focus_side (str): 'left' or 'right'.
+
+    Returns:
+    - dict: Landmark key -> landmark index, or None for an unsupported exercise.
+    """
+    names = EXERCISE_LANDMARKS.get(exercise)
+    if names is None:
+        return None
+    side = focus_side.upper()
+    return {key: LANDMARK_INDEX[name.format(side=side)] for key, name in names.items()}
+
+
+def relevant_landmarks_from_array(landmarks, exercise, focus_side):
+    """
+    Extract the landmarks an exercise needs from a full landmark array.
+
+    Parameters:
+    - landmarks (numpy.ndarray): (33, 4) array of x, y, z, visibility, or None.
+    - exercise (str): Exercise name.
+    - focus_side (str): 'left' or 'right'.
+
+    Returns:
+    - landmarks (dict): Landmark key -> [x, y] view, or None if unavailable.
+    """
+    if landmarks is None:
+        return None
+    indices = exercise_landmark_indices(exercise, focus_side)
+    if indices is None:
+        return None
+    return {key: landmarks[index, :2] for key, index in indices.items()}
+
+
+def mirror_landmarks(landmarks):
+    """
+    Mirror a landmark array horizontally.
+
+    x becomes 1 - x and left and right landmarks swap places, which is what the
+    pose model reports for the horizontally flipped image.
+
+    Parameters:
+    - landmarks (numpy.ndarray): (33, 4) array of x, y, z, visibility.
+
+    Returns:
+    - numpy.ndarray: A new mirrored array.
+    """
+    mirrored = landmarks[MIRROR_INDEX]
+    mirrored[:, 0] = 1.0 - mirrored[:, 0]
+    return mirrored
@@ -0,0 +1,611 @@
+# modules/pipeline.py
+
+import logging
+import threading
+import time
+from collections import deque
+from itertools import count
+
+import cv2
+import numpy as np
+
+from modules.instrumentation import PerfMonitor
+from modules.joint_angles import JointAngleEngine
+from modules.landmark_propagation import SparsePoseTracker
+from modules.landmark_renderer import LandmarkRenderer
+from modules.landmarks import mirror_landmarks
+
+logger = logging.getLogger(__name__)
+
+# Size of the image pose inference runs on, independent of the display size;
+# MediaPipe's landmark model itself works at 256x256
+INFERENCE_SIZE = (256, 192)
+
+
+class DropOldestQueue:
+    def __init__(self, maxsize=2, on_drop=None):
+        """
+        Initialize a bounded queue that discards its oldest item when full.
+
+        Parameters:
+        - maxsize (int): Maximum number of items held at once.
+        - on_drop (callable): Called with every item the queue discards.
+        """
+        self.maxsize = maxsize
+        self.on_drop = on_drop
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        """
+        Add an item, dropping the oldest one if the queue is full.
+
+        Parameters:
+        - item: The item to enqueue.
+        """
+        discarded = None
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                discarded = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+        if discarded is not None:
+            self._discard([discarded])
+
+    def get(self, timeout=None):
+        """
+        Remove and return the oldest item.
+
+        Parameters:
+        - timeout (float): Seconds to wait for an item, or None to wait forever.
+
+        Returns:
+        - The oldest item, or None if the wait timed out.
+        """
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def get_latest(self):
+        """
+        Return the newest item without waiting and discard everything older.
+
+        Returns:
+        - The newest item, or None if the queue is empty.
+        """
+        with self._cond:
+            if not self._items:
+                return None
+            item = self._items.pop()
+            discarded = list(self._items)
+            self.dropped += len(discarded)
+            self._items.clear()
+        self._discard(discarded)
+        return item
+
+    def clear(self):
+        """
+        Discard all queued items.
+        """
+        with self._cond:
+            discarded = list(self._items)
+            self._items.clear()
+        self._discard(discarded)
+
+    def _discard(self, items):
+        if self.on_drop is not None:
+            for item in items:
+                self.on_drop(item)
+
+
+class FramePool:
+    def __init__(self, shape, dtype=np.uint8, max_free=16):
+        """
+        Recycle image buffers so the per-frame path does not allocate.
+
+        A buffer is only handed out again after it has been released, so a
+        packet that is still in flight never has its image overwritten.
+
+        Parameters:
+        - shape (tuple): Shape of every buffer.
+        - dtype: Buffer data type.
+        - max_free (int): Maximum number of idle buffers kept for reuse.
+        """
+        self.shape = shape
+        self.dtype = dtype
+        self.max_free = max_free
+        self._free = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Return an idle buffer, allocating one if none is free.
+        """
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        return np.empty(self.shape, dtype=self.dtype)
+
+    def release(self, buffer):
+        """
+        Return a buffer to the pool.
+        """
+        with self._lock:
+            if len(self._free) < self.max_free and buffer.shape == self.shape:
+                self._free.append(buffer)
+
+
+class FramePacket:
+    def __init__(self, frame_id, timestamp, frame):
+        """
+        Carry one frame and everything computed for it through the pipeline.
+
+        Parameters:
+        - frame_id (int): Monotonic frame number.
+        - timestamp (float): Capture time in seconds.
+        - frame (numpy.ndarray): The captured BGR frame; preprocessing replaces it
+          with the mirrored RGB display image in self.image and the unmirrored RGB
+          inference image in self.inference_image.
+        """
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.frame = frame
+        self.image = None
+        self.inference_image = None
+        self.roi_tracking = False
+        self.results = None
+        self.landmarks = None
+        self.angles = None
+        self.exercise = None
+        self.metrics = None
+        self._pools = {}
+
+    def attach_image(self, pool):
+        """
+        Take a display image buffer from a pool; it is returned by release().
+
+        Parameters:
+        - pool (FramePool): Pool to take the buffer from.
+
+        Returns:
+        - numpy.ndarray: The buffer, also stored as self.image.
+        """
+        return self._attach('image', pool)
+
+    def attach_inference_image(self, pool):
+        """
+        Take an inference image buffer from a pool; it is returned by
+        release_inference_image() or release().
+
+        Parameters:
+        - pool (FramePool): Pool to take the buffer from.
+
+        Returns:
+        - numpy.ndarray: The buffer, also stored as self.inference_image.
+        """
+        return self._attach('inference_image', pool)
+
+    def release_inference_image(self):
+        """
+        Return the inference image buffer once inference is done with it.
+        """
+        self._detach('inference_image')
+
+    def release(self):
+        """
+        Return the packet's image buffers to their pools. Safe to call more than once.
+        """
+        for name in list(self._pools):
+            self._detach(name)
+
+    def _attach(self, name, pool):
+        self._detach(name)
+        buffer = pool.acquire()
+        self._pools[name] = pool
+        setattr(self, name, buffer)
+        return buffer
+
+    def _detach(self, name):
+        pool = self._pools.pop(name, None)
+        if pool is not None:
+            pool.release(getattr(self, name))
+            setattr(self, name, None)
+
+
+class PipelineStage(threading.Thread):
+    def __init__(self, name, func, inbox, outbox, stop_event):
+        """
+        Run one pipeline stage on its own worker thread.
+
+        Parameters:
+        - name (str): Stage name, used in error messages.
+        - func (callable): Stage body. Source stages take no argument; the others
+          take a FramePacket. Returning None drops (and releases) the packet.
+        - inbox (DropOldestQueue or None): Input queue, or None for a source stage.
+        - outbox (DropOldestQueue): Output queue.
+        - stop_event (threading.Event): Set to stop the stage.
+        """
+        super().__init__(name=f"pipeline-{name}", daemon=True)
+        self.stage_name = name
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop_event = stop_event
+
+    def run(self):
+        while not self.stop_event.is_set():
+            packet = None
+            try:
+                if self.inbox is None:
+                    result = self.func()
+                else:
+                    packet = self.inbox.get(timeout=0.1)
+                    if packet is None:
+                        continue
+                    result = self.func(packet)
+            except Exception:
+                logger.exception("Error in %s stage", self.stage_name)
+                result = None
+
+            if result is not None:
+                self.outbox.put(result)
+            elif packet is not None:
+                packet.release()
+
+
+def exercise_metrics(exercise_name, output):
+    """
+    Normalize the output tuple of an exercise module.
+
+    Parameters:
+    - exercise_name (str): Exercise that produced the output.
+    - output (tuple): Return value of the exercise's process() or process_angles().
+
+    Returns:
+    - metrics (dict): reps, feedback, points, achievements, knee_angle, back_angle, shoulder_angle.
+    """
+    knee_angle = back_angle = shoulder_angle = None
+    if exercise_name == "Squat Exercise":
+        reps, feedback, points, achievements, knee_angle, back_angle = output
+    elif exercise_name == "Back Exercise":
+        reps, feedback, points, achievements, back_angle = output
+    elif exercise_name == "Shoulder Exercise":
+        reps, feedback, points, achievements, shoulder_angle = output
+    else:  # Knee Exercise
+        reps, feedback, points, achievements, knee_angle = output
+
+    return {
+        'reps': reps,
+        'feedback': feedback,
+        'points': points,
+        'achievements': achievements,
+        'knee_angle': knee_angle,
+        'back_angle': back_angle,
+        'shoulder_angle': shoulder_angle,
+    }
+
+
+def evaluate_exercise(exercise_name, exercise_module, landmarks, timestamp=None):
+    """
+    Run an exercise module on its relevant landmarks.
+
+    Parameters:
+    - exercise_name (str): Current exercise name.
+    - exercise_module: The exercise instance to update.
+    - landmarks (dict): Relevant landmarks for the exercise.
+    - timestamp (float): Time of the frame in seconds, or None to use the module's clock.
+
+    Returns:
+    - metrics (dict): See exercise_metrics().
+    """
+    return exercise_metrics(exercise_name, exercise_module.process(landmarks, timestamp))
+
+
+def evaluate_exercise_angles(exercise_name, exercise_module, angles, focus_side='right', timestamp=None):
+    """
+    Run an exercise module on the shared per-frame joint angles.
+
+    Parameters:
+    - exercise_name (str): Current exercise name.
+    - exercise_module: The exercise instance to update.
+    - angles (JointAngles): Joint angles of the current frame.
+    - focus_side (str): 'left' or 'right'.
+    - timestamp (float): Time of the frame in seconds, or None to use the module's clock.
+
+    Returns:
+    - metrics (dict): See exercise_metrics().
+    """
+    return exercise_metrics(exercise_name,
+                            exercise_module.process_angles(angles, focus_side, timestamp))
+
+
+class ExercisePipeline:
+    def __init__(self, capture, pose_estimator, exercises, exercise_name,
+                 frame_size=(800, 600), focus_side='right', queue_size=2, sparse_inference=False,
+                 monitor=None, inference_size=INFERENCE_SIZE, roi_tracking=False):
+        """
+        Staged capture -> preprocess -> infer -> analyze -> render pipeline.
+
+        Each stage runs on its own thread and stages are joined by bounded
+        drop-oldest queues, so a slow stage sheds stale frames instead of
+        building up latency. The GUI only ever consumes the newest finished
+        packet via latest().
+
+        Inference runs on its own small, unmirrored copy of the frame and the
+        landmarks are mirrored afterwards, so its cost does not depend on the
+        display size and only the displayed image is flipped.
+
+        Parameters:
+        - capture (CameraSource or cv2.VideoCapture): Opened video source.
+        - pose_estimator (PoseEstimator): Pose estimator used by the infer stage.
+        - exercises (dict): Exercise name -> exercise module.
+        - exercise_name (str): Initially selected exercise.
+        - frame_size (tuple): (width, height) of the displayed frames.
+        - focus_side (str): 'left' or 'right'.
+        - queue_size (int): Capacity of each inter-stage queue.
+        - sparse_inference (bool): Infer only keyframes and propagate landmarks
+          with optical flow in between (see SparsePoseTracker).
+        - monitor (PerfMonitor): Receives the stage timings; a new one is created if None.
+        - inference_size (tuple): (width, height) of the image pose inference runs on.
+        - roi_tracking (bool): Run inference on a crop around the previous pose (see
+          PoseEstimator). The crop is taken from the display-size frame rather than
+          the small inference image, which it would otherwise have to upscale.
+        """
+        self.capture = capture
+        self.pose_estimator = pose_estimator
+        self.exercises = exercises
+        self.frame_size = frame_size
+        self.inference_size = inference_size
+        self.focus_side = focus_side
+        self.joint_engine = JointAngleEngine()
+        self.renderer = LandmarkRenderer()
+        self.monitor = monitor if monitor is not None else PerfMonitor()
+
+        self._lock = threading.Lock()
+        self._exercise_name = exercise_name
+        self._running = False
+        self._rep_sink = None
+        self._frame_ids = count()
+        self._recorder_lock = threading.Lock()
+        self._recorder = None
+        self._sparse_tracker = SparsePoseTracker(pose_estimator) if sparse_inference else None
+        self._roi_tracking = roi_tracking
+
+        # Reused buffers for the display-size frame; only the final RGB images
+        # travel with the packet, so they come from pools released downstream
+        width, height = frame_size
+        self._resized = np.empty((height, width, 3), dtype=np.uint8)
+        self._rgb = np.empty((height, width, 3), dtype=np.uint8)
+        self.frame_pool = FramePool((height, width, 3))
+        inference_width, inference_height = inference_size
+        self.inference_pool = FramePool((inference_height, inference_width, 3))
+        # In ROI tracking mode the unmirrored display-size frame is the inference image
+        self.roi_pool = FramePool((height, width, 3))
+
+        self._stop_event = threading.Event()
+        self.queues = [DropOldestQueue(queue_size, on_drop=FramePacket.release) for _ in range(4)]
+        self.output = DropOldestQueue(1, on_drop=FramePacket.release)
+        self._stages = []
+
+    def set_exercise(self, exercise_name):
+        """
+        Switch the exercise evaluated by the analyze stage.
+        """
+        with self._lock:
+            self._exercise_name = exercise_name
+
+    def set_running(self, running):
+        """
+        Enable or disable exercise evaluation in the analyze stage.
+        """
+        with self._lock:
+            self._running = running
+
+    def set_recorder(self, recorder):
+        """
+        Start or stop recording landmarks of every analyzed frame.
+
+        Parameters:
+        - recorder (LandmarkRecorder or None): Recorder to append to, or None to stop.
+
+        Returns:
+        - The previous recorder, which the caller is responsible for closing.
+        """
+        with self._recorder_lock:
+            previous = self._recorder
+            self._recorder = recorder
+        return previous
+
+    def set_rep_sink(self, sink):
+        """
+        Set where completed reps are sent. The sink is called on the analyze
+        thread, so it should only hand the events off (e.g. to
+        ProgressTracker.record_rep_events, which queues them).
+
+        Parameters:
+        - sink (callable or None): Called as sink(exercise_name, events) with the
+          events of ExerciseCounter.pop_events(), or None to discard them.
+
+        Returns:
+        - The previous sink.
+        """
+        with self._lock:
+            previous = self._rep_sink
+            self._rep_sink = sink
+        return previous
+
+    def set_sparse_inference(self, enabled):
+        """
+        Switch between inferring every frame and sparse inference with
+        optical-flow propagation. Enabling always starts from a keyframe.
+        """
+        with self._lock:
+            self._sparse_tracker = SparsePoseTracker(self.pose_estimator) if enabled else None
+
+    def set_roi_tracking(self, enabled):
+        """
+        Switch between inferring the whole downscaled frame and ROI tracking on
+        the display-size frame.
+        """
+        with self._lock:
+            self._roi_tracking = enabled
+
+    def start(self):
+        """
+        Start all stage threads.
+        """
+        if self._stages:
+            return
+        self._stop_event.clear()
+        funcs = [
+            ("source", self._source),
+            ("preprocess", self._preprocess),
+            ("infer", self._infer),
+            ("analyze", self._analyze),
+            ("render", self._render),
+        ]
+        inboxes = [None] + self.queues
+        outboxes = self.queues + [self.output]
+        for (name, func), inbox, outbox in zip(funcs, inboxes, outboxes):
+            stage = PipelineStage(name, func, inbox, outbox, self._stop_event)
+            self._stages.append(stage)
+            stage.start()
+
+    def stop(self, timeout=1.0):
+        """
+        Stop all stage threads and wait for them to exit.
+
+        Parameters:
+        - timeout (float): Seconds to wait for each stage.
+        """
+        self._stop_event.set()
+        for stage in self._stages:
+            stage.join(timeout)
+        self._stages = []
+        for queue in self.queues + [self.output]:
+            queue.clear()
+
+    def latest(self):
+        """
+        Return the newest fully processed packet, or None if none is ready.
+
+        The packet's image is an RGB buffer from the frame pool; call
+        packet.release() once it has been displayed.
+        """
+        return self.output.get_latest()
+
+    @property
+    def dropped_frames(self):
+        """
+        Total number of packets discarded by the inter-stage queues.
+        """
+        return sum(queue.dropped for queue in self.queues + [self.output])
+
+    def _source(self):
+        # A CameraSource hands out its newest frame with the time it was grabbed
+        read_latest = getattr(self.capture, 'read_latest', None)
+        with self.monitor.time('capture'):
+            if read_latest is not None:
+                frame, timestamp = read_latest()
+                ret = frame is not None
+            else:
+                ret, frame = self.capture.read()
+                timestamp = time.time()
+        if not ret:
+            logger.warning("Failed to grab frame")
+            time.sleep(0.01)
+            return None
+        return FramePacket(next(self._frame_ids), timestamp, frame)
+
+    def _preprocess(self, packet):
+        # Resize first so the color conversion and mirror run on the smaller image;
+        # this is the only color conversion on the way to the screen
+        monitor = self.monitor
+        with self._lock:
+            packet.roi_tracking = self._roi_tracking
+        with monitor.time('resize'):
+            cv2.resize(packet.frame, self.frame_size, dst=self._resized)
+        with monitor.time('color'):
+            # ROI tracking crops from this unmirrored frame, so it travels with the packet
+            rgb = packet.attach_inference_image(self.roi_pool) if packet.roi_tracking else self._rgb
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=rgb)
+        with monitor.time('flip'):
+            cv2.flip(rgb, 1, dst=packet.attach_image(self.frame_pool))  # Mirror the displayed image
+        if not packet.roi_tracking:
+            with monitor.time('downscale'):
+                cv2.resize(rgb, self.inference_size, dst=packet.attach_inference_image(self.inference_pool),
+                           interpolation=cv2.INTER_LINEAR)
+        packet.frame = None
+        return packet
+
+    def _infer(self, packet):
+        with self._lock:
+            tracker = self._sparse_tracker
+        if packet.roi_tracking != self.pose_estimator.roi_tracking:
+            # The inference image changes size; start both trackers over
+            self.pose_estimator.roi_tracking = packet.roi_tracking
+            self.pose_estimator.reset_tracking()
+            if tracker is not None:
+                tracker.reset()
+        with self.monitor.time('pose'):
+            if tracker is not None:
+                results, landmarks, _ = tracker.process(packet.inference_image, packet.timestamp)
+            else:
+                _, results = self.pose_estimator.process_frame(packet.inference_image, is_rgb=True)
+                landmarks = self.pose_estimator.get_landmark_array(results)
+        packet.release_inference_image()
+        # Unmirrored, in inference image coordinates; later stages use packet.landmarks
+        packet.results = results
+
+        # Landmarks are mirrored to match the displayed image; a fresh array per
+        # packet, as it travels through later stages on other threads
+        with self.monitor.time('mirror'):
+            packet.landmarks = mirror_landmarks(landmarks) if landmarks is not None else None
+        return packet
+
+    def _analyze(self, packet):
+        with self._lock:
+            exercise_name = self._exercise_name
+            running = self._running
+            rep_sink = self._rep_sink
+        packet.exercise = exercise_name
+
+        with self._recorder_lock:
+            if self._recorder is not None:
+                self._recorder.append(packet.timestamp, packet.landmarks)
+
+        if packet.landmarks is None:
+            return packet
+
+        # Every joint angle of the frame, shared by the exercise, overlay and UI
+        with self.monitor.time('angles'):
+            packet.angles = self.joint_engine.compute(packet.landmarks)
+        if running:
+            exercise_module = self.exercises[exercise_name]
+            with self.monitor.time('exercise'):
+                packet.metrics = evaluate_exercise_angles(exercise_name, exercise_module, packet.angles,
+                                                          self.focus_side, packet.timestamp)
+            events = exercise_module.pop_rep_events()
+            if events and rep_sink is not None:
+                rep_sink(exercise_name, events)
+        return packet
+
+    def _render(self, packet):
+        with self.monitor.time('draw'):
+            self.renderer.draw(packet.image, packet.landmarks, packet.exercise, self.focus_side, is_rgb=True)
+
+        # Label the exercise's joint with its current angle
+        if packet.angles is not None:
+            joint = self.exercises[packet.exercise].joint_name(self.focus_side)
+            angle = packet.angles.get(joint)
+            if angle is not None:
+                h, w = packet.image.shape[:2]
+                x, y = self.joint_engine.vertex(joint, packet.landmarks)
+                cv2.putText(packet.image, f"{int(angle)}", (int(x * w) + 10, int(y * h)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2, cv2.LINE_AA)
+        return packet
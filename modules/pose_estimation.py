@@ -1,95 +1,232 @@
 # modules/pose_estimation.py
-import os
 
 import cv2
 import mediapipe as mp
-from PyQt5 import Qt
-from PyQt5.QtGui import QIcon, QMovie
-from PyQt5.QtWidgets import QWidget, QMessageBox, QVBoxLayout, QLabel
+import numpy as np
 
-from utils.helper_functions import convert_cv_qt
+from modules.landmark_renderer import LandmarkRenderer
+from modules.landmarks import EXERCISE_LANDMARKS, NUM_LANDMARKS, exercise_landmark_indices
+
+# Wire layout of a NormalizedLandmark with x, y, z, visibility and presence all
+# set, as MediaPipe Pose produces them: a 2-byte submessage header followed by
+# five (1-byte tag, 4-byte float) fields.
+_LANDMARK_RECORD_SIZE = 27
+_LANDMARK_TAGS = [(0, 0x0a), (2, 0x0d), (7, 0x15), (12, 0x1d), (17, 0x25), (22, 0x2d)]
+
+
+def landmarks_to_array(landmark_list, out=None):
+    """
+    Convert a NormalizedLandmarkList to a (N, 4) float32 array of x, y, z, visibility.
+
+    The list is serialized once and its float fields are read straight out of
+    the wire bytes, which is much cheaper than reading 4 attributes of every
+    landmark. Lists that do not have the expected layout fall back to
+    attribute access.
+
+    Parameters:
+    - landmark_list: NormalizedLandmarkList with the pose landmarks.
+    - out (numpy.ndarray): Optional (N, 4) float32 array to fill instead of allocating.
+
+    Returns:
+    - numpy.ndarray: The filled array.
+    """
+    landmarks = landmark_list.landmark
+    count = len(landmarks)
+    if out is None:
+        out = np.empty((count, 4), dtype=np.float32)
+
+    data = landmark_list.SerializeToString()
+    if len(data) == count * _LANDMARK_RECORD_SIZE and all(
+            data[offset::_LANDMARK_RECORD_SIZE] == bytes((tag,)) * count
+            for offset, tag in _LANDMARK_TAGS):
+        # Float fields start 1 byte after each of the first four field tags
+        np.copyto(out, np.ndarray((count, 4), dtype='<f4', buffer=data, offset=3,
+                                  strides=(_LANDMARK_RECORD_SIZE, 5)))
+        return out
+
+    out[:] = [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks]
+    return out
 
 
 class PoseEstimator:
-    def __init__(self, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+    def __init__(self, min_detection_confidence=0.5, min_tracking_confidence=0.5,
+                 roi_tracking=False, roi_padding=0.25, roi_input_size=256):
+        """
+        Initialize the PoseEstimator with MediaPipe's Pose solution.
+
+        Parameters:
+        - min_detection_confidence (float): MediaPipe detection confidence.
+        - min_tracking_confidence (float): MediaPipe tracking confidence.
+        - roi_tracking (bool): Run inference on a crop around the previous pose
+          instead of the full frame.
+        - roi_padding (float): Padding added on each side of the pose, as a
+          fraction of its size.
+        - roi_input_size (int): Side in pixels larger crops are resized to before inference;
+          smaller crops are used as they are. Give this mode frames larger than the
+          crop, such as ExercisePipeline's display-size frames.
+        """
         self.mp_pose = mp.solutions.pose
         self.pose = self.mp_pose.Pose(min_detection_confidence=min_detection_confidence,
                                       min_tracking_confidence=min_tracking_confidence)
-        self.mp_drawing = mp.solutions.drawing_utils
-
-    def process_frame(self, frame):
+        self.renderer = LandmarkRenderer()
+
+        # Reused by get_relevant_landmarks and draw_landmarks so the per-frame path does not allocate
+        self._landmark_buffer = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._draw_buffer = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+
+        # Landmark keys and indices of every exercise and side, resolved once
+        self._relevant_indices = {}
+        for exercise in EXERCISE_LANDMARKS:
+            for side in ('left', 'right'):
+                indices = exercise_landmark_indices(exercise, side)
+                self._relevant_indices[(exercise, side)] = (list(indices),
+                                                            np.array(list(indices.values())))
+
+        # Region of interest tracking: (x0, y0, side) in pixels of the current
+        # square crop, or None while searching the full frame
+        self.roi_tracking = roi_tracking
+        self.roi_padding = roi_padding
+        self.roi_input_size = roi_input_size
+        self._roi = None
+        self._roi_buffer = np.empty((roi_input_size, roi_input_size, 3), dtype=np.uint8)
+        self._roi_landmarks = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+
+    def process_frame(self, frame, is_rgb=False):
         """
         Process the frame for pose estimation.
 
         Parameters:
         - frame (numpy.ndarray): The image frame to process.
+        - is_rgb (bool): True if the frame is already RGB, which skips the color conversion.
 
         Returns:
-        - image (numpy.ndarray): The image with pose landmarks drawn.
+        - image (numpy.ndarray): The input frame, unchanged.
         - results (mediapipe.framework.formats.landmark_pb2.NormalizedLandmarkList): Pose estimation results.
         """
-        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.pose.process(image)
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-        return image, results
+        image = frame if is_rgb else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if self.roi_tracking:
+            results = self._process_tracked(image)
+        else:
+            results = self._process(image)
+        return frame, results
+
+    def warm_up(self, frame_size=(800, 600)):
+        """
+        Run a blank frame through the graph. MediaPipe loads the model and sets
+        up its inference delegate on the first frame; doing it here keeps that
+        cost away from the first camera frame.
+
+        Parameters:
+        - frame_size (tuple): (width, height) of the frames that will follow.
+        """
+        width, height = frame_size
+        self.process_frame(np.zeros((height, width, 3), dtype=np.uint8), is_rgb=True)
+        self.reset_tracking()
+
+    def reset_tracking(self):
+        """
+        Forget the tracked region so the next frame is searched in full.
+        """
+        self._roi = None
+
+    def _process(self, image):
+        # Read-only input lets MediaPipe use the buffer without copying it
+        image.flags.writeable = False
+        try:
+            return self.pose.process(image)
+        finally:
+            image.flags.writeable = True
+
+    def _process_tracked(self, image):
+        """
+        Run inference on the tracked region, falling back to the full frame.
+
+        Landmarks found in the crop are mapped back to full-frame normalized
+        coordinates, so callers cannot tell the two paths apart.
+        """
+        h, w = image.shape[:2]
+        if self._roi is not None:
+            x0, y0, side = self._roi
+            crop = image[y0:y0 + side, x0:x0 + side]
+            if side > self.roi_input_size:
+                size = (self.roi_input_size, self.roi_input_size)
+                crop = cv2.resize(crop, size, dst=self._roi_buffer, interpolation=cv2.INTER_LINEAR)
+            else:
+                # Never upscale: that only adds pixels for the same information
+                crop = np.ascontiguousarray(crop)
+            results = self._process(crop)
+            if results.pose_landmarks:
+                self._map_from_roi(results.pose_landmarks, x0, y0, side, w, h)
+                self._update_roi(results.pose_landmarks, w, h)
+                return results
+            # Tracking lost: search the whole frame again
+            self._roi = None
+
+        results = self._process(image)
+        if results.pose_landmarks:
+            self._update_roi(results.pose_landmarks, w, h)
+        return results
+
+    def _map_from_roi(self, landmark_list, x0, y0, side, w, h):
+        scale_x, scale_y = side / w, side / h
+        offset_x, offset_y = x0 / w, y0 / h
+        for landmark in landmark_list.landmark:
+            landmark.x = offset_x + landmark.x * scale_x
+            landmark.y = offset_y + landmark.y * scale_y
+            # z uses the same scale as x
+            landmark.z = landmark.z * scale_x
+
+    def _update_roi(self, landmark_list, w, h):
+        """
+        Fit the square crop around the visible landmarks.
 
-    def draw_landmarks(self, image, results, exercise, focus_side):
+        The crop only moves when the pose gets close to its edge or becomes
+        much smaller than it, so MediaPipe's own tracking sees a steady image.
         """
-        Draw pose landmarks on the image based on the exercise.
+        points = landmarks_to_array(landmark_list, out=self._roi_landmarks)
+        visible = points[points[:, 3] >= 0.5]
+        if len(visible) < 2:
+            self._roi = None
+            return
+
+        xs = np.clip(visible[:, 0], 0.0, 1.0) * w
+        ys = np.clip(visible[:, 1], 0.0, 1.0) * h
+        left, right, top, bottom = xs.min(), xs.max(), ys.min(), ys.max()
+        size = max(right - left, bottom - top)
+        wanted = size * (1 + 2 * self.roi_padding)
+
+        if self._roi is not None:
+            x0, y0, side = self._roi
+            margin = size * self.roi_padding / 2
+            inside = ((x0 == 0 or left - x0 >= margin) and
+                      (y0 == 0 or top - y0 >= margin) and
+                      (x0 + side == w or x0 + side - right >= margin) and
+                      (y0 + side == h or y0 + side - bottom >= margin))
+            if inside and wanted >= 0.6 * side:
+                return
+
+        side = int(min(max(wanted, 64), w, h))
+        center_x, center_y = (left + right) / 2, (top + bottom) / 2
+        x0 = int(min(max(center_x - side / 2, 0), w - side))
+        y0 = int(min(max(center_y - side / 2, 0), h - side))
+        self._roi = (x0, y0, side)
+
+    def draw_landmarks(self, image, results, exercise, focus_side, is_rgb=False):
+        """
+        Draw the joints of the exercise on the image.
 
         Parameters:
         - image (numpy.ndarray): The image to draw landmarks on.
         - results (mediapipe.framework.formats.landmark_pb2.NormalizedLandmarkList): Pose estimation results.
         - exercise (str): Current exercise name.
         - focus_side (str): 'left' or 'right' to specify the side.
+        - is_rgb (bool): True if the image is RGB rather than BGR.
 
         Returns:
         - image (numpy.ndarray): The image with drawn landmarks.
         """
-        if results.pose_landmarks:
-            # Define connections based on exercise
-            connections = []
-            if exercise in ["Knee Exercise", "Squat Exercise"]:
-                if focus_side.lower() == 'left':
-                    connections = [
-                        (self.mp_pose.PoseLandmark.LEFT_HIP.value, self.mp_pose.PoseLandmark.LEFT_KNEE.value),
-                        (self.mp_pose.PoseLandmark.LEFT_KNEE.value, self.mp_pose.PoseLandmark.LEFT_ANKLE.value)
-                    ]
-                else:
-                    connections = [
-                        (self.mp_pose.PoseLandmark.RIGHT_HIP.value, self.mp_pose.PoseLandmark.RIGHT_KNEE.value),
-                        (self.mp_pose.PoseLandmark.RIGHT_KNEE.value, self.mp_pose.PoseLandmark.RIGHT_ANKLE.value)
-                    ]
-            elif exercise == "Shoulder Exercise":
-                if focus_side.lower() == 'left':
-                    connections = [
-                        (self.mp_pose.PoseLandmark.LEFT_SHOULDER.value, self.mp_pose.PoseLandmark.LEFT_ELBOW.value),
-                        (self.mp_pose.PoseLandmark.LEFT_ELBOW.value, self.mp_pose.PoseLandmark.LEFT_WRIST.value)
-                    ]
-                else:
-                    connections = [
-                        (self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value, self.mp_pose.PoseLandmark.RIGHT_ELBOW.value),
-                        (self.mp_pose.PoseLandmark.RIGHT_ELBOW.value, self.mp_pose.PoseLandmark.RIGHT_WRIST.value)
-                    ]
-            elif exercise == "Back Exercise":
-                connections = [
-                    (self.mp_pose.PoseLandmark.LEFT_SHOULDER.value, self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value),
-                    (self.mp_pose.PoseLandmark.LEFT_HIP.value, self.mp_pose.PoseLandmark.RIGHT_HIP.value)
-                ]
-            else:
-                # Unsupported exercise
-                return image
-
-            # Draw the landmarks
-            self.mp_drawing.draw_landmarks(
-                image,
-                results.pose_landmarks,
-                self.mp_pose.POSE_CONNECTIONS,
-                self.mp_drawing.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=2),
-                self.mp_drawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2)
-            )
-
-        return image
+        landmarks = self.get_landmark_array(results, out=self._draw_buffer)
+        return self.renderer.draw(image, landmarks, exercise, focus_side, is_rgb=is_rgb)
 
     def get_relevant_landmarks(self, results, exercise, focus_side):
         """
@@ -101,216 +238,37 @@ class PoseEstimator:
         - focus_side (str): 'left' or 'right'.
 
         Returns:
-        - landmarks (dict): Relevant landmarks with their coordinates.
+        - landmarks (dict): Relevant landmarks as [x, y] views into one small array.
         """
-        if not results.pose_landmarks:
+        table = self._relevant_indices.get((exercise, focus_side.lower()))
+        if table is None:
+            # Unsupported exercise
             return None
 
-        landmarks = {}
-        pose_landmarks = results.pose_landmarks.landmark
-
-        try:
-            if exercise in ["Knee Exercise", "Squat Exercise"]:
-                side = focus_side.lower()
-                landmarks['hip'] = [pose_landmarks[self.mp_pose.PoseLandmark[f"{side.upper()}_HIP"].value].x,
-                                    pose_landmarks[self.mp_pose.PoseLandmark[f"{side.upper()}_HIP"].value].y]
-                landmarks['knee'] = [pose_landmarks[self.mp_pose.PoseLandmark[f"{side.upper()}_KNEE"].value].x,
-                                     pose_landmarks[self.mp_pose.PoseLandmark[f"{side.upper()}_KNEE"].value].y]
-                landmarks['ankle'] = [pose_landmarks[self.mp_pose.PoseLandmark[f"{side.upper()}_ANKLE"].value].x,
-                                      pose_landmarks[self.mp_pose.PoseLandmark[f"{side.upper()}_ANKLE"].value].y]
-            elif exercise == "Shoulder Exercise":
-                side = focus_side.lower()
-                landmarks['shoulder'] = [pose_landmarks[self.mp_pose.PoseLandmark[f"{side.upper()}_SHOULDER"].value].x,
-                                          pose_landmarks[self.mp_pose.PoseLandmark[f"{side.upper()}_SHOULDER"].value].y]
-                landmarks['elbow'] = [pose_landmarks[self.mp_pose.PoseLandmark[f"{side.upper()}_ELBOW"].value].x,
-                                       pose_landmarks[self.mp_pose.PoseLandmark[f"{side.upper()}_ELBOW"].value].y]
-                landmarks['wrist'] = [pose_landmarks[self.mp_pose.PoseLandmark[f"{side.upper()}_WRIST"].value].x,
-                                       pose_landmarks[self.mp_pose.PoseLandmark[f"{side.upper()}_WRIST"].value].y]
-            elif exercise == "Back Exercise":
-                landmarks['left_shoulder'] = [pose_landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                                              pose_landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-                landmarks['right_shoulder'] = [pose_landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                                               pose_landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-                landmarks['left_hip'] = [pose_landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                                         pose_landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y]
-                landmarks['right_hip'] = [pose_landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].x,
-                                          pose_landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-            else:
-                # Unsupported exercise
-                return None
-        except IndexError as e:
-            print(f"Landmark index error: {e}")
+        landmark_array = self.get_landmark_array(results, out=self._landmark_buffer)
+        if landmark_array is None:
             return None
 
-        return landmarks
+        keys, indices = table
+        return dict(zip(keys, landmark_array[indices, :2]))
 
-    def toggle_exercise(self):
-        """
-        Start or stop the exercise.
+    def get_landmark_array(self, results, out=None):
         """
-        if self.start_button.text() == "Start Exercise":
-            self.start_button.setText("Stop Exercise")
-            self.start_button.setIcon(QIcon(os.path.join('assets', 'icons', 'stop.png')))
-            self.current_goal = self.goal_spinbox.value()
-            self.reset_metrics()
-            self.progress_bar.setMaximum(self.current_goal)
-            self.progress_bar.setValue(0)
-            self.status_bar.showMessage(f"Exercise '{self.current_exercise}' started. Aim for {self.current_goal} reps.")
-        else:
-            self.start_button.setText("Start Exercise")
-            self.start_button.setIcon(QIcon(os.path.join('assets', 'icons', 'start.png')))
-            self.reset_metrics()
-            self.status_bar.showMessage("Exercise stopped.")
+        Extract the full pose as an array.
 
-    def reset_metrics(self):
-        """
-        Reset the repetitions, points, and feedback.
-        """
-        self.reps = 0
-        self.points = 0
-        self.feedback = "Ready"
-        self.feedback_label.setText(f"Feedback: {self.feedback}")
-        self.reps_label.setText(f"Repetitions: {self.reps}")
-        self.points_label.setText(f"Points: {self.points}")
-        self.achievement_label.setText("Achievements: None")
-        self.knee_angle_label.setText("Knee Angle: --°")
-        self.back_angle_label.setText("Back Angle: --°")
-        self.shoulder_angle_label.setText("Shoulder Angle: --°")
-        self.progress_bar.setValue(0)
-        self.status_bar.showMessage("Metrics reset.")
-
-    def view_tutorial(self):
-        """
-        Display the tutorial GIF for the selected exercise.
-        """
-        tutorial_filename = f"{self.current_exercise.lower().replace(' ', '_')}_exercise.gif"
-        tutorial_path = os.path.join('assets', 'tutorials', tutorial_filename)
-        if not os.path.exists(tutorial_path):
-            QMessageBox.warning(self, "Tutorial Not Found", "Tutorial for this exercise is not available.")
-            return
-
-        # Create a new window to display the tutorial
-        self.tutorial_window = QWidget()
-        self.tutorial_window.setWindowTitle(f"{self.current_exercise} Tutorial")
-        self.tutorial_window.setGeometry(200, 200, 800, 600)
-
-        layout = QVBoxLayout()
-        self.tutorial_label = QLabel()
-        self.tutorial_label.setAlignment(Qt.AlignCenter)
-
-        # Load and set the GIF
-        movie = QMovie(tutorial_path)
-        self.tutorial_label.setMovie(movie)
-        movie.start()
-
-        layout.addWidget(self.tutorial_label)
-        self.tutorial_window.setLayout(layout)
-        self.tutorial_window.show()
+        Parameters:
+        - results: Pose estimation results.
+        - out (numpy.ndarray): Optional (33, 4) float32 array to fill instead of allocating.
 
-    def update_frame(self):
-        """
-        Capture video frame, process it, and update the GUI.
+        Returns:
+        - landmarks (numpy.ndarray): (33, 4) float32 array of x, y, z, visibility, or None.
         """
-        ret, frame = self.cap.read()
-        if not ret:
-            print("Failed to grab frame")
-            return
-
-        frame = cv2.flip(frame, 1)  # Mirror the image
-        frame = cv2.resize(frame, (800, 600))  # Adjusted size to match video_label
-        image, results = self.pose_estimator.process_frame(frame)
-        image = self.pose_estimator.draw_landmarks(image, results, exercise=self.current_exercise, focus_side='right')
-
-        if self.start_button.text() == "Stop Exercise":
-            relevant_landmarks = self.pose_estimator.get_relevant_landmarks(results, exercise=self.current_exercise, focus_side='right')
-            if relevant_landmarks:
-                exercise_module = self.exercises[self.current_exercise]
-                try:
-                    if self.current_exercise == "Squat Exercise":
-                        reps, feedback, points, achievements, knee_angle, back_angle = exercise_module.process(relevant_landmarks)
-                        shoulder_angle = None
-                    elif self.current_exercise == "Back Exercise":
-                        reps, feedback, points, achievements, back_angle = exercise_module.process(relevant_landmarks)
-                        knee_angle = None
-                        shoulder_angle = None
-                    elif self.current_exercise == "Shoulder Exercise":
-                        reps, feedback, points, achievements, shoulder_angle = exercise_module.process(relevant_landmarks)
-                        knee_angle = None
-                        back_angle = None
-                    else:  # Knee Exercise
-                        reps, feedback, points, achievements, knee_angle = exercise_module.process(relevant_landmarks)
-                        back_angle = None
-                        shoulder_angle = None
-                except KeyError as e:
-                    print(f"Error processing exercise: {e}")
-                    reps, feedback, points, achievements = self.reps, "Error", self.points, []
-                    knee_angle, back_angle, shoulder_angle = None, None, None
-
-                # Update metrics
-                self.reps = reps
-                self.feedback = feedback
-                self.reps_label.setText(f"Repetitions: {self.reps}")
-                self.points_label.setText(f"Points: {self.points}")
-                self.feedback_label.setText(f"Feedback: {self.feedback}")
-
-                # Update angles display
-                if knee_angle is not None:
-                    self.knee_angle_label.setText(f"Knee Angle: {int(knee_angle)}°")
-                else:
-                    self.knee_angle_label.setText("Knee Angle: --°")
-
-                if back_angle is not None:
-                    self.back_angle_label.setText(f"Back Angle: {int(back_angle)}°")
-                else:
-                    self.back_angle_label.setText("Back Angle: --°")
-
-                if self.current_exercise == "Shoulder Exercise" and shoulder_angle is not None:
-                    self.shoulder_angle_label.setText(f"Shoulder Angle: {int(shoulder_angle)}°")
-                else:
-                    self.shoulder_angle_label.setText("Shoulder Angle: --°")
-
-                # Update Progress Bar
-                self.progress_bar.setValue(self.reps)
-
-                # Change feedback label color based on feedback
-                if feedback == "Good Rep":
-                    self.feedback_label.setStyleSheet("color: green;")
-                elif feedback == "Keep Your Back Straight":
-                    self.feedback_label.setStyleSheet("color: red;")
-                elif feedback == "Go Up":
-                    self.feedback_label.setStyleSheet("color: orange;")
-                else:
-                    self.feedback_label.setStyleSheet("color: blue;")
-
-                # Handle Achievements (No Pop-ups)
-                if feedback == "Good Rep":
-                    if achievements:
-                        achievement_text = ", ".join(achievements)
-                        self.achievement_label.setText(f"Achievements: {achievement_text}")
-                        self.status_bar.showMessage(f"Achievement Unlocked: {achievements[-1]}")
-
-                # Check if goal is reached
-                if self.reps >= self.current_goal:
-                    QMessageBox.information(self, "Goal Reached", f"Congratulations! You reached your goal of {self.current_goal} reps.")
-                    self.start_button.setText("Start Exercise")
-                    self.start_button.setIcon(QIcon(os.path.join('assets', 'icons', 'start.png')))
-                    self.status_bar.showMessage(f"Goal reached: {self.current_goal} reps.")
-                    # Record progress
-                    self.progress_tracker.record_progress(self.current_exercise, self.reps, self.points)
-                    self.reset_metrics()
-
-        # Convert the image to Qt format
-        try:
-            qt_image = convert_cv_qt(image)
-            self.video_label.setPixmap(qt_image)
-        except Exception as e:
-            print(f"Error converting image: {e}")
+        if not results.pose_landmarks:
+            return None
+        return landmarks_to_array(results.pose_landmarks, out=out)
 
-    def closeEvent(self, event):
+    def close(self):
         """
-        Handle the window close event to release resources.
+        Release the MediaPipe pose graph.
         """
-        self.cap.release()
-        self.pose_estimator.close()
-        self.progress_tracker.close()
-        event.accept()
+        self.pose.close()
@@ -0,0 +1,269 @@
+# modules/station.py
+#
+# Multi-camera station mode: one worker process per camera, each running its
+# own ExercisePipeline, PoseEstimator and exercise state on its own CPU cores.
+# Display frames are handed to the GUI through shared memory; metrics and rep
+# events through a queue.
+
+import logging
+import multiprocessing
+import os
+import queue
+import time
+
+import cv2
+import numpy as np
+
+from modules.camera import CameraSource
+
+logger = logging.getLogger(__name__)
+
+
+def parse_source(text):
+    """
+    Turn a command-line camera source into a device index or a video file path.
+    """
+    return int(text) if text.isdigit() else text
+
+
+class PacedCapture:
+    def __init__(self, path):
+        """
+        Play a video file at its own frame rate, starting over at the end, so a
+        recording behaves like a live camera.
+
+        Parameters:
+        - path (str): Video file path.
+        """
+        self.capture = cv2.VideoCapture(path)
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self.period = 1.0 / fps if fps and fps > 0 else 1.0 / 30.0
+        self._next = None
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        now = time.perf_counter()
+        if self._next is not None and now < self._next:
+            time.sleep(self._next - now)
+        ret, frame = self.capture.read()
+        if not ret:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+        # Fall behind rather than bursting to catch up after a slow frame
+        self._next = max((self._next or now) + self.period, time.perf_counter())
+        return ret, frame
+
+    def release(self):
+        self.capture.release()
+
+
+def open_source(source, frame_size=None):
+    """
+    Open a camera index or video file.
+
+    Parameters:
+    - source (int or str): Camera index or video file.
+    - frame_size (tuple): (width, height) the frames are used at, which lets an
+      MJPEG camera decode at reduced size; None for full size.
+
+    Returns:
+    - A capture with isOpened(), read() and release().
+    """
+    if isinstance(source, int):
+        return CameraSource(source, decode_size=frame_size)
+    return PacedCapture(source)
+
+
+def split_cores(workers, cores=None):
+    """
+    Divide CPU cores between camera workers.
+
+    One core is left to the GUI process when there are more cores than workers;
+    the rest are split into contiguous, equal-as-possible groups. With fewer
+    cores than workers, workers share cores round-robin.
+
+    Parameters:
+    - workers (int): Number of camera workers.
+    - cores (list of int): Cores to divide, or None for every core this process may use.
+
+    Returns:
+    - list of lists of int: Cores of each worker.
+    """
+    if cores is None:
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else \
+            list(range(os.cpu_count() or 1))
+    if len(cores) > workers:
+        cores = cores[1:]
+    if len(cores) < workers:
+        return [[cores[i % len(cores)]] for i in range(workers)]
+    return [[int(core) for core in group] for group in np.array_split(cores, workers)]
+
+
+def camera_worker(source, exercise_name, frame_size, focus_side, cores, frame_buffer, frame_lock,
+                  frame_seq, results, commands, stop_event):
+    """
+    Body of a camera worker process. Runs an ExercisePipeline on the source and
+    publishes its output until stop_event is set.
+
+    Parameters:
+    - source (int or str): Camera index or video file.
+    - exercise_name (str): Initially selected exercise.
+    - frame_size (tuple): (width, height) of the display frames.
+    - focus_side (str): 'left' or 'right'.
+    - cores (list of int): CPU cores to run on, or None for no restriction.
+    - frame_buffer (multiprocessing.RawArray): Shared RGB display frame.
+    - frame_lock (multiprocessing.Lock): Guards frame_buffer.
+    - frame_seq (multiprocessing.RawValue): Incremented for every new frame.
+    - results (multiprocessing.Queue): Receives ('metrics', exercise, metrics),
+      ('reps', exercise, events) and ('error', None, message) messages.
+    - commands (multiprocessing.Queue): ('exercise', name) and ('running', bool) commands.
+    - stop_event (multiprocessing.Event): Set to stop the worker.
+    """
+    if cores:
+        if hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, cores)
+        cv2.setNumThreads(len(cores))
+
+    # Imported here so only the workers load MediaPipe
+    from modules.exercises import EXERCISE_CLASSES, create_exercises
+    from modules.pipeline import ExercisePipeline
+    from modules.pose_estimation import PoseEstimator
+
+    width, height = frame_size
+    frame = np.frombuffer(frame_buffer, dtype=np.uint8).reshape(height, width, 3)
+
+    capture = open_source(source, frame_size)
+    if not capture.isOpened():
+        results.put(('error', None, f"Cannot open camera source {source!r}"))
+        return
+
+    pose_estimator = PoseEstimator()
+    exercises = create_exercises()
+    pipeline = ExercisePipeline(capture, pose_estimator, exercises, exercise_name,
+                                frame_size=frame_size, focus_side=focus_side)
+    rep_events = queue.Queue()
+    pipeline.set_rep_sink(lambda name, events: rep_events.put((name, events)))
+    pipeline.start()
+    try:
+        while not stop_event.is_set():
+            while True:
+                try:
+                    command, value = commands.get_nowait()
+                except queue.Empty:
+                    break
+                if command == 'exercise':
+                    exercise_name = value
+                    pipeline.set_exercise(value)
+                elif command == 'running':
+                    if value:
+                        # Start every session from a fresh counter
+                        exercises[exercise_name] = EXERCISE_CLASSES[exercise_name]()
+                    pipeline.set_running(value)
+
+            while True:
+                try:
+                    name, events = rep_events.get_nowait()
+                except queue.Empty:
+                    break
+                results.put(('reps', name, events))
+
+            packet = pipeline.latest()
+            if packet is None:
+                time.sleep(0.005)
+                continue
+            try:
+                with frame_lock:
+                    frame[:] = packet.image
+                    frame_seq.value += 1
+                if packet.metrics is not None:
+                    results.put(('metrics', packet.exercise, packet.metrics))
+            finally:
+                packet.release()
+    finally:
+        pipeline.stop()
+        capture.release()
+        pose_estimator.close()
+
+
+class CameraWorker:
+    def __init__(self, source, exercise_name="Knee Exercise", frame_size=(640, 480), focus_side='right',
+                 cores=None):
+        """
+        Handle of a camera worker process, used from the GUI process.
+
+        Parameters:
+        - source (int or str): Camera index or video file.
+        - exercise_name (str): Initially selected exercise.
+        - frame_size (tuple): (width, height) of the display frames.
+        - focus_side (str): 'left' or 'right'.
+        - cores (list of int): CPU cores for the worker, or None for no restriction.
+        """
+        # Spawned rather than forked: the GUI process has Qt and threads running
+        context = multiprocessing.get_context('spawn')
+        width, height = frame_size
+        self.source = source
+        self.frame_size = frame_size
+        self._frame_buffer = context.RawArray('B', width * height * 3)
+        self.frame = np.frombuffer(self._frame_buffer, dtype=np.uint8).reshape(height, width, 3)
+        self._frame_lock = context.Lock()
+        self._frame_seq = context.RawValue('Q', 0)
+        self._shown_seq = 0
+        self.results = context.Queue()
+        self.commands = context.Queue()
+        self._stop_event = context.Event()
+        self.process = context.Process(
+            target=camera_worker, name=f"camera-{source}", daemon=True,
+            args=(source, exercise_name, frame_size, focus_side, cores, self._frame_buffer,
+                  self._frame_lock, self._frame_seq, self.results, self.commands, self._stop_event))
+
+    def start(self):
+        self.process.start()
+
+    def set_exercise(self, exercise_name):
+        self.commands.put(('exercise', exercise_name))
+
+    def set_running(self, running):
+        self.commands.put(('running', running))
+
+    def poll(self):
+        """
+        Return every message the worker sent since the last call.
+        """
+        messages = []
+        while True:
+            try:
+                messages.append(self.results.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def show_frame(self, show):
+        """
+        Call show(frame) with the newest display frame if it changed since the
+        last call. The frame is only valid during the call.
+
+        Returns:
+        - bool: True if a new frame was shown.
+        """
+        if self._frame_seq.value == self._shown_seq:
+            return False
+        with self._frame_lock:
+            self._shown_seq = self._frame_seq.value
+            show(self.frame)
+        return True
+
+    def stop(self, timeout=3.0):
+        """
+        Stop the worker, terminating it if it does not exit within timeout seconds.
+        """
+        self._stop_event.set()
+        # Keep draining: a process does not exit while its queue data is unsent
+        deadline = time.monotonic() + timeout
+        while self.process.is_alive() and time.monotonic() < deadline:
+            self.poll()
+            self.process.join(0.05)
+        if self.process.is_alive():
+            logger.warning("Camera worker %s did not stop; terminating it", self.source)
+            self.process.terminate()
+            self.process.join()
@@ -0,0 +1,380 @@
+# modules/synthetic_motion.py
+#
+# Parametric landmark streams for load-testing the exercise modules headlessly.
+#
+# Usage:
+#     python -m modules.synthetic_motion --exercise "Squat Exercise" --frames 1000000 --noise 0.003
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from modules.exercises import EXERCISE_CLASSES
+from modules.landmarks import LANDMARK_INDEX, NUM_LANDMARKS, relevant_landmarks_from_array
+
+# Normalized [x, y] of a person standing facing the camera
+STANDING_POSE = {
+    'NOSE': (0.50, 0.18), 'LEFT_EYE_INNER': (0.51, 0.17), 'LEFT_EYE': (0.52, 0.17),
+    'LEFT_EYE_OUTER': (0.53, 0.17), 'RIGHT_EYE_INNER': (0.49, 0.17), 'RIGHT_EYE': (0.48, 0.17),
+    'RIGHT_EYE_OUTER': (0.47, 0.17), 'LEFT_EAR': (0.54, 0.18), 'RIGHT_EAR': (0.46, 0.18),
+    'MOUTH_LEFT': (0.51, 0.20), 'MOUTH_RIGHT': (0.49, 0.20),
+    'LEFT_SHOULDER': (0.58, 0.28), 'RIGHT_SHOULDER': (0.42, 0.28),
+    'LEFT_ELBOW': (0.60, 0.38), 'RIGHT_ELBOW': (0.40, 0.38),
+    'LEFT_WRIST': (0.61, 0.47), 'RIGHT_WRIST': (0.39, 0.47),
+    'LEFT_PINKY': (0.61, 0.49), 'RIGHT_PINKY': (0.39, 0.49),
+    'LEFT_INDEX': (0.62, 0.49), 'RIGHT_INDEX': (0.38, 0.49),
+    'LEFT_THUMB': (0.61, 0.48), 'RIGHT_THUMB': (0.39, 0.48),
+    'LEFT_HIP': (0.55, 0.52), 'RIGHT_HIP': (0.45, 0.52),
+    'LEFT_KNEE': (0.55, 0.68), 'RIGHT_KNEE': (0.45, 0.68),
+    'LEFT_ANKLE': (0.55, 0.84), 'RIGHT_ANKLE': (0.45, 0.84),
+    'LEFT_HEEL': (0.55, 0.86), 'RIGHT_HEEL': (0.45, 0.86),
+    'LEFT_FOOT_INDEX': (0.57, 0.87), 'RIGHT_FOOT_INDEX': (0.43, 0.87),
+}
+STANDING_ARRAY = np.array([STANDING_POSE[name] for name in sorted(LANDMARK_INDEX, key=LANDMARK_INDEX.get)])
+
+# Exercise -> (motion, range of motion in degrees at depth 1.0)
+EXERCISE_MOTIONS = {
+    "Knee Exercise": ('knee_bend', 100.0),
+    "Squat Exercise": ('squat', 100.0),
+    "Shoulder Exercise": ('shoulder_raise', 150.0),
+    "Back Exercise": ('back_bend', 70.0),
+}
+
+_LOWER_LEG = ('ANKLE', 'HEEL', 'FOOT_INDEX')
+_FOREARM = ('WRIST', 'PINKY', 'INDEX', 'THUMB')
+_UPPER_BODY = [i for name, i in LANDMARK_INDEX.items()
+               if not name.endswith(('HIP', 'KNEE', 'ANKLE', 'HEEL', 'FOOT_INDEX'))]
+
+
+def _indices(names):
+    return [LANDMARK_INDEX[name] for name in names]
+
+
+def rotate_points(points, pivot, radians):
+    """
+    Rotate (N, K, 2) or (N, 2) points around (N, 2) pivots by (N,) angles.
+    """
+    if points.ndim == 3:
+        pivot = pivot[:, None]
+        radians = radians[:, None]
+    cos, sin = np.cos(radians), np.sin(radians)
+    offset = points - pivot
+    return pivot + np.stack([offset[..., 0] * cos - offset[..., 1] * sin,
+                             offset[..., 0] * sin + offset[..., 1] * cos], axis=-1)
+
+
+def _rotate_about(xy, pivot_name, names, radians):
+    pivot = xy[:, LANDMARK_INDEX[pivot_name]].copy()
+    idx = _indices(names)
+    xy[:, idx] = rotate_points(xy[:, idx], pivot, radians)
+
+
+def _knee_bend(xy, flex, focus_side):
+    # Shin swings back around the knee of the focus leg
+    side = focus_side.upper()
+    sign = 1.0 if side == 'LEFT' else -1.0
+    _rotate_about(xy, f'{side}_KNEE', [f'{side}_{name}' for name in _LOWER_LEG], sign * flex)
+
+
+def _squat(xy, flex, focus_side):
+    # Feet stay planted: the shins tilt forward around the ankles, the thighs
+    # fold back around the knees and the upper body follows the hips with a
+    # slight forward lean
+    hips_before = xy[:, _indices(['LEFT_HIP', 'RIGHT_HIP'])].mean(axis=1)
+    for side in ('LEFT', 'RIGHT'):
+        _rotate_about(xy, f'{side}_ANKLE', [f'{side}_KNEE', f'{side}_HIP'], 0.5 * flex)
+        _rotate_about(xy, f'{side}_KNEE', [f'{side}_HIP'], -flex)
+    hips_after = xy[:, _indices(['LEFT_HIP', 'RIGHT_HIP'])].mean(axis=1)
+    xy[:, _UPPER_BODY] += (hips_after - hips_before)[:, None]
+    xy[:, _UPPER_BODY] = rotate_points(xy[:, _UPPER_BODY], hips_after, 0.3 * flex)
+
+
+def _shoulder_raise(xy, raise_angle, focus_side):
+    # The arm of the focus side swings out around the shoulder while the elbow
+    # bends, which is the angle ShoulderExercise counts on
+    side = focus_side.upper()
+    sign = -1.0 if side == 'LEFT' else 1.0
+    arm = [f'{side}_ELBOW'] + [f'{side}_{name}' for name in _FOREARM]
+    _rotate_about(xy, f'{side}_SHOULDER', arm, sign * raise_angle)
+    _rotate_about(xy, f'{side}_ELBOW', [f'{side}_{name}' for name in _FOREARM], sign * raise_angle * 0.6)
+
+
+def _back_bend(xy, flex, focus_side):
+    # Forward bend seen from the front: the upper body foreshortens towards the hips
+    hip_y = xy[:, _indices(['LEFT_HIP', 'RIGHT_HIP']), 1].mean(axis=1)[:, None]
+    upper = xy[:, _UPPER_BODY, 1]
+    xy[:, _UPPER_BODY, 1] = hip_y + (upper - hip_y) * np.cos(flex)[:, None]
+
+
+_MOTIONS = {
+    'knee_bend': _knee_bend,
+    'squat': _squat,
+    'shoulder_raise': _shoulder_raise,
+    'back_bend': _back_bend,
+}
+
+
+class SyntheticMotion:
+    def __init__(self, timestamps, landmarks, phase, reps):
+        """
+        A generated landmark stream.
+
+        Parameters:
+        - timestamps (numpy.ndarray): (N,) frame times in seconds.
+        - landmarks (numpy.ndarray): (N, 33, 4) float32 x, y, z, visibility; NaN
+          for dropped frames, as recordings store frames without a pose.
+        - phase (numpy.ndarray): (N,) fraction of the range of motion, 0 to 1.
+        - reps (int): Repetitions completed by the end of the stream.
+        """
+        self.timestamps = timestamps
+        self.landmarks = landmarks
+        self.phase = phase
+        self.reps = reps
+
+    def __len__(self):
+        return len(self.timestamps)
+
+
+class MotionGenerator:
+    def __init__(self, exercise, fps=30.0, tempo=3.0, hold=0.8, rest=0.8, depth=1.0,
+                 tempo_jitter=0.0, depth_jitter=0.0, noise=0.0, dropout=0.0, dropout_length=1,
+                 visibility=0.99, occlusion=0.0, focus_side='right', start_time=0.0, seed=None):
+        """
+        Generate parametric exercise trajectories as landmark arrays.
+
+        Every repetition starts at rest, moves to the bottom of the range,
+        holds and comes back with smooth (cosine) easing.
+
+        Parameters:
+        - exercise (str): Exercise name (see EXERCISE_MOTIONS).
+        - fps (float): Frame rate.
+        - tempo (float): Seconds per repetition, including rest and hold.
+        - hold (float): Seconds held at the bottom of each repetition.
+        - rest (float): Seconds at rest at the start of each repetition.
+        - depth (float): Fraction of the exercise's full range of motion.
+        - tempo_jitter (float): Random +- fraction applied to each repetition's tempo.
+        - depth_jitter (float): Random +- fraction applied to each repetition's depth.
+        - noise (float): Standard deviation of the landmark jitter, in normalized units.
+        - dropout (float): Fraction of frames without a detected pose.
+        - dropout_length (int): Average number of consecutive frames per dropout.
+        - visibility (float): Visibility of unoccluded landmarks.
+        - occlusion (float): Probability that a landmark has low visibility in a frame.
+        - focus_side (str): 'left' or 'right'.
+        - start_time (float): Timestamp of the first frame.
+        - seed (int): Random seed, or None.
+        """
+        if exercise not in EXERCISE_MOTIONS:
+            raise ValueError(f"Unsupported exercise: {exercise}")
+        if hold + rest >= tempo:
+            raise ValueError("tempo must be longer than hold + rest")
+        self.exercise = exercise
+        self.motion, self.range_of_motion = EXERCISE_MOTIONS[exercise]
+        self.fps = fps
+        self.tempo = tempo
+        self.hold = hold
+        self.rest = rest
+        self.depth = depth
+        self.tempo_jitter = tempo_jitter
+        self.depth_jitter = depth_jitter
+        self.noise = noise
+        self.dropout = dropout
+        self.dropout_length = max(1, int(dropout_length))
+        self.visibility = visibility
+        self.occlusion = occlusion
+        self.focus_side = focus_side
+        self.start_time = start_time
+        self.rng = np.random.default_rng(seed)
+
+        # Repetition schedule, extended as needed: start times and depths
+        self._rep_starts = np.zeros(1)
+        self._rep_depths = np.empty(0)
+        self._frame = 0
+        self._dropout_left = 0
+
+    def _extend_schedule(self, until):
+        while self._rep_starts[-1] <= until:
+            count = max(16, int((until - self._rep_starts[-1]) / self.tempo) + 2)
+            durations = self.tempo * (1 + self.tempo_jitter * self.rng.uniform(-1, 1, count))
+            depths = self.depth * (1 + self.depth_jitter * self.rng.uniform(-1, 1, count))
+            self._rep_starts = np.concatenate([self._rep_starts,
+                                               self._rep_starts[-1] + np.cumsum(durations)])
+            self._rep_depths = np.concatenate([self._rep_depths, depths])
+
+    def _phase(self, t):
+        """
+        Return the phase (0 at rest, 1 at the bottom) and repetition index of times t.
+        """
+        self._extend_schedule(t[-1])
+        rep = np.searchsorted(self._rep_starts, t, side='right') - 1
+        start = self._rep_starts[rep]
+        duration = self._rep_starts[rep + 1] - start
+        scale = duration / self.tempo
+        local = (t - start) / scale  # Time within a nominal-tempo repetition
+
+        move = (self.tempo - self.hold - self.rest) / 2
+        down_end = self.rest + move
+        hold_end = down_end + self.hold
+        phase = np.zeros_like(local)
+        descending = (local >= self.rest) & (local < down_end)
+        phase[descending] = 0.5 - 0.5 * np.cos(np.pi * (local[descending] - self.rest) / move)
+        phase[(local >= down_end) & (local < hold_end)] = 1.0
+        ascending = local >= hold_end
+        phase[ascending] = 0.5 + 0.5 * np.cos(np.pi * (local[ascending] - hold_end) / move)
+        return phase, rep
+
+    def generate(self, frames):
+        """
+        Generate the next frames of the stream. Successive calls continue the
+        same motion, so arbitrarily long streams can be produced in chunks.
+
+        Parameters:
+        - frames (int): Number of frames.
+
+        Returns:
+        - SyntheticMotion: The frames.
+        """
+        index = np.arange(self._frame, self._frame + frames)
+        self._frame += frames
+        t = index / self.fps
+        phase, rep = self._phase(t)
+        angle = np.radians(self.range_of_motion) * phase * self._rep_depths[rep]
+
+        xy = np.repeat(STANDING_ARRAY[None], frames, axis=0)
+        _MOTIONS[self.motion](xy, angle, self.focus_side)
+
+        landmarks = np.empty((frames, NUM_LANDMARKS, 4), dtype=np.float32)
+        landmarks[..., :2] = xy
+        landmarks[..., 2] = 0.0
+        if self.noise:
+            landmarks[..., :3] += self.rng.normal(0.0, self.noise, (frames, NUM_LANDMARKS, 3))
+        landmarks[..., 3] = self.visibility
+        if self.occlusion:
+            occluded = self.rng.random((frames, NUM_LANDMARKS)) < self.occlusion
+            landmarks[..., 3][occluded] = self.rng.uniform(0.0, 0.3, occluded.sum())
+        if self.dropout:
+            landmarks[self._dropout_mask(frames)] = np.nan
+
+        # A repetition is complete once the next one has started
+        completed = int(np.searchsorted(self._rep_starts, t[-1], side='right') - 1)
+        return SyntheticMotion(self.start_time + t, landmarks, phase, completed)
+
+    def _dropout_mask(self, frames):
+        # Dropout bursts start at random and last dropout_length frames on
+        # average; a burst running past the end of a chunk continues in the next
+        covered = np.zeros(frames, dtype=bool)
+        covered[:self._dropout_left] = True
+        starts = np.flatnonzero(self.rng.random(frames) < self.dropout / self.dropout_length)
+        ends = starts + self.rng.geometric(1.0 / self.dropout_length, len(starts))
+        edges = np.zeros(frames + 1, dtype=np.int32)
+        np.add.at(edges, starts, 1)
+        np.add.at(edges, np.minimum(ends, frames), -1)
+        covered |= np.cumsum(edges[:frames]) > 0
+        overflow = int(ends.max()) - frames if len(ends) else 0
+        self._dropout_left = max(self._dropout_left - frames, overflow, 0)
+        return covered
+
+    def chunks(self, frames, chunk_frames=65536):
+        """
+        Yield the stream in chunks.
+
+        Parameters:
+        - frames (int): Total number of frames.
+        - chunk_frames (int): Frames per chunk.
+
+        Yields:
+        - SyntheticMotion: Consecutive chunks.
+        """
+        remaining = frames
+        while remaining > 0:
+            count = min(chunk_frames, remaining)
+            remaining -= count
+            yield self.generate(count)
+
+
+def generate_motion(exercise, frames, **kwargs):
+    """
+    Generate a landmark stream in one call.
+
+    Parameters:
+    - exercise (str): Exercise name.
+    - frames (int): Number of frames.
+    - **kwargs: MotionGenerator parameters.
+
+    Returns:
+    - SyntheticMotion: The frames.
+    """
+    return MotionGenerator(exercise, **kwargs).generate(frames)
+
+
+def run_load_test(exercise_name, frames, focus_side='right', chunk_frames=65536, **kwargs):
+    """
+    Feed a synthetic stream through an exercise module's process() method.
+
+    Frames without a pose are skipped, as in the live app.
+
+    Parameters:
+    - exercise_name (str): Exercise name.
+    - frames (int): Total number of frames.
+    - focus_side (str): 'left' or 'right'.
+    - chunk_frames (int): Frames generated at a time.
+    - **kwargs: MotionGenerator parameters.
+
+    Returns:
+    - dict: frames, evaluated frames, counted reps, performed reps, seconds
+      spent in process() and frames per second.
+    """
+    generator = MotionGenerator(exercise_name, focus_side=focus_side, **kwargs)
+    exercise = EXERCISE_CLASSES[exercise_name]()
+    evaluated, reps, performed, elapsed = 0, 0, 0, 0.0
+    for chunk in generator.chunks(frames, chunk_frames):
+        valid = ~np.isnan(chunk.landmarks[:, :, 0]).any(axis=1)
+        inputs = [(relevant_landmarks_from_array(landmarks, exercise_name, focus_side), t)
+                  for landmarks, t in zip(chunk.landmarks[valid], chunk.timestamps[valid].tolist())]
+        start = time.perf_counter()
+        for points, timestamp in inputs:
+            reps = exercise.process(points, timestamp)[0]
+        elapsed += time.perf_counter() - start
+        evaluated += len(inputs)
+        performed = chunk.reps
+    return {
+        'frames': frames,
+        'evaluated': evaluated,
+        'reps': reps,
+        'performed': performed,
+        'seconds': elapsed,
+        'fps': evaluated / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test an exercise module with synthetic motion.")
+    parser.add_argument('--exercise', default="Knee Exercise", choices=list(EXERCISE_MOTIONS))
+    parser.add_argument('--frames', type=int, default=100000)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--tempo', type=float, default=3.0, help="Seconds per repetition.")
+    parser.add_argument('--hold', type=float, default=0.8, help="Seconds held at the bottom.")
+    parser.add_argument('--depth', type=float, default=1.0, help="Fraction of the full range of motion.")
+    parser.add_argument('--noise', type=float, default=0.0, help="Landmark jitter (normalized units).")
+    parser.add_argument('--dropout', type=float, default=0.0, help="Fraction of frames without a pose.")
+    parser.add_argument('--occlusion', type=float, default=0.0, help="Chance of a low-visibility landmark.")
+    parser.add_argument('--focus-side', default='right', choices=['left', 'right'])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    result = run_load_test(args.exercise, args.frames, focus_side=args.focus_side, fps=args.fps,
+                           tempo=args.tempo, hold=args.hold, depth=args.depth, noise=args.noise,
+                           dropout=args.dropout, occlusion=args.occlusion, seed=args.seed)
+    print(f"{args.exercise}: counted {result['reps']} of {result['performed']} reps over "
+          f"{result['evaluated']} frames, {result['fps']:.0f} frames/s in process()")
+
+    # A clean full-depth stream must be counted exactly; noisy ones are only reported
+    clean = args.depth >= 1.0 and not (args.noise or args.dropout or args.occlusion)
+    if clean and result['reps'] != result['performed']:
+        print(f"MISCOUNT: {args.exercise} counted {result['reps'] - result['performed']:+d} reps on a clean stream")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# modules/uploader.py
+#
+# Push this station's finished sessions to a clinic ingest server
+# (modules/ingest_server.py), many sessions per request.
+#
+# Usage:
+#     python -m modules.uploader --server clinic-pc:8765
+#     python -m modules.uploader --server clinic-pc:8765 --query default
+
+import argparse
+import json
+import logging
+import socket
+import sqlite3
+import threading
+
+from modules.database import connect_readonly
+from modules.ingest_server import DEFAULT_PORT, REP_FIELDS, SESSION_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+def parse_address(text):
+    """
+    Parse "host" or "host:port" into a (host, port) tuple.
+    """
+    host, _, port = text.rpartition(':') if ':' in text else (text, '', '')
+    return host, int(port) if port else DEFAULT_PORT
+
+
+class SessionUploader:
+    def __init__(self, db_path='progress.db', server=('127.0.0.1', DEFAULT_PORT), station=None,
+                 batch_size=200, timeout=30.0):
+        """
+        Upload finished sessions and their reps from a local progress database.
+
+        Every uploaded session is recorded in the local database, so each one is
+        sent once even across restarts, in whatever order sessions finish.
+
+        Parameters:
+        - db_path (str): Path to the local SQLite database.
+        - server (tuple): (host, port) of the ingest server.
+        - station (str): Name of this station, or None for the host name.
+        - batch_size (int): Sessions sent per request.
+        - timeout (float): Socket timeout in seconds.
+        """
+        self.db_path = db_path
+        self.server = server
+        self.station = station or socket.gethostname()
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.create_table()
+
+    def create_table(self):
+        """
+        Create the uploaded_sessions table, which records the sessions sent to
+        each server, if it doesn't exist.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            with conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS uploaded_sessions (
+                        server TEXT NOT NULL,
+                        session_id INTEGER NOT NULL,
+                        PRIMARY KEY (server, session_id)
+                    ) WITHOUT ROWID
+                ''')
+                # The old table only kept the highest uploaded id, which skipped
+                # sessions that finished after a later one; they are sent again
+                # once, and the server replaces what it already has
+                conn.execute('DROP TABLE IF EXISTS uploads')
+        finally:
+            conn.close()
+
+    @property
+    def _server_key(self):
+        return f"{self.server[0]}:{self.server[1]}"
+
+    def _pending_sessions(self, conn):
+        """
+        Read the next batch of finished sessions not uploaded to the server yet, with their reps.
+        """
+        rows = conn.execute('''
+            SELECT s.id, s.patient, s.exercise, s.goal, s.started_at, s.ended_at, m.repetitions,
+                   m.points, m.duration_ms, m.reps_recorded, m.mean_rep_ms, m.mean_hold_ms,
+                   m.min_angle, m.max_angle
+            FROM sessions s JOIN session_summaries m ON m.session_id = s.id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM uploaded_sessions u WHERE u.server = ? AND u.session_id = s.id
+            )
+            ORDER BY s.id
+            LIMIT ?
+        ''', (self._server_key, self.batch_size)).fetchall()
+        sessions = [dict(zip(SESSION_FIELDS, row), reps=[]) for row in rows]
+        if not sessions:
+            return sessions
+
+        by_id = {session['id']: session for session in sessions}
+        for row in conn.execute(f'''
+            SELECT session_id, {', '.join(REP_FIELDS)}
+            FROM rep_events
+            WHERE session_id IN ({', '.join('?' * len(by_id))})
+            ORDER BY session_id, rep
+        ''', list(by_id)):
+            by_id[row[0]]['reps'].append(row[1:])
+        return sessions
+
+    def _request(self, sock_file, request):
+        sock_file.write(json.dumps(request).encode('utf-8') + b'\n')
+        sock_file.flush()
+        line = sock_file.readline()
+        if not line:
+            raise ConnectionError("Ingest server closed the connection")
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise RuntimeError(f"Ingest server error: {response.get('error')}")
+        return response
+
+    def upload_pending(self):
+        """
+        Upload every finished session not uploaded yet, over one connection.
+
+        Returns:
+        - int: Number of sessions uploaded.
+        """
+        reader = connect_readonly(self.db_path)
+        writer = sqlite3.connect(self.db_path, timeout=30.0)
+        uploaded = 0
+        try:
+            sessions = self._pending_sessions(reader)
+            if not sessions:
+                return 0
+            with socket.create_connection(self.server, timeout=self.timeout) as sock, \
+                    sock.makefile('rwb') as sock_file:
+                while sessions:
+                    self._request(sock_file, {'type': 'upload', 'station': self.station,
+                                              'sessions': sessions})
+                    with writer:
+                        writer.executemany(
+                            'INSERT OR IGNORE INTO uploaded_sessions (server, session_id) VALUES (?, ?)',
+                            [(self._server_key, session['id']) for session in sessions])
+                    uploaded += len(sessions)
+                    sessions = self._pending_sessions(reader)
+        finally:
+            reader.close()
+            writer.close()
+        return uploaded
+
+    def query(self, patient, exercise=None, since=None, until=None):
+        """
+        Ask the server for a patient's totals per exercise.
+
+        Parameters:
+        - patient (str): Patient.
+        - exercise (str): Only this exercise, or None for all.
+        - since (int): Only sessions started at or after this epoch millisecond.
+        - until (int): Only sessions started before this epoch millisecond.
+
+        Returns:
+        - list of dict: See CentralStore.patient_summary().
+        """
+        with socket.create_connection(self.server, timeout=self.timeout) as sock, \
+                sock.makefile('rwb') as sock_file:
+            response = self._request(sock_file, {'type': 'query', 'patient': patient, 'exercise': exercise,
+                                                 'since': since, 'until': until})
+        return response['exercises']
+
+    def start(self, interval=300.0):
+        """
+        Upload in the background every `interval` seconds and whenever notify() is called.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="session-uploader",
+                                        daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """
+        Upload soon, e.g. after a session ended.
+        """
+        self._wake.set()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            try:
+                uploaded = self.upload_pending()
+                if uploaded:
+                    logger.info("Uploaded %d session(s) to %s", uploaded, self._server_key)
+            except (OSError, ValueError, RuntimeError, sqlite3.Error) as e:
+                # The server may be down; the next attempt resumes where this one stopped
+                logger.warning("Session upload to %s failed: %s", self._server_key, e)
+            self._wake.wait(interval)
+            self._wake.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload finished sessions to a clinic ingest server.")
+    parser.add_argument('--server', type=parse_address, default=('127.0.0.1', DEFAULT_PORT),
+                        help="host[:port] of the ingest server.")
+    parser.add_argument('--db', default='progress.db', help="Local SQLite database.")
+    parser.add_argument('--station', default=None, help="Station name (default: host name).")
+    parser.add_argument('--query', metavar='PATIENT', help="Print the patient's totals instead of uploading.")
+    args = parser.parse_args()
+
+    uploader = SessionUploader(args.db, args.server, args.station)
+    if args.query:
+        for row in uploader.query(args.query):
+            print(row)
+    else:
+        print(f"Uploaded {uploader.upload_pending()} session(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# test_exercise_counter.py
+
+from modules.exercise_counter import ExerciseCounter
+
+
+def feed(counter, samples):
+    """
+    Update the counter with (timestamp, angle) samples and return the final rep count.
+    """
+    reps = 0
+    for timestamp, angle in samples:
+        reps, _ = counter.update(angle, timestamp)
+    return reps
+
+
+def test_starting_short_of_the_threshold_is_not_a_rep():
+    # Back Exercise at rest: the back angle stays far below its threshold
+    counter = ExerciseCounter(160, min_hold_time=0.5)
+    assert feed(counter, [(t / 10, 18.0) for t in range(30)]) == 0
+
+
+def test_starting_flexed_with_wall_clock_times_is_not_a_rep():
+    # Live frames carry epoch timestamps, which used to pass any hold measured from 0
+    counter = ExerciseCounter(100, min_hold_time=0.5)
+    assert feed(counter, [(1_700_000_000.0, 90.0), (1_700_000_000.1, 85.0)]) == 0
+
+
+def test_rep_after_the_first_hold():
+    counter = ExerciseCounter(160, min_hold_time=0.5)
+    samples = [(0.0, 18.0), (1.0, 170.0), (1.6, 170.0), (2.0, 18.0)]
+    assert feed(counter, samples) == 1
+    assert counter.pop_events()[0]['min_angle'] == 18.0
+
+
+def test_starting_position_must_be_held_before_leaving_it_counts():
+    counter = ExerciseCounter(100, min_hold_time=0.5)
+    assert feed(counter, [(1000.0, 170.0), (1000.2, 90.0)]) == 0
+    counter = ExerciseCounter(100, min_hold_time=0.5)
+    assert feed(counter, [(1000.0, 170.0), (1000.6, 90.0)]) == 1
+
+
+def test_reverse_counter_starting_upright():
+    # Squat: counted on the way up, after holding below the threshold
+    counter = ExerciseCounter(100, min_hold_time=0.5, reverse=True)
+    samples = [(0.0, 175.0), (0.5, 175.0), (1.0, 90.0), (1.6, 90.0), (2.0, 175.0)]
+    assert feed(counter, samples) == 1
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"{name}: ok")
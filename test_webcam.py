@@ -1,12 +1,15 @@
 import cv2
 
+from modules.camera import CameraSource
+
 def test_webcam():
-    cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
+    cap = CameraSource(0)
     if not cap.isOpened():
         print("Cannot open webcam")
         return
 
-    print("Webcam is accessible. Press 'q' to quit.")
+    width, height = cap.resolution
+    print(f"Webcam is accessible ({cap.fourcc} {width}x{height} at {cap.fps:.0f} fps). Press 'q' to quit.")
     while True:
         ret, frame = cap.read()
         if not ret:
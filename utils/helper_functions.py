@@ -1,20 +1,33 @@
 # utils/helper_functions.py
 
-import cv2
 from PyQt5.QtGui import QImage, QPixmap
 
-def convert_cv_qt(cv_img):
+# Qt 5.14+ can display BGR data as-is; older versions need a conversion
+_FORMAT_BGR888 = getattr(QImage, 'Format_BGR888', None)
+
+
+def convert_cv_qt(cv_img, is_rgb=False):
     """
     Convert from an OpenCV image to QPixmap.
 
+    The QImage wraps the array's memory directly; QPixmap.fromImage makes the
+    only copy, so the array can be reused as soon as this returns.
+
     Parameters:
-    - cv_img (numpy.ndarray): The OpenCV image.
+    - cv_img (numpy.ndarray): The OpenCV image (BGR unless is_rgb is set).
+    - is_rgb (bool): True if the image is already RGB.
 
     Returns:
     - QPixmap: The converted QPixmap.
     """
-    rgb_image = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-    h, w, ch = rgb_image.shape
-    bytes_per_line = ch * w
-    qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
+    if is_rgb:
+        image_format = QImage.Format_RGB888
+    elif _FORMAT_BGR888 is not None:
+        image_format = _FORMAT_BGR888
+    else:
+        import cv2  # Only needed on old Qt; kept out of the window's startup imports
+        cv_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
+        image_format = QImage.Format_RGB888
+    h, w, ch = cv_img.shape
+    qt_image = QImage(cv_img.data, w, h, cv_img.strides[0], image_format)
     return QPixmap.fromImage(qt_image)
@@ -1,69 +1,176 @@
 # view_progress.py
+#
+# Plot an exercise's progress from progress.db.
+#
+# Usage:
+#     python view_progress.py --exercise "Squat Exercise" --since 2026-01-01 --period week
 
+import argparse
 import sqlite3
-import matplotlib.pyplot as plt
 from datetime import datetime
 
+import matplotlib.pyplot as plt
+import numpy as np
+
+from modules.database import ROLLUP_TABLES, connect_readonly
+
+PROGRESS_DTYPE = np.dtype([('time', np.int64), ('repetitions', np.int64), ('points', np.int64)])
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-def fetch_progress(db_name='progress.db', exercise='Knee Exercise'):
+
+def fetch_progress(db_name='progress.db', exercise='Knee Exercise', since=None, until=None, period='session'):
     """
-    Fetch all progress records for a specific exercise from the database.
+    Fetch the progress of an exercise as NumPy arrays.
+
+    SQLite converts the dates to epoch seconds, and the rows are read straight
+    into a structured array without building Python objects per row.
 
     Parameters:
     - db_name (str): Name of the SQLite database file.
     - exercise (str): Name of the exercise to filter by.
+    - since (datetime): Only progress at or after this time, or None.
+    - until (datetime): Only progress before this time, or None.
+    - period (str): 'session' for every recorded session, or 'day' / 'week' for
+      the pre-aggregated totals per period.
 
     Returns:
-    - list of tuples: Each tuple contains (date, exercise, repetitions, points).
+    - numpy.ndarray: Structured array with time (epoch seconds), repetitions and
+      points, oldest first. Empty if there is no data.
     """
-    conn = sqlite3.connect(db_name)
-    c = conn.cursor()
-    c.execute("SELECT * FROM progress WHERE exercise = ?", (exercise,))
-    data = c.fetchall()
-    conn.close()
-    return data
+    if period == 'session':
+        # Compare the stored text dates directly so the (exercise, date) index is used
+        query = '''
+            SELECT CAST(strftime('%s', date, 'utc') AS INTEGER), repetitions, points
+            FROM progress
+            WHERE exercise = ? AND date >= ? AND date < ?
+            ORDER BY date
+        '''
+        params = (exercise, since.strftime(DATE_FORMAT) if since else '',
+                  until.strftime(DATE_FORMAT) if until else '~')
+    else:
+        query = f'''
+            SELECT {period} / 1000, repetitions, points
+            FROM {ROLLUP_TABLES[period]}
+            WHERE exercise = ? AND {period} >= ? AND {period} < ?
+            ORDER BY {period}
+        '''
+        params = (exercise, int(since.timestamp() * 1000) if since else -2 ** 63,
+                  int(until.timestamp() * 1000) if until else 2 ** 63 - 1)
+
+    # Read-only, so plotting never holds up the app's writer
+    try:
+        conn = connect_readonly(db_name)
+    except sqlite3.Error as e:
+        print(f"Cannot open {db_name}: {e}")
+        return np.empty(0, dtype=PROGRESS_DTYPE)
+    try:
+        return np.fromiter(conn.execute(query, params), dtype=PROGRESS_DTYPE)
+    except sqlite3.Error as e:
+        print(f"Error fetching progress: {e}")
+        return np.empty(0, dtype=PROGRESS_DTYPE)
+    finally:
+        conn.close()
+
+
+def downsample_lttb(x, y, threshold):
+    """
+    Pick at most `threshold` points of a series with Largest-Triangle-Three-Buckets,
+    which keeps the peaks and troughs that plain decimation would drop.
 
+    Parameters:
+    - x (numpy.ndarray): Increasing x values.
+    - y (numpy.ndarray): y values.
+    - threshold (int): Maximum number of points to keep (at least 3).
 
-def plot_progress(data, exercise='Knee Exercise'):
+    Returns:
+    - numpy.ndarray: Indices of the kept points, in order.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # The first and last points are always kept; the rest is split into buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # The third vertex is the mean of the next bucket (or the last point)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        indices[i + 1] = previous
+    return indices
+
+
+def plot_progress(data, exercise='Knee Exercise', max_points=1000):
     """
     Plot repetitions and points over time.
 
     Parameters:
-    - data (list of tuples): Each tuple contains (date, exercise, repetitions, points).
+    - data (numpy.ndarray): Output of fetch_progress().
     - exercise (str): Name of the exercise for labeling.
+    - max_points (int): Longer series are downsampled to this many points.
     """
-    if not data:
+    if len(data) == 0:
         print("No progress data available.")
         return
 
-    dates = [datetime.strptime(record[0], "%Y-%m-%d %H:%M:%S") for record in data]
-    reps = [record[2] for record in data]
-    points = [record[3] for record in data]
+    times = data['time']
+    # Markers only help while individual sessions can still be told apart
+    marker = 'o' if len(data) <= 100 else None
 
     plt.figure(figsize=(12, 6))
 
-    plt.subplot(1, 2, 1)
-    plt.plot(dates, reps, marker='o', linestyle='-')
-    plt.title(f'{exercise} Repetitions Over Time')
-    plt.xlabel('Date')
-    plt.ylabel('Repetitions')
-    plt.xticks(rotation=45)
-
-    plt.subplot(1, 2, 2)
-    plt.plot(dates, points, marker='o', color='orange', linestyle='-')
-    plt.title(f'{exercise} Points Over Time')
-    plt.xlabel('Date')
-    plt.ylabel('Points')
-    plt.xticks(rotation=45)
+    for position, (field, label, color) in enumerate((('repetitions', 'Repetitions', None),
+                                                       ('points', 'Points', 'orange')), start=1):
+        keep = downsample_lttb(times, data[field], max_points)
+        # Only the kept points are turned into (local time) datetimes
+        dates = [datetime.fromtimestamp(t) for t in times[keep].tolist()]
+        plt.subplot(1, 2, position)
+        plt.plot(dates, data[field][keep], marker=marker, color=color, linestyle='-')
+        plt.title(f'{exercise} {label} Over Time')
+        plt.xlabel('Date')
+        plt.ylabel(label)
+        plt.xticks(rotation=45)
 
     plt.tight_layout()
     plt.show()
 
 
+def parse_date(text):
+    """
+    Parse a YYYY-MM-DD command-line date as local midnight.
+    """
+    try:
+        return datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {text!r}")
+
+
 def main():
-    exercise = 'Knee Exercise'  # Change as needed
-    data = fetch_progress(exercise=exercise)
-    plot_progress(data, exercise=exercise)
+    parser = argparse.ArgumentParser(description="Plot exercise progress over time.")
+    parser.add_argument('--db', default='progress.db', help="SQLite database to read.")
+    parser.add_argument('--exercise', default='Knee Exercise', help="Exercise to plot.")
+    parser.add_argument('--since', type=parse_date, help="First date to include (YYYY-MM-DD).")
+    parser.add_argument('--until', type=parse_date, help="First date to exclude (YYYY-MM-DD).")
+    parser.add_argument('--period', choices=['session', 'day', 'week'], default='session',
+                        help="Plot every session, or totals per day or week.")
+    parser.add_argument('--max-points', type=int, default=1000,
+                        help="Downsample longer series to this many points.")
+    args = parser.parse_args()
+
+    data = fetch_progress(args.db, args.exercise, args.since, args.until, args.period)
+    plot_progress(data, exercise=args.exercise, max_points=args.max_points)
 
 
 if __name__ == "__main__":